@@ -1,17 +1,36 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for, session
+from flask import Flask, Response, render_template, jsonify, request, redirect, url_for, session, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import io
 import json
+import tempfile
 import random
+import zlib
 import os
 import requests
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
+from collections import deque
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-
-from models import db, User, ProblemSet, ProblemSetProblem, DifficultyCache, \
-    UserProgress, UserSession, UserSessionProblem, UserActiveSet
+from sqlalchemy import delete, func, insert, not_, or_, update
+
+from problem_urls import normalize_problem_url, problem_slug, canonical_url
+from models import db, User, Problem, ProblemSet, ProblemSetProblem, DifficultyCache, \
+    UserProgress, UserSession, UserActiveSet
+from state_cache import UserStateCache, UserState, SessionView, ProgressFlags
+from metrics import RequestMetrics, TimedQueuePool
+from shared_cache import RedisTier, TieredCache
+from events import EventBroker
+from problem_index import DIFFICULTIES, CompiledSet, ProblemTable
+from db_routing import ReplicaRouter, replica_read
+from password_hashing import HasherBusy, PasswordHasher
+from request_limits import RequestLimits, idempotent, rate_limit
+from sqlite_tuning import SQLiteTuning
+from static_assets import StaticAssets
+from upserts import insert_ignore, json_list_contains, upsert, upsert_returning
+from upload_parser import iter_problem_set, UploadError
 app = Flask(__name__)
 
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -28,12 +47,124 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_pre_ping': True,
     'pool_recycle': 300,
+    'poolclass': TimedQueuePool,
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+}
+
+# Connect-time pragmas when DATABASE_URL is sqlite:/// (see sqlite_tuning.py)
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+# Optional read replicas, comma-separated; @replica_read views read from them
+# (see db_routing.py). A user stays on the primary this long after a write.
+app.config['SQLALCHEMY_BINDS'] = {
+    f"replica_{i}": url.strip()
+    for i, url in enumerate(u for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip())
 }
+app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+app.config['REPLICA_RETRY_SECONDS'] = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+# A replica that passed its connection check is trusted this long before the next one
+app.config['REPLICA_HEALTH_SECONDS'] = float(os.environ.get('REPLICA_HEALTH_SECONDS', 5))
+
+# Per-process user state snapshots (see state_cache.py)
+app.config['USER_STATE_CACHE_SIZE'] = int(os.environ.get('USER_STATE_CACHE_SIZE', 1024))
+app.config['USER_STATE_CACHE_TTL'] = int(os.environ.get('USER_STATE_CACHE_TTL', 300))
+
+# Problem set uploads are parsed as a stream and rejected past these limits
+app.config['MAX_UPLOAD_BYTES'] = int(os.environ.get('MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+app.config['MAX_UPLOAD_PROBLEMS'] = int(os.environ.get('MAX_UPLOAD_PROBLEMS', 20000))
+# JSON bodies are parsed whole by Flask; allow for escaping of an embedded upload
+app.config['MAX_CONTENT_LENGTH'] = 2 * app.config['MAX_UPLOAD_BYTES'] + 64 * 1024
+
+# Upstream used to look up problem difficulties (benchmarks point this at a fake)
+app.config['LEETCODE_GRAPHQL_URL'] = os.environ.get('LEETCODE_GRAPHQL_URL', 'https://leetcode.com/graphql')
+
+# Log requests slower than this (with their SQL); 0 disables
+app.config['SLOW_REQUEST_MS'] = int(os.environ.get('SLOW_REQUEST_MS', 0))
+
+# Add a Server-Timing header (app, db, pool wait, upstream) to every response
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '0') == '1'
+
+# /metrics answers only requests with "Authorization: Bearer <METRICS_TOKEN>";
+# without a token configured it is not served at all
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+# Difficulty and compiled-set caches: a per-process LRU, plus a Redis-protocol
+# tier shared by all workers when SHARED_CACHE_URL is set (see shared_cache.py)
+app.config['SHARED_CACHE_URL'] = os.environ.get('SHARED_CACHE_URL')
+app.config['SHARED_CACHE_TTL'] = int(os.environ.get('SHARED_CACHE_TTL', 86400))
+app.config['SHARED_CACHE_RETRY_SECONDS'] = float(os.environ.get('SHARED_CACHE_RETRY_SECONDS', 30))
+app.config['DIFFICULTY_CACHE_SIZE'] = int(os.environ.get('DIFFICULTY_CACHE_SIZE', 20000))
+app.config['COMPILED_SET_CACHE_SIZE'] = int(os.environ.get('COMPILED_SET_CACHE_SIZE', 64))
+
+# Live update streams (/api/events, see events.py); EVENTS_URL fans events out
+# across workers. Each open stream holds a thread, so by default a process
+# serves at most half of its gunicorn threads as streams.
+app.config['EVENTS_URL'] = os.environ.get('EVENTS_URL')
+app.config['EVENTS_RETRY_SECONDS'] = float(os.environ.get('EVENTS_RETRY_SECONDS', 30))
+app.config['EVENTS_MAX_STREAMS'] = int(os.environ.get(
+    'EVENTS_MAX_STREAMS', max(1, int(os.environ.get('GUNICORN_THREADS', 4)) // 2)))
+app.config['EVENTS_QUEUE_SIZE'] = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+app.config['EVENTS_HEARTBEAT_SECONDS'] = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+app.config['EVENTS_STREAM_SECONDS'] = float(os.environ.get('EVENTS_STREAM_SECONDS', 300))
+
+# Password hashes run on a per-worker process pool (see password_hashing.py);
+# past PASSWORD_HASH_WORKERS running and PASSWORD_HASH_QUEUE waiting, logins
+# and registrations get a 503 instead of tying up request threads. A hash
+# takes about half a second, so four waiting per process clear in ~2s.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get(
+    'PASSWORD_HASH_QUEUE', max(1, app.config['PASSWORD_HASH_WORKERS']) * 4))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# Per-user token buckets on write routes and Idempotency-Key replay (see
+# request_limits.py); IDEMPOTENCY_URL shares keys across workers.
+app.config['RATE_LIMIT_SCALE'] = float(os.environ.get('RATE_LIMIT_SCALE', 1))
+app.config['RATE_LIMIT_BUCKETS'] = int(os.environ.get('RATE_LIMIT_BUCKETS', 10000))
+app.config['IDEMPOTENCY_URL'] = os.environ.get('IDEMPOTENCY_URL')
+app.config['IDEMPOTENCY_TTL_SECONDS'] = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 600))
+app.config['IDEMPOTENCY_WAIT_SECONDS'] = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 5))
+app.config['IDEMPOTENCY_CACHE_SIZE'] = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 10000))
+app.config['IDEMPOTENCY_RETRY_SECONDS'] = float(os.environ.get('IDEMPOTENCY_RETRY_SECONDS', 30))
+
+# Page CSS/JS is served from static/ under content-hashed names (see static_assets.py)
+app.config['ASSET_MAX_AGE'] = int(os.environ.get('ASSET_MAX_AGE', 31536000))
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 db.init_app(app)
 
+sqlite_tuning = SQLiteTuning()
+sqlite_tuning.init_app(app, db)
+
+user_states = UserStateCache()
+user_states.init_app(app, db)
+
+replica_router = ReplicaRouter()
+replica_router.init_app(app, db)
+
+request_metrics = RequestMetrics()
+request_metrics.init_app(app, db)
+
+event_broker = EventBroker()
+event_broker.init_app(app, request_metrics)
+
+request_limits = RequestLimits()
+request_limits.init_app(app, request_metrics)
+
+static_assets = StaticAssets()
+static_assets.init_app(app)
+
+password_hasher = PasswordHasher()
+password_hasher.init_app(app, request_metrics)
+
+shared_cache_tier = RedisTier(app.config['SHARED_CACHE_URL'], app.config['SHARED_CACHE_TTL'],
+                              app.config['SHARED_CACHE_RETRY_SECONDS']) if app.config['SHARED_CACHE_URL'] else None
+
 # Setup Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -42,7 +173,7 @@ login_manager.login_view = 'login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_states.load(db, int(user_id))
 
 
 # ---------------------------------------------------------------------------
@@ -50,7 +181,7 @@ def load_user(user_id):
 # ---------------------------------------------------------------------------
 
 def create_user(username, email, password):
-    """Create a new user. Returns (user, error_message)."""
+    """Create a new user. Returns (user, error_message); raises HasherBusy."""
     if User.query.filter_by(username=username).first():
         return None, "Username already exists"
     if User.query.filter_by(email=email).first():
@@ -59,7 +190,7 @@ def create_user(username, email, password):
     user = User(
         username=username,
         email=email,
-        password_hash=generate_password_hash(password, method='pbkdf2:sha256'),
+        password_hash=password_hasher.hash(password),
         created_at=datetime.utcnow()
     )
     db.session.add(user)
@@ -68,32 +199,228 @@ def create_user(username, email, password):
 
 
 def verify_password(username, password):
-    """Verify credentials. Returns User or None."""
+    """Verify credentials. Returns User or None; raises HasherBusy."""
     user = User.query.filter_by(username=username).first()
-    if user and check_password_hash(user.password_hash, password):
-        return user
-    return None
+    if not user:
+        return None
+    ok, new_hash = password_hasher.verify(user.password_hash, password)
+    if not ok:
+        return None
+    if new_hash:
+        # Stored with older PASSWORD_HASH_METHOD parameters; upgrade it now we have the password
+        user.password_hash = new_hash
+        db.session.commit()
+    return user
+
+
+def hasher_busy_response():
+    # Counted in app_password_hash_jobs_total; not logged, as they come in bursts
+    response = jsonify({'success': False, 'message': 'Too many sign-ins right now, please try again shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Problem helpers
+# ---------------------------------------------------------------------------
+
+def resolve_problem_ids(urls) -> Dict[str, int]:
+    """Map URLs to canonical problems.id values, creating missing rows (no commit)."""
+    normalized = {url: normalize_problem_url(url) for url in urls}
+    slug_by_url = {url: slug for url, (slug, _) in normalized.items()}
+    slugs = list(set(slug_by_url.values()))
+
+    id_by_slug: Dict[str, int] = {}
+    for i in range(0, len(slugs), 500):
+        chunk = slugs[i:i + 500]
+        for pid, slug in db.session.query(Problem.id, Problem.slug).filter(Problem.slug.in_(chunk)):
+            id_by_slug[slug] = pid
+
+    created: Dict[str, Dict] = {}
+    for url, slug in slug_by_url.items():
+        if slug not in id_by_slug and slug not in created:
+            created[slug] = {'slug': slug, 'url': normalized[url][1], 'difficulty': None}
+    for slug, difficulty in difficulty_cache.get_many(created).items():
+        created[slug]['difficulty'] = difficulty
+
+    # One executemany plus one lookup per chunk, however many problems are new;
+    # rows a concurrent request inserted first are skipped and looked up below
+    if created:
+        insert_ignore(db.session, Problem, list(created.values()), ['slug'])
+        new_slugs = list(created)
+        for i in range(0, len(new_slugs), 500):
+            chunk = new_slugs[i:i + 500]
+            for pid, slug in db.session.query(Problem.id, Problem.slug).filter(Problem.slug.in_(chunk)):
+                id_by_slug[slug] = pid
+
+    return {url: id_by_slug[slug] for url, slug in slug_by_url.items()}
+
+
+class ContentHasher:
+    """SHA-256 of a set's ordered (category, canonical URL) list; equal hash = identical set."""
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self.count = 0
+
+    def add(self, category: str, url: str):
+        self._hash.update(f"{category}\t{canonical_url(url)}\n".encode('utf-8'))
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def add_problem_set_rows(ps: ProblemSet, problems, batch_size: int = 1000) -> int:
+    """Insert ordered ProblemSetProblem rows (no commit); returns the row count.
+
+    problems is a {category: [urls]} mapping or an iterable of (category, url)
+    pairs, e.g. from upload_parser.iter_problem_set. Pairs are written in
+    batches as they arrive, so a streamed upload is never held in memory whole.
+    Sets ps.content_hash from the rows written.
+    """
+    if isinstance(problems, dict):
+        problems = ((category, url) for category, urls in problems.items() for url in urls)
+    problems = iter(problems)
+    hasher = ContentHasher()
+
+    position = 0
+    while True:
+        batch = list(islice(problems, batch_size))
+        if not batch:
+            ps.content_hash = hasher.hexdigest()
+            return position
+        ids = resolve_problem_ids({url for _, url in batch})
+        rows = []
+        for category, url in batch:
+            hasher.add(category, url)
+            rows.append({
+                'problem_set_id': ps.id,
+                'category': category,
+                'problem_id': ids[url],
+                'position': position
+            })
+            position += 1
+        db.session.execute(insert(ProblemSetProblem), rows)
+
+
+def open_upload(source):
+    """A seekable stream for an upload given as a string or a file-like object."""
+    if isinstance(source, str):
+        return io.StringIO(source)
+    if source.seekable():
+        return source
+    # Spool at most one byte past the limit so the parser still reports the overrun
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    remaining = app.config['MAX_UPLOAD_BYTES'] + 1
+    while remaining > 0:
+        chunk = source.read(min(remaining, 64 * 1024))
+        if not chunk:
+            break
+        spooled.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        remaining -= len(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def upload_content_hash(stream) -> str:
+    """Validate a whole upload and return its content hash, leaving the stream rewound."""
+    hasher = ContentHasher()
+    for category, url in iter_upload(stream):
+        hasher.add(category, url)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+
+def find_set_by_content(content_hash: str, user_id: int) -> Optional[ProblemSet]:
+    """An existing public or user-owned set with identical contents, preferring the user's own."""
+    return ProblemSet.query.filter(
+        ProblemSet.content_hash == content_hash,
+        (ProblemSet.is_public == True) | (ProblemSet.owner_user_id == user_id)
+    ).order_by(ProblemSet.is_public, ProblemSet.id).first()
+
+
+def iter_upload(source):
+    """(category, canonical_url) pairs from an upload, within the configured limits."""
+    return iter_problem_set(open_upload(source),
+                            max_bytes=app.config['MAX_UPLOAD_BYTES'],
+                            max_problems=app.config['MAX_UPLOAD_PROBLEMS'])
 
 
 # ---------------------------------------------------------------------------
 # LeetCodeProblemSelector
 # ---------------------------------------------------------------------------
 
+# Every problem this process has seen: URL and difficulty by problems.id. Compiled
+# sets (see problem_index.py) hold only ids, are read-only once built and, when
+# preloaded in the gunicorn master, are shared copy-on-write by workers.
+problem_table = ProblemTable()
+
+
+def encode_compiled_set(compiled: CompiledSet) -> bytes:
+    # The problems' URLs and difficulties travel with the set, for the receiving worker's table
+    return zlib.compress(json.dumps([
+        compiled.version,
+        [[category, ids.tolist()] for category, ids in compiled.by_category()],
+        [problem_table.url(pid) for pid in compiled.ids],
+        [problem_table.difficulty_code(pid) for pid in compiled.ids],
+    ], separators=(',', ':')).encode('utf-8'))
+
+
+def decode_compiled_set(blob: bytes) -> CompiledSet:
+    try:
+        version, categories, urls, codes = json.loads(zlib.decompress(blob))
+    except zlib.error as e:
+        raise ValueError(str(e)) from None
+    rows = [(category, pid) for category, ids in categories for pid in ids]
+    for (_, pid), url, code in zip(rows, urls, codes):
+        problem_table.add(pid, url, DIFFICULTIES[code - 1] if code else None)
+    return CompiledSet(version, rows, problem_table.difficulty_code)
+
+
+# Problem slug -> difficulty, backed by the difficulty_cache table
+difficulty_cache = TieredCache('difficulty', app.config['DIFFICULTY_CACHE_SIZE'], shared_cache_tier,
+                               metrics=request_metrics)
+
+# "<set_id>:<version>" -> CompiledSet; an update bumps the version, so entries never go stale
+compiled_set_cache = TieredCache('compiled_set', app.config['COMPILED_SET_CACHE_SIZE'], shared_cache_tier,
+                                 encode=encode_compiled_set, decode=decode_compiled_set, metrics=request_metrics)
+
+
+def cached_difficulties(slugs) -> Dict[str, str]:
+    """Known difficulties for slugs: cache tiers first, then the difficulty_cache table."""
+    found = difficulty_cache.get_many(slugs)
+    missing = [slug for slug in slugs if slug not in found]
+    from_db: Dict[str, str] = {}
+    for i in range(0, len(missing), 500):
+        chunk = missing[i:i + 500]
+        from_db.update(db.session.query(DifficultyCache.problem_slug, DifficultyCache.difficulty)
+                       .filter(DifficultyCache.problem_slug.in_(chunk)))
+    if from_db:
+        difficulty_cache.put_many(from_db)
+        found.update(from_db)
+    return found
+
+
 class LeetCodeProblemSelector:
-    # In-memory difficulty cache shared across all instances (synced with DB)
-    _global_difficulty_cache: Dict[str, str] = None
+    # Slug -> difficulty, shared across all instances (and workers, with a shared tier)
+    _difficulty_cache = difficulty_cache
 
-    def __init__(self, user_id: int):
-        self.user_id = user_id
+    # Compiled problem sets by "<set_id>:<version>"
+    _compiled_sets = compiled_set_cache
+
+    # Tries at a session rewrite that keeps losing to parallel writes
+    SESSION_UPDATE_ATTEMPTS = 5
 
-        # Load global cache once
-        if LeetCodeProblemSelector._global_difficulty_cache is None:
-            LeetCodeProblemSelector._global_difficulty_cache = self._load_global_difficulty_cache()
+    def __init__(self, user_id: int, state: Optional[UserState] = None):
+        self.user_id = user_id
+        self._state = state
 
         # In-memory state (lazily populated from DB)
-        self.problems_data: Dict[str, List[str]] = None
-        self.difficulty_map: Dict[str, List[str]] = None
+        self._compiled: Optional[CompiledSet] = None
         self._active_set_id: str = None
+        self._progress_cache = None
 
         # Load active problem set
         self._load_active_problem_set()
@@ -102,21 +429,11 @@ class LeetCodeProblemSelector:
     # Difficulty cache
     # ------------------------------------------------------------------
 
-    def _load_global_difficulty_cache(self) -> Dict[str, str]:
-        rows = DifficultyCache.query.all()
-        cache = {r.problem_slug: r.difficulty for r in rows}
-        print(f"Loaded global difficulty cache with {len(cache)} entries")
-        return cache
-
     def _save_difficulty_entry(self, slug: str, difficulty: str):
         """Upsert a single entry into the difficulty_cache table."""
-        row = DifficultyCache.query.filter_by(problem_slug=slug).first()
-        if row:
-            row.difficulty = difficulty
-            row.updated_at = datetime.utcnow()
-        else:
-            row = DifficultyCache(problem_slug=slug, difficulty=difficulty)
-            db.session.add(row)
+        upsert(db.session, DifficultyCache,
+               [{'problem_slug': slug, 'difficulty': difficulty, 'updated_at': datetime.utcnow()}],
+               ['problem_slug'], ['difficulty', 'updated_at'])
         db.session.commit()
 
     # ------------------------------------------------------------------
@@ -124,23 +441,48 @@ class LeetCodeProblemSelector:
     # ------------------------------------------------------------------
 
     def _load_active_problem_set(self):
-        active = UserActiveSet.query.filter_by(user_id=self.user_id).first()
-        if active:
-            self._active_set_id = active.set_id
-            self._load_problem_set_by_id(active.set_id)
+        state = self._current_state()
+        if state is not None:
+            set_id, version = state.active_set_id, state.active_set_version
+        else:
+            active = UserActiveSet.query.filter_by(user_id=self.user_id).first()
+            set_id, version = (active.set_id if active else None), None
+        if set_id:
+            self._active_set_id = set_id
+            self._load_problem_set_by_id(set_id, version)
+
+    def _load_problem_set_by_id(self, set_id: str, version: Optional[int] = None) -> bool:
+        if version is None:
+            version = db.session.query(ProblemSet.version).filter_by(set_id=set_id).scalar()
+            if version is None:
+                return False
+        compiled = LeetCodeProblemSelector._compiled_sets.get(f"{set_id}:{version}")
+        if compiled is None:
+            compiled = self._compile_problem_set(set_id)
+            if compiled is None:
+                return False
+            LeetCodeProblemSelector._compiled_sets.put(f"{set_id}:{compiled.version}", compiled)
 
-    def _load_problem_set_by_id(self, set_id: str) -> bool:
+        self._compiled = compiled
+        return True
+
+    def _compile_problem_set(self, set_id: str) -> Optional[CompiledSet]:
         ps = ProblemSet.query.filter_by(set_id=set_id).first()
         if not ps:
-            return False
+            return None
 
-        problems_data: Dict[str, List[str]] = {}
-        for p in ps.problems.order_by(ProblemSetProblem.position):
-            problems_data.setdefault(p.category, []).append(p.problem_url)
+        rows = db.session.query(ProblemSetProblem.category, Problem.id, Problem.url, Problem.slug,
+                                Problem.difficulty) \
+            .join(Problem, Problem.id == ProblemSetProblem.problem_id) \
+            .filter(ProblemSetProblem.problem_set_id == ps.id) \
+            .order_by(ProblemSetProblem.position).all()
 
-        self.problems_data = problems_data
-        self.difficulty_map = self._initialize_difficulty_map()
-        return True
+        unknown = {(url, slug) for _, _, url, slug, difficulty in rows if not difficulty}
+        resolved = self._resolve_difficulties(list(unknown)) if unknown else {}
+        for _, pid, url, slug, difficulty in rows:
+            problem_table.add(pid, url, difficulty or resolved.get(slug))
+        return CompiledSet(ps.version, [(category, pid) for category, pid, *_ in rows],
+                           problem_table.difficulty_code)
 
     def _count_problems_in_set(self, problems_data) -> int:
         if isinstance(problems_data, dict):
@@ -150,47 +492,75 @@ class LeetCodeProblemSelector:
         return 0
 
     def get_problem_sets(self):
-        active = UserActiveSet.query.filter_by(user_id=self.user_id).first()
-        active_set_id = active.set_id if active else None
+        active_set_id = self._active_set_id
 
-        sets = []
-
-        # Public sets
-        public_sets = ProblemSet.query.filter_by(is_public=True).all()
-        for ps in public_sets:
-            problem_count = ps.problems.count()
-            sets.append({
-                'id': ps.set_id,
-                'name': ps.name,
-                'description': ps.description or '',
-                'problem_count': problem_count,
-                'is_public': True,
-                'is_active': ps.set_id == active_set_id,
-                'created_by': ps.created_by or 'System',
-                'created_at': ps.created_at.strftime('%Y-%m-%d') if ps.created_at else ''
-            })
+        # Public sets plus the user's private sets, with problem counts, in one query
+        rows = db.session.query(ProblemSet, func.count(ProblemSetProblem.id)) \
+            .outerjoin(ProblemSetProblem, ProblemSetProblem.problem_set_id == ProblemSet.id) \
+            .filter((ProblemSet.is_public == True) | (ProblemSet.owner_user_id == self.user_id)) \
+            .group_by(ProblemSet.id).all()
 
-        # User's private sets
-        private_sets = ProblemSet.query.filter_by(is_public=False, owner_user_id=self.user_id).all()
-        for ps in private_sets:
-            problem_count = ps.problems.count()
+        sets = []
+        for ps, problem_count in rows:
             sets.append({
-                'id': ps.set_id,
-                'name': ps.name,
-                'description': ps.description or '',
+                **self._describe_set(ps),
                 'problem_count': problem_count,
-                'is_public': False,
                 'is_active': ps.set_id == active_set_id,
-                'created_by': 'You',
                 'created_at': ps.created_at.strftime('%Y-%m-%d') if ps.created_at else ''
             })
 
         return sorted(sets, key=lambda x: (not x['is_public'], x['name']))
 
-    def create_problem_set(self, name: str, description: str, problems_json: str, is_public: bool = False):
+    def _describe_set(self, ps: ProblemSet) -> Dict:
+        return {
+            'id': ps.set_id,
+            'name': ps.name,
+            'description': ps.description or '',
+            'is_public': bool(ps.is_public),
+            'created_by': (ps.created_by or 'System') if ps.is_public else 'You',
+        }
+
+    def get_active_set_summary(self) -> Optional[Dict]:
+        """The active set's details and how much of it the user has completed, per difficulty."""
+        if not self._compiled:
+            return None
+        ps = ProblemSet.query.filter_by(set_id=self._active_set_id).first()
+        if not ps:
+            return None
+
+        return {**self._describe_set(ps), **self.get_active_set_progress()}
+
+    def get_active_set_progress(self) -> Optional[Dict]:
+        """Completed and total problems of the active set, overall and per difficulty."""
+        compiled = self._compiled
+        if not compiled:
+            return None
+        completed_mask = self._progress().completed_mask
+        by_difficulty = {d: {'completed': (completed_mask & compiled.mask(d)).bit_count(),
+                             'total': compiled.mask(d).bit_count()} for d in DIFFICULTIES}
+        total = compiled.mask().bit_count()
+        completed = (completed_mask & compiled.mask()).bit_count()
+
+        return {
+            'total': total,
+            'completed': completed,
+            'pending': total - completed,
+            'by_difficulty': by_difficulty,
+        }
+
+    def create_problem_set(self, name: str, description: str, problems_json, is_public: bool = False):
+        """Create a set from an upload (JSON string or stream); raises UploadError for bad uploads."""
         try:
-            data = json.loads(problems_json)
-            problems = data['result'] if 'result' in data else data
+            stream = open_upload(problems_json)
+            content_hash = upload_content_hash(stream)
+            existing = ProblemSet.query.filter_by(
+                owner_user_id=self.user_id, name=name, content_hash=content_hash
+            ).first() if not is_public else None
+            if existing:
+                existing.dedupe_hits += 1
+                db.session.commit()
+                print(f"Problem set {existing.set_id} re-uploaded by user {self.user_id}; reusing it")
+                return existing.set_id
 
             set_id = name.lower().replace(' ', '_').replace('-', '_')
             set_id = ''.join(c for c in set_id if c.isalnum() or c == '_')
@@ -203,24 +573,18 @@ class LeetCodeProblemSelector:
                 is_public=is_public,
                 owner_user_id=self.user_id if not is_public else None,
                 created_by=str(self.user_id),
-                created_at=datetime.utcnow()
+                created_at=datetime.utcnow(),
+                content_hash=content_hash
             )
             db.session.add(ps)
             db.session.flush()  # get ps.id before inserting problems
-
-            position = 0
-            for category, urls in problems.items():
-                for url in urls:
-                    db.session.add(ProblemSetProblem(
-                        problem_set_id=ps.id,
-                        category=category,
-                        problem_url=url,
-                        position=position
-                    ))
-                    position += 1
+            add_problem_set_rows(ps, iter_upload(stream))
 
             db.session.commit()
             return set_id
+        except UploadError:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             print(f"Error creating problem set: {e}")
@@ -232,13 +596,10 @@ class LeetCodeProblemSelector:
         if not self._load_problem_set_by_id(set_id):
             return False
 
-        active = UserActiveSet.query.filter_by(user_id=self.user_id).first()
-        if active:
-            active.set_id = set_id
-            active.updated_at = datetime.utcnow()
-        else:
-            db.session.add(UserActiveSet(user_id=self.user_id, set_id=set_id))
-
+        upsert(db.session, UserActiveSet,
+               [{'user_id': self.user_id, 'set_id': set_id, 'updated_at': datetime.utcnow()}],
+               ['user_id'], ['set_id', 'updated_at'])
+        user_states.touch(db.session, self.user_id)
         db.session.commit()
         self._active_set_id = set_id
         return True
@@ -252,13 +613,89 @@ class LeetCodeProblemSelector:
         active = UserActiveSet.query.filter_by(user_id=self.user_id, set_id=set_id).first()
         if active:
             db.session.delete(active)
-            self.problems_data = None
-            self.difficulty_map = None
+            self._compiled = None
 
+        version = ps.version
         db.session.delete(ps)
         db.session.commit()
+        LeetCodeProblemSelector._compiled_sets.pop(f"{set_id}:{version}")
         return True
 
+    def update_problem_set(self, set_id: str, problems_json, name: Optional[str] = None,
+                           description: Optional[str] = None):
+        """Replace one of the user's sets with an upload, in place; returns a change summary.
+
+        Stored rows are matched to the upload on (category, problem), so only
+        added, removed and re-ordered rows are written and everything else,
+        including users' sessions and progress, is left alone. The version is
+        bumped when the contents change. Returns None when the user does not
+        own the set; raises UploadError for bad uploads.
+        """
+        ps = ProblemSet.query.filter_by(set_id=set_id, owner_user_id=self.user_id).first()
+        if not ps:
+            return None
+        try:
+            entries = list(iter_upload(problems_json))
+            ids = resolve_problem_ids({url for _, url in entries})
+
+            stored = db.session.query(ProblemSetProblem.id, ProblemSetProblem.category,
+                                      ProblemSetProblem.problem_id, ProblemSetProblem.position) \
+                .filter_by(problem_set_id=ps.id) \
+                .order_by(ProblemSetProblem.position, ProblemSetProblem.id).all()
+            unmatched: Dict[tuple, deque] = {}
+            for row in stored:
+                unmatched.setdefault((row.category, row.problem_id), deque()).append(row)
+
+            hasher = ContentHasher()
+            inserts, moves = [], []
+            for position, (category, url) in enumerate(entries):
+                hasher.add(category, url)
+                rows = unmatched.get((category, ids[url]))
+                if rows:
+                    row = rows.popleft()
+                    if row.position != position:
+                        moves.append({'id': row.id, 'position': position})
+                else:
+                    inserts.append({'problem_set_id': ps.id, 'category': category,
+                                    'problem_id': ids[url], 'position': position})
+            deletes = [row.id for rows in unmatched.values() for row in rows]
+
+            for i in range(0, len(deletes), 500):
+                db.session.execute(delete(ProblemSetProblem).where(ProblemSetProblem.id.in_(deletes[i:i + 500])))
+            if moves:
+                db.session.execute(update(ProblemSetProblem), moves)
+            if inserts:
+                db.session.execute(insert(ProblemSetProblem), inserts)
+
+            old_version = version = ps.version
+            changed = bool(deletes or moves or inserts)
+            if changed:
+                version = old_version + 1
+                ps.content_hash = hasher.hexdigest()
+                ps.version = version
+            if name:
+                ps.name = name
+            if description is not None:
+                ps.description = description
+            db.session.commit()
+        except UploadError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error updating problem set: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+        if changed:
+            LeetCodeProblemSelector._compiled_sets.pop(f"{set_id}:{old_version}")
+            if self._active_set_id == set_id:
+                self._load_problem_set_by_id(set_id, version)
+        print(f"Problem set {set_id} updated to version {version}: "
+              f"{len(inserts)} added, {len(deletes)} removed, {len(moves)} moved")
+        return {'version': version, 'added': len(inserts), 'removed': len(deletes), 'moved': len(moves)}
+
     def export_problem_set(self, set_id: str):
         ps = ProblemSet.query.filter_by(set_id=set_id).filter(
             (ProblemSet.is_public == True) | (ProblemSet.owner_user_id == self.user_id)
@@ -268,7 +705,7 @@ class LeetCodeProblemSelector:
 
         problems: Dict[str, List[str]] = {}
         for p in ps.problems.order_by(ProblemSetProblem.position):
-            problems.setdefault(p.category, []).append(p.problem_url)
+            problems.setdefault(p.category, []).append(p.problem.url)
 
         return {
             'id': ps.set_id,
@@ -284,10 +721,19 @@ class LeetCodeProblemSelector:
     # Load problems (from raw JSON upload)
     # ------------------------------------------------------------------
 
-    def load_problems(self, problems_json: str) -> bool:
+    def load_problems(self, problems_json) -> bool:
+        """Store and activate an upload (JSON string or stream); raises UploadError for bad uploads."""
         try:
-            data = json.loads(problems_json)
-            problems = data['result'] if 'result' in data else data
+            stream = open_upload(problems_json)
+            content_hash = upload_content_hash(stream)
+            existing = find_set_by_content(content_hash, self.user_id)
+            if existing:
+                # Identical contents already stored: activate that set instead of copying its rows
+                existing.dedupe_hits += 1
+                db.session.commit()
+                self.set_active_problem_set(existing.set_id)
+                print(f"Upload for user {self.user_id} matches {existing.set_id}; activated it instead of storing a copy")
+                return True
 
             set_id = f"uploaded_{self.user_id}_{int(time.time())}"
 
@@ -298,21 +744,12 @@ class LeetCodeProblemSelector:
                 is_public=False,
                 owner_user_id=self.user_id,
                 created_by=str(self.user_id),
-                created_at=datetime.utcnow()
+                created_at=datetime.utcnow(),
+                content_hash=content_hash
             )
             db.session.add(ps)
             db.session.flush()
-
-            position = 0
-            for category, urls in problems.items():
-                for url in urls:
-                    db.session.add(ProblemSetProblem(
-                        problem_set_id=ps.id,
-                        category=category,
-                        problem_url=url,
-                        position=position
-                    ))
-                    position += 1
+            add_problem_set_rows(ps, iter_upload(stream))
 
             db.session.commit()
 
@@ -320,6 +757,9 @@ class LeetCodeProblemSelector:
             self.set_active_problem_set(set_id)
             print(f"Problems loaded and activated for user {self.user_id}")
             return True
+        except UploadError:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             print(f"Error loading problems: {e}")
@@ -328,35 +768,23 @@ class LeetCodeProblemSelector:
             return False
 
     def has_problems_loaded(self) -> bool:
-        return self.problems_data is not None
+        return self._compiled is not None
 
     # ------------------------------------------------------------------
-    # Difficulty map
+    # Difficulties
     # ------------------------------------------------------------------
 
-    def _initialize_difficulty_map(self) -> Dict[str, List[str]]:
-        difficulty_map = {'easy': [], 'medium': [], 'hard': []}
-
-        all_problems = []
-        problems_to_fetch = []
-        cached_count = 0
-
-        for category, urls in self.problems_data.items():
-            for url in urls:
-                slug = url.rstrip('/').split('/')[-1]
-                all_problems.append((url, slug))
-                if slug in LeetCodeProblemSelector._global_difficulty_cache:
-                    difficulty_map[LeetCodeProblemSelector._global_difficulty_cache[slug]].append(url)
-                    cached_count += 1
-                else:
-                    problems_to_fetch.append((url, slug))
+    def _resolve_difficulties(self, problems: List[tuple]) -> Dict[str, str]:
+        """Difficulties by slug for (url, slug) pairs: cache tiers, then the table, then the upstream API."""
+        known = cached_difficulties([slug for _, slug in problems])
+        problems_to_fetch = [(url, slug) for url, slug in problems if slug not in known]
 
-        print(f"Found {cached_count} in cache, fetching {len(problems_to_fetch)} from API")
+        print(f"Found {len(known)} in cache, fetching {len(problems_to_fetch)} from API")
 
         if problems_to_fetch:
             new_entries: Dict[str, str] = {}
 
-            with ThreadPoolExecutor(max_workers=10) as executor:
+            with request_metrics.track_outbound(), ThreadPoolExecutor(max_workers=10) as executor:
                 future_to_problem = {
                     executor.submit(self._fetch_difficulty_parallel, url, slug): (url, slug)
                     for url, slug in problems_to_fetch
@@ -364,33 +792,29 @@ class LeetCodeProblemSelector:
                 for future in as_completed(future_to_problem):
                     url, slug = future_to_problem[future]
                     try:
-                        difficulty = future.result()
-                        difficulty_map[difficulty].append(url)
-                        new_entries[slug] = difficulty
+                        new_entries[slug] = known[slug] = future.result()
                     except Exception as e:
                         print(f"Error fetching {slug}: {e}")
-                        difficulty_map['medium'].append(url)
-
-            # Bulk-upsert new cache entries
-            for slug, difficulty in new_entries.items():
-                LeetCodeProblemSelector._global_difficulty_cache[slug] = difficulty
-                row = DifficultyCache.query.filter_by(problem_slug=slug).first()
-                if row:
-                    row.difficulty = difficulty
-                    row.updated_at = datetime.utcnow()
-                else:
-                    db.session.add(DifficultyCache(problem_slug=slug, difficulty=difficulty))
+                        known[slug] = 'medium'
+
+            # Bulk-upsert new cache entries; other workers may be fetching the same slugs
+            LeetCodeProblemSelector._difficulty_cache.put_many(new_entries)
+            now = datetime.utcnow()
+            upsert(db.session, DifficultyCache,
+                   [{'problem_slug': slug, 'difficulty': difficulty, 'updated_at': now}
+                    for slug, difficulty in new_entries.items()],
+                   ['problem_slug'], ['difficulty', 'updated_at'])
+            if new_entries:
+                for problem in Problem.query.filter(Problem.slug.in_(list(new_entries))):
+                    problem.difficulty = new_entries[problem.slug]
             db.session.commit()
 
-        return difficulty_map
+        return known
 
     def _fetch_difficulty_parallel(self, problem_url: str, slug: str) -> str:
-        if slug in LeetCodeProblemSelector._global_difficulty_cache:
-            return LeetCodeProblemSelector._global_difficulty_cache[slug]
-
         try:
             response = requests.post(
-                "https://leetcode.com/graphql",
+                app.config['LEETCODE_GRAPHQL_URL'],
                 json={
                     "query": "query questionData($titleSlug: String!) { question(titleSlug: $titleSlug) { difficulty } }",
                     "variables": {"titleSlug": slug}
@@ -411,44 +835,172 @@ class LeetCodeProblemSelector:
     # Progress helpers
     # ------------------------------------------------------------------
 
-    def _get_progress_row(self, problem_url: str):
-        return UserProgress.query.filter_by(user_id=self.user_id, problem_url=problem_url).first()
-
-    def _get_or_create_progress_row(self, problem_url: str) -> UserProgress:
-        row = self._get_progress_row(problem_url)
-        if not row:
-            row = UserProgress(user_id=self.user_id, problem_url=problem_url)
-            db.session.add(row)
-        return row
-
-    def _get_session(self) -> UserSession:
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
-        if not s:
-            s = UserSession(user_id=self.user_id)
-            db.session.add(s)
-            db.session.flush()
+    def _problem_id(self, problem_url: str, create: bool = False):
+        pid = problem_table.id(problem_url)
+        if pid is None:
+            if create:
+                pid = resolve_problem_ids([problem_url])[problem_url]
+            else:
+                problem = Problem.query.filter_by(slug=problem_slug(problem_url)).first()
+                pid = problem.id if problem else None
+            if pid is not None:
+                problem_table.add(pid, problem_url)
+        return pid
+
+    def _urls_for_ids(self, problem_ids: List[int]) -> List[str]:
+        missing = [pid for pid in problem_ids if problem_table.url(pid) is None]
+        if missing:
+            for pid, url, difficulty in db.session.query(Problem.id, Problem.url, Problem.difficulty) \
+                    .filter(Problem.id.in_(missing)):
+                problem_table.add(pid, url, difficulty)
+        urls = [problem_table.url(pid) for pid in problem_ids]
+        return [url for url in urls if url is not None]
+
+    def _set_progress_flags(self, problem_url: str, unless, **values) -> Optional[int]:
+        """Write values to the user's row for problem_url, creating it, unless the row matches `unless`.
+
+        One INSERT ... ON CONFLICT DO UPDATE ... WHERE NOT unless, so of
+        parallel marks of one problem exactly one writes and none collides
+        on uq_user_problem. Returns the problem id if this call wrote the
+        row, None if it was already marked.
+        """
+        pid = self._problem_id(problem_url, create=True)
+        written = upsert_returning(db.session, UserProgress, {'user_id': self.user_id, 'problem_id': pid, **values},
+                                   ['user_id', 'problem_id'], values, where=not_(unless),
+                                   returning=[UserProgress.id])
+        if written is None:
+            # Nothing changed, but the statement holds the write lock (SQLite)
+            # or the row lock (PostgreSQL) until the transaction ends
+            db.session.commit()
+            return None
+        user_states.touch(db.session, self.user_id)
+        return pid
+
+    def _get_session(self, create: bool = True) -> UserSession:
+        """The user's session row, fetched by primary key at most once per request."""
+        sessions = g.setdefault('user_sessions', {})
+        s = sessions.get(self.user_id)
+        if s is None:
+            s = db.session.get(UserSession, self.user_id)
+            if not s and create:
+                s = UserSession(user_id=self.user_id, problem_ids=[], version=0)
+                db.session.add(s)
+            sessions[self.user_id] = s
         return s
 
+    def _bump_session(self, s: UserSession):
+        s.version = (s.version or 0) + 1
+
+    def _count_session_completion(self, pid: int, difficulty: str):
+        """Add one to the session's completed counters if pid is a session problem.
+
+        Both the membership test and the increment are SQL, so the session
+        isn't read first and parallel marks don't lose counts.
+        """
+        column = getattr(UserSession, f'{difficulty}_completed')
+        db.session.execute(
+            update(UserSession)
+            .where(UserSession.user_id == self.user_id,
+                   json_list_contains(db.session, UserSession, UserSession.problem_ids, pid))
+            .values({column: func.coalesce(column, 0) + 1,
+                     UserSession.total_completed: func.coalesce(UserSession.total_completed, 0) + 1,
+                     UserSession.version: UserSession.version + 1})
+        )
+
+    def _replace_in_session(self, old_id: int, new_id: int):
+        """Swap old_id for new_id in the session, as a compare-and-set on its version.
+
+        A parallel skip may rewrite problem_ids between the read and the
+        write; the version check catches that and the swap is redone on the
+        new list instead of overwriting it.
+        """
+        for _ in range(self.SESSION_UPDATE_ATTEMPTS):
+            row = db.session.query(UserSession.problem_ids, UserSession.version) \
+                .filter_by(user_id=self.user_id).first()
+            if row is None or old_id not in (row.problem_ids or ()):
+                return
+            problem_ids = list(row.problem_ids)
+            problem_ids[problem_ids.index(old_id)] = new_id
+            result = db.session.execute(
+                update(UserSession)
+                .where(UserSession.user_id == self.user_id, UserSession.version == row.version)
+                .values(problem_ids=problem_ids, version=row.version + 1)
+            )
+            if result.rowcount:
+                return
+        print(f"Gave up replacing problem {old_id} in user {self.user_id}'s session after "
+              f"{self.SESSION_UPDATE_ATTEMPTS} concurrent changes")
+
+    def _current_state(self) -> Optional[UserState]:
+        """The cached user snapshot, unless it is stale or this request has pending writes."""
+        state = self._state
+        if state is None or state.stale or db.session.new or db.session.dirty or db.session.deleted:
+            return None
+        return state
+
+    def _session_view(self) -> Optional[SessionView]:
+        state = self._current_state()
+        if state is not None and state.session_loaded:
+            return state.session
+        s = self._get_session(create=False)
+        view = SessionView(s) if s else None
+        if state is not None:
+            state.session = view
+        return view
+
+    def _progress(self) -> ProgressFlags:
+        state = self._current_state()
+        if state is not None and state.progress is not None:
+            return state.progress
+        # Request-local copy, valid until anything writes user state again
+        cached = self._progress_cache
+        pending = db.session.new or db.session.dirty or db.session.deleted
+        if cached is not None and not pending and cached[0] == user_states.generation:
+            return cached[1]
+        flags = ProgressFlags(
+            db.session.query(UserProgress.problem_id, UserProgress.is_completed,
+                             UserProgress.is_skipped, UserProgress.is_revisit)
+            .filter_by(user_id=self.user_id).order_by(UserProgress.id)
+        )
+        if state is not None:
+            state.progress = flags
+        self._progress_cache = (user_states.generation, flags)
+        return flags
+
     def _get_completed_urls(self) -> List[str]:
-        rows = UserProgress.query.filter_by(user_id=self.user_id, is_completed=True).all()
-        return [r.problem_url for r in rows]
+        return self._urls_for_ids(self._progress().completed)
 
     def _get_skipped_urls(self) -> List[str]:
-        rows = UserProgress.query.filter_by(user_id=self.user_id, is_skipped=True).all()
-        return [r.problem_url for r in rows]
+        return self._urls_for_ids(self._progress().skipped)
 
     def _get_revisit_urls(self) -> List[str]:
-        rows = UserProgress.query.filter_by(user_id=self.user_id, is_revisit=True).all()
-        return [r.problem_url for r in rows]
+        return self._urls_for_ids(self._progress().revisit)
 
     def _get_session_problem_urls(self) -> List[str]:
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
+        s = self._session_view()
         if not s:
             return []
-        return [p.problem_url for p in s.session_problems.order_by(UserSessionProblem.position)]
+        return self._urls_for_ids(s.problem_ids)
+
+    def get_session_problems(self) -> List[Dict]:
+        """The current session's problems the user hasn't completed yet, with category and revisit flag."""
+        completed_set = set(self._get_completed_urls())
+        problems = []
+        for url in self._get_session_problem_urls():
+            if url in completed_set:
+                continue
+            difficulty = self._get_difficulty(url)
+            if difficulty:
+                problems.append({
+                    'url': url,
+                    'difficulty': difficulty,
+                    'category': self._get_problem_category(url),
+                    'is_revisit': self.is_in_revisit(url)
+                })
+        return problems
 
     def _can_select_hard_problems(self) -> bool:
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
+        s = self._session_view()
         if not s:
             return False
         return s.easy_completed >= 20 and s.medium_completed >= 3
@@ -458,8 +1010,25 @@ class LeetCodeProblemSelector:
     # ------------------------------------------------------------------
 
     def _get_available_problems(self, difficulty: str) -> List[str]:
-        completed_set = set(self._get_completed_urls())
-        return [p for p in self.difficulty_map[difficulty] if p not in completed_set]
+        progress = self._progress()
+        # The AND settles "nothing left" without a pass over the pool; listing
+        # the rest is cheaper as set lookups than extracting bits (benchmarks/availability.py)
+        if not self._compiled.mask(difficulty) & ~progress.completed_mask:
+            return []
+        completed = progress.completed_set
+        return [problem_table.url(pid) for pid in self._compiled.pool(difficulty) if pid not in completed]
+
+    def _completed_by_difficulty(self) -> Dict[str, int]:
+        """Completed problems of the active set per difficulty."""
+        progress = self._progress()
+        if self._compiled:
+            return {d: (progress.completed_mask & self._compiled.mask(d)).bit_count() for d in DIFFICULTIES}
+        counts = dict.fromkeys(DIFFICULTIES, 0)
+        for url in self._urls_for_ids(progress.completed):
+            difficulty = self._get_difficulty(url)
+            if difficulty in counts:
+                counts[difficulty] += 1
+        return counts
 
     # ------------------------------------------------------------------
     # Session generation
@@ -469,7 +1038,7 @@ class LeetCodeProblemSelector:
         return self.select_problems_custom(20, 8, 2)
 
     def select_problems_custom(self, easy_count=20, medium_count=8, hard_count=2) -> List[Dict]:
-        if not self.problems_data:
+        if not self._compiled:
             return []
 
         selected = []
@@ -496,11 +1065,8 @@ class LeetCodeProblemSelector:
         s.hard_completed = 0
         s.total_completed = 0
         s.generated_at = datetime.utcnow()
-
-        # Replace session problems
-        UserSessionProblem.query.filter_by(session_id=s.id).delete()
-        for i, prob in enumerate(selected):
-            db.session.add(UserSessionProblem(session_id=s.id, problem_url=prob['url'], position=i))
+        s.problem_ids = [self._problem_id(prob['url'], create=True) for prob in selected]
+        self._bump_session(s)
 
         db.session.commit()
         return selected
@@ -510,37 +1076,33 @@ class LeetCodeProblemSelector:
     # ------------------------------------------------------------------
 
     def mark_complete(self, problem_url: str) -> bool:
-        row = self._get_progress_row(problem_url)
-        if row and row.is_completed:
+        problem_url = canonical_url(problem_url)
+        if not problem_url:
             return False
-
         difficulty = self._get_difficulty(problem_url)
         if not difficulty:
             return False
 
-        row = self._get_or_create_progress_row(problem_url)
-        was_skipped = row.is_skipped
-        row.is_completed = True
-        row.is_skipped = False
-        row.completed_at = datetime.utcnow()
+        pid = self._set_progress_flags(problem_url, UserProgress.is_completed.is_(True),
+                                       is_completed=True, is_skipped=False, completed_at=datetime.utcnow())
+        if pid is None:
+            return False
 
-        # Update session stats if problem is in current session
-        session_urls = set(self._get_session_problem_urls())
-        if problem_url in session_urls:
-            s = self._get_session()
-            s.__dict__[f'{difficulty}_completed'] = getattr(s, f'{difficulty}_completed') + 1
-            s.total_completed += 1
+        # It wasn't completed before, so count it if it is in the current session
+        self._count_session_completion(pid, difficulty)
 
         db.session.commit()
         return True
 
     def mark_skip(self, problem_url: str) -> Dict:
-        row = self._get_progress_row(problem_url)
-        if row and (row.is_skipped or row.is_completed):
+        problem_url = canonical_url(problem_url)
+        if not problem_url:
+            return {'success': False, 'replacement': None, 'difficulty': None}
+        pid = self._set_progress_flags(problem_url,
+                                       or_(UserProgress.is_skipped.is_(True), UserProgress.is_completed.is_(True)),
+                                       is_skipped=True)
+        if pid is None:
             return {'success': False, 'replacement': None, 'difficulty': None}
-
-        row = self._get_or_create_progress_row(problem_url)
-        row.is_skipped = True
 
         difficulty = self._get_difficulty(problem_url)
         replacement = None
@@ -551,31 +1113,22 @@ class LeetCodeProblemSelector:
             available = [p for p in available if p != problem_url]
             if available:
                 replacement = random.choice(available)
-
-                # Replace in session
-                s = self._get_session()
-                sp = UserSessionProblem.query.filter_by(
-                    session_id=s.id, problem_url=problem_url
-                ).first()
-                if sp:
-                    sp.problem_url = replacement
+                self._replace_in_session(pid, self._problem_id(replacement, create=True))
 
         db.session.commit()
         return {'success': True, 'replacement': replacement, 'difficulty': difficulty}
 
     def mark_revisit(self, problem_url: str) -> bool:
-        row = self._get_progress_row(problem_url)
-        if row and row.is_revisit:
+        problem_url = canonical_url(problem_url)
+        if not problem_url:
+            return False
+        if self._set_progress_flags(problem_url, UserProgress.is_revisit.is_(True), is_revisit=True) is None:
             return False
-
-        row = self._get_or_create_progress_row(problem_url)
-        row.is_revisit = True
         db.session.commit()
         return True
 
     def is_in_revisit(self, problem_url: str) -> bool:
-        row = self._get_progress_row(problem_url)
-        return bool(row and row.is_revisit)
+        return self._problem_id(problem_url) in self._progress().revisit_set
 
     def is_in_current_session(self, problem_url: str) -> bool:
         return problem_url in set(self._get_session_problem_urls())
@@ -585,35 +1138,32 @@ class LeetCodeProblemSelector:
     # ------------------------------------------------------------------
 
     def _get_difficulty(self, problem_url: str) -> str:
-        if not self.difficulty_map:
+        if not self._compiled:
             # Try cache directly
-            slug = problem_url.rstrip('/').split('/')[-1]
-            return LeetCodeProblemSelector._global_difficulty_cache.get(slug)
-        for diff, problems in self.difficulty_map.items():
-            if problem_url in problems:
-                return diff
-        return None
+            slug = problem_slug(problem_url)
+            return cached_difficulties([slug]).get(slug)
+        pid = problem_table.id(problem_url)
+        if pid is None or pid not in self._compiled:
+            return None
+        return problem_table.difficulty(pid)
 
     def _get_problem_category(self, problem_url: str) -> str:
-        if not self.problems_data:
-            return "Unknown"
-        for category, problems in self.problems_data.items():
-            if problem_url in problems:
-                return category
-        return "Unknown"
+        pid = problem_table.id(problem_url)
+        category = self._compiled.category_of(pid) if self._compiled and pid is not None else None
+        return category or "Unknown"
 
     # ------------------------------------------------------------------
     # Progress / stats
     # ------------------------------------------------------------------
 
     def get_progress(self) -> Dict:
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
+        s = self._session_view()
         session_problems = []
         sess_easy = sess_medium = sess_hard = sess_total = 0
         generated_at = None
 
         if s:
-            session_problems = [p.problem_url for p in s.session_problems.order_by(UserSessionProblem.position)]
+            session_problems = s.problem_ids
             sess_easy = s.easy_completed
             sess_medium = s.medium_completed
             sess_hard = s.hard_completed
@@ -621,28 +1171,20 @@ class LeetCodeProblemSelector:
             generated_at = s.generated_at.strftime('%Y-%m-%d %H:%M:%S') if s.generated_at else None
 
         # Global stats from DB
-        completed_rows = UserProgress.query.filter_by(user_id=self.user_id, is_completed=True).all()
-        global_easy = global_medium = global_hard = 0
-        for row in completed_rows:
-            diff = self._get_difficulty(row.problem_url)
-            if diff == 'easy':
-                global_easy += 1
-            elif diff == 'medium':
-                global_medium += 1
-            elif diff == 'hard':
-                global_hard += 1
+        progress = self._progress()
+        completed = self._completed_by_difficulty()
 
         can_unlock = bool(s and s.easy_completed >= 20 and s.medium_completed >= 3)
 
-        skipped_count = UserProgress.query.filter_by(user_id=self.user_id, is_skipped=True).count()
-        revisit_count = UserProgress.query.filter_by(user_id=self.user_id, is_revisit=True).count()
+        skipped_count = len(progress.skipped)
+        revisit_count = len(progress.revisit)
 
         return {
             'global': {
-                'total': len(completed_rows),
-                'easy': global_easy,
-                'medium': global_medium,
-                'hard': global_hard,
+                'total': len(progress.completed),
+                'easy': completed['easy'],
+                'medium': completed['medium'],
+                'hard': completed['hard'],
             },
             'session': {
                 'total': sess_total,
@@ -661,9 +1203,11 @@ class LeetCodeProblemSelector:
 
     def reset_all_progress(self) -> bool:
         UserProgress.query.filter_by(user_id=self.user_id).delete()
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
+        user_states.touch(db.session, self.user_id)
+        s = self._get_session(create=False)
         if s:
-            UserSessionProblem.query.filter_by(session_id=s.id).delete()
+            s.problem_ids = []
+            self._bump_session(s)
             s.easy_completed = 0
             s.medium_completed = 0
             s.hard_completed = 0
@@ -678,7 +1222,7 @@ class LeetCodeProblemSelector:
         revisit = self._get_revisit_urls()
         session_urls = self._get_session_problem_urls()
 
-        s = UserSession.query.filter_by(user_id=self.user_id).first()
+        s = self._session_view()
         sess_stats = {
             'problems': session_urls,
             'easy_completed': s.easy_completed if s else 0,
@@ -689,9 +1233,7 @@ class LeetCodeProblemSelector:
         }
 
         # Recompute global stats
-        global_easy = sum(1 for u in completed if self._get_difficulty(u) == 'easy')
-        global_medium = sum(1 for u in completed if self._get_difficulty(u) == 'medium')
-        global_hard = sum(1 for u in completed if self._get_difficulty(u) == 'hard')
+        by_difficulty = self._completed_by_difficulty()
 
         return {
             'progress': {
@@ -699,9 +1241,9 @@ class LeetCodeProblemSelector:
                 'skipped': skipped,
                 'revisit': revisit,
                 'global_stats': {
-                    'easy_completed': global_easy,
-                    'medium_completed': global_medium,
-                    'hard_completed': global_hard,
+                    'easy_completed': by_difficulty['easy'],
+                    'medium_completed': by_difficulty['medium'],
+                    'hard_completed': by_difficulty['hard'],
                     'total_completed': len(completed)
                 },
                 'current_session': sess_stats
@@ -720,12 +1262,35 @@ class LeetCodeProblemSelector:
             if not all(k in p for k in required_keys):
                 return False
 
+            p = dict(p)
+            for key in ('completed', 'skipped', 'revisit'):
+                p[key] = [canonical_url(u) for u in p[key]]
+            imported_session = [canonical_url(u) for u in p['current_session'].get('problems', [])]
+
             existing_completed = set(self._get_completed_urls())
             all_completed = existing_completed | set(p['completed'])
 
+            problem_ids = resolve_problem_ids(
+                all_completed | set(p['skipped']) | set(p['revisit']) | set(imported_session)
+            )
+
+            # Load every existing progress row once instead of querying per URL
+            rows_by_problem = {r.problem_id: r for r in UserProgress.query.filter_by(user_id=self.user_id)}
+            new_rows: List[UserProgress] = []
+
+            def progress_row(url):
+                pid = problem_ids[url]
+                row = rows_by_problem.get(pid)
+                if row is None:
+                    row = rows_by_problem[pid] = UserProgress(user_id=self.user_id, problem_id=pid,
+                                                              is_completed=False, is_skipped=False,
+                                                              is_revisit=False)
+                    new_rows.append(row)
+                return row
+
             # Upsert completed
             for url in all_completed:
-                row = self._get_or_create_progress_row(url)
+                row = progress_row(url)
                 row.is_completed = True
                 if not row.completed_at:
                     row.completed_at = datetime.utcnow()
@@ -733,17 +1298,20 @@ class LeetCodeProblemSelector:
             # Upsert skipped (only if not completed)
             for url in p['skipped']:
                 if url not in all_completed:
-                    row = self._get_or_create_progress_row(url)
-                    row.is_skipped = True
+                    progress_row(url).is_skipped = True
 
             # Upsert revisit
             for url in p['revisit']:
-                row = self._get_or_create_progress_row(url)
-                row.is_revisit = True
+                progress_row(url).is_revisit = True
+
+            # New rows go in as one executemany; bulk writes skip the flush
+            # hooks, so record the state change explicitly
+            if new_rows:
+                db.session.bulk_save_objects(new_rows)
+                user_states.touch(db.session, self.user_id)
 
             # Import session (remove already-completed)
-            session_problems = [u for u in p['current_session'].get('problems', [])
-                                 if u not in all_completed]
+            session_problems = [u for u in imported_session if u not in all_completed]
 
             s = self._get_session()
             s.easy_completed = 0
@@ -751,9 +1319,8 @@ class LeetCodeProblemSelector:
             s.hard_completed = 0
             s.total_completed = 0
             s.generated_at = datetime.utcnow()
-            UserSessionProblem.query.filter_by(session_id=s.id).delete()
-            for i, url in enumerate(session_problems):
-                db.session.add(UserSessionProblem(session_id=s.id, problem_url=url, position=i))
+            s.problem_ids = [problem_ids[url] for url in session_problems]
+            self._bump_session(s)
 
             db.session.commit()
             return True
@@ -772,7 +1339,33 @@ class LeetCodeProblemSelector:
 def get_selector():
     if not current_user.is_authenticated:
         return None
-    return LeetCodeProblemSelector(current_user.id)
+    user = current_user._get_current_object()
+    return LeetCodeProblemSelector(user.id, state=user if isinstance(user, UserState) else None)
+
+
+# ---------------------------------------------------------------------------
+# Live updates
+# ---------------------------------------------------------------------------
+
+def publish_update(selector, event: str, progress: Optional[Dict] = None, **data):
+    """Push a committed change, with the user's progress after it, to their open /api/events streams.
+
+    origin is the X-Client-Id of the page that made the change, which has
+    already applied it; progress is reused when the caller computed it.
+    """
+    if not event_broker.may_deliver(selector.user_id):
+        return
+    event_broker.publish(selector.user_id, event, {
+        **data,
+        'origin': request.headers.get('X-Client-Id'),
+        'progress': progress or selector.get_progress(),
+        'set_progress': selector.get_active_set_progress(),
+    })
+
+
+def wants_progress() -> bool:
+    """Mark responses carry get_progress() unless the page gets it from its event stream."""
+    return not (request.is_json and request.json.get('progress') is False)
 
 
 # ---------------------------------------------------------------------------
@@ -805,7 +1398,10 @@ def api_register():
     if len(password) < 6:
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters'})
 
-    user, error = create_user(username, email, password)
+    try:
+        user, error = create_user(username, email, password)
+    except HasherBusy:
+        return hasher_busy_response()
     if error:
         return jsonify({'success': False, 'message': error})
 
@@ -821,7 +1417,10 @@ def api_login():
     password = data.get('password', '')
     remember = data.get('remember', True)
 
-    user = verify_password(username, password)
+    try:
+        user = verify_password(username, password)
+    except HasherBusy:
+        return hasher_busy_response()
     if user:
         login_user(user, remember=remember)
         if remember:
@@ -867,6 +1466,8 @@ def problem_sets_page():
 
 @app.route('/api/load_problems', methods=['POST'])
 @login_required
+@rate_limit(per_minute=10, burst=3)
+@idempotent
 def load_problems():
     selector = get_selector()
     if not selector:
@@ -879,7 +1480,7 @@ def load_problems():
             if file.filename == '':
                 return jsonify({'success': False, 'message': 'No file selected'})
             if file and file.filename.endswith('.json'):
-                problems_json = file.read().decode('utf-8')
+                problems_json = file.stream
         elif 'json_text' in request.form:
             problems_json = request.form['json_text']
         else:
@@ -891,6 +1492,8 @@ def load_problems():
         if selector.load_problems(problems_json):
             return jsonify({'success': True, 'message': 'Problems loaded successfully!'})
         return jsonify({'success': False, 'message': 'Invalid JSON format or error processing problems'})
+    except UploadError as e:
+        return jsonify({'success': False, 'message': str(e)})
     except Exception as e:
         print(f"Error in load_problems route: {e}")
         import traceback
@@ -898,8 +1501,47 @@ def load_problems():
         return jsonify({'success': False, 'message': str(e)})
 
 
+@app.route('/api/bootstrap', methods=['GET'])
+@login_required
+@replica_read
+def bootstrap():
+    """Everything the main page renders on load, from one selector and one progress snapshot."""
+    selector = get_selector()
+    if not selector:
+        return jsonify({'success': False, 'message': 'User session error'})
+
+    loaded = selector.has_problems_loaded()
+    has_session = len(selector._get_session_problem_urls()) > 0
+    return jsonify({
+        'success': True,
+        'user': {'authenticated': True, 'username': current_user.username, 'email': current_user.email},
+        'loaded': loaded,
+        'has_session': has_session,
+        'active_set': selector.get_active_set_summary(),
+        'problems': selector.get_session_problems() if loaded and has_session else [],
+        'progress': selector.get_progress(),
+    })
+
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+def stream_events():
+    """Server-Sent Events stream of the user's changes, from any tab or device (see events.py)."""
+    subscription = event_broker.subscribe(current_user.id)
+    if subscription is None:
+        return jsonify({'success': False, 'message': 'Live updates unavailable'}), 503
+    # Nothing below touches the database; don't hold a connection for the stream's lifetime
+    db.session.remove()
+    response = Response(event_broker.stream(subscription), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also covers a client that leaves before the stream's first chunk
+    response.call_on_close(lambda: event_broker.unsubscribe(subscription))
+    return response
+
+
 @app.route('/api/check_problems', methods=['GET'])
 @login_required
+@replica_read
 def check_problems():
     selector = get_selector()
     if not selector:
@@ -912,12 +1554,14 @@ def check_problems():
 
 @app.route('/api/generate', methods=['POST'])
 @login_required
+@rate_limit(per_minute=30, burst=5)
+@idempotent
 def generate_problems():
     selector = get_selector()
     if not selector:
         return jsonify({'success': False, 'message': 'User session error'})
 
-    if not selector.problems_data:
+    if not selector._compiled:
         return jsonify({'success': False, 'message': 'Please load problems first'})
 
     force_new = request.json.get('force_new', False) if request.is_json else False
@@ -928,69 +1572,76 @@ def generate_problems():
     session_urls = selector._get_session_problem_urls()
 
     if not force_new and session_urls:
-        completed_set = set(selector._get_completed_urls())
-        problems = []
-        for url in session_urls:
-            if url in completed_set:
-                continue
-            difficulty = selector._get_difficulty(url)
-            if difficulty:
-                problems.append({
-                    'url': url,
-                    'difficulty': difficulty,
-                    'category': selector._get_problem_category(url),
-                    'is_revisit': selector.is_in_revisit(url)
-                })
-        return jsonify({'success': True, 'problems': problems, 'existing_session': True})
+        return jsonify({'success': True, 'problems': selector.get_session_problems(), 'existing_session': True})
 
     problems = selector.select_problems_custom(easy_count, medium_count, hard_count)
     for problem in problems:
         problem['is_revisit'] = selector.is_in_revisit(problem['url'])
         problem['category'] = selector._get_problem_category(problem['url'])
 
+    publish_update(selector, 'session', problems=problems)
     return jsonify({'success': True, 'problems': problems, 'existing_session': False})
 
 
 @app.route('/api/mark_complete', methods=['POST'])
 @login_required
+@rate_limit(per_minute=120, burst=20)
+@idempotent
 def mark_complete():
     selector = get_selector()
     url = request.json.get('url')
     if selector.mark_complete(url):
-        return jsonify({'success': True, 'progress': selector.get_progress()})
+        response_data = {'success': True}
+        if wants_progress():
+            response_data['progress'] = selector.get_progress()
+        publish_update(selector, 'problem', response_data.get('progress'), url=canonical_url(url), status='completed')
+        return jsonify(response_data)
     return jsonify({'success': False, 'message': 'Problem already completed'})
 
 
 @app.route('/api/mark_skip', methods=['POST'])
 @login_required
+@rate_limit(per_minute=120, burst=20)
+@idempotent
 def mark_skip():
     selector = get_selector()
     url = request.json.get('url')
     result = selector.mark_skip(url)
     if result['success']:
-        response_data = {'success': True, 'progress': selector.get_progress()}
+        response_data = {'success': True}
+        if wants_progress():
+            response_data['progress'] = selector.get_progress()
         if result['replacement']:
             response_data['replacement'] = {
                 'url': result['replacement'],
                 'difficulty': result['difficulty'],
                 'is_revisit': selector.is_in_revisit(result['replacement'])
             }
+        publish_update(selector, 'problem', response_data.get('progress'), url=canonical_url(url), status='skipped',
+                       replacement=response_data.get('replacement'))
         return jsonify(response_data)
     return jsonify({'success': False, 'message': 'Could not skip problem'})
 
 
 @app.route('/api/mark_revisit', methods=['POST'])
 @login_required
+@rate_limit(per_minute=120, burst=20)
+@idempotent
 def mark_revisit():
     selector = get_selector()
     url = request.json.get('url')
     if selector.mark_revisit(url):
-        return jsonify({'success': True, 'progress': selector.get_progress()})
+        response_data = {'success': True}
+        if wants_progress():
+            response_data['progress'] = selector.get_progress()
+        publish_update(selector, 'problem', response_data.get('progress'), url=canonical_url(url), status='revisit')
+        return jsonify(response_data)
     return jsonify({'success': False, 'message': 'Could not mark for revisit'})
 
 
 @app.route('/api/progress', methods=['GET'])
 @login_required
+@replica_read
 def get_progress():
     selector = get_selector()
     return jsonify(selector.get_progress())
@@ -998,6 +1649,7 @@ def get_progress():
 
 @app.route('/api/lists/<list_type>', methods=['GET'])
 @login_required
+@replica_read
 def get_list(list_type):
     selector = get_selector()
     if list_type == 'skipped':
@@ -1022,6 +1674,7 @@ def get_list(list_type):
 
 @app.route('/api/lists/<list_type>/<difficulty>', methods=['GET'])
 @login_required
+@replica_read
 def get_list_by_difficulty(list_type, difficulty):
     selector = get_selector()
     if list_type == 'skipped':
@@ -1044,6 +1697,7 @@ def get_list_by_difficulty(list_type, difficulty):
 
 @app.route('/api/completed/<scope>/<difficulty>', methods=['GET'])
 @login_required
+@replica_read
 def get_completed(scope, difficulty):
     selector = get_selector()
     completed_urls = selector._get_completed_urls()
@@ -1067,15 +1721,19 @@ def get_completed(scope, difficulty):
 
 @app.route('/api/reset_progress', methods=['POST'])
 @login_required
+@rate_limit(per_minute=10, burst=3)
+@idempotent
 def reset_progress():
     selector = get_selector()
     if selector.reset_all_progress():
+        publish_update(selector, 'session', problems=[])
         return jsonify({'success': True, 'message': 'All progress has been reset'})
     return jsonify({'success': False, 'message': 'Failed to reset progress'})
 
 
 @app.route('/api/export_progress', methods=['GET'])
 @login_required
+@replica_read
 def export_progress():
     selector = get_selector()
     return jsonify(selector.export_progress())
@@ -1083,10 +1741,13 @@ def export_progress():
 
 @app.route('/api/import_progress', methods=['POST'])
 @login_required
+@rate_limit(per_minute=10, burst=3)
+@idempotent
 def import_progress():
     selector = get_selector()
     try:
         if selector.import_progress(request.json):
+            publish_update(selector, 'session', problems=selector.get_session_problems())
             return jsonify({'success': True, 'message': 'Progress imported successfully!'})
         return jsonify({'success': False, 'message': 'Invalid progress data format'})
     except Exception as e:
@@ -1099,6 +1760,7 @@ def import_progress():
 
 @app.route('/api/problem_sets', methods=['GET'])
 @login_required
+@replica_read
 def get_problem_sets():
     selector = get_selector()
     return jsonify({'success': True, 'sets': selector.get_problem_sets()})
@@ -1106,18 +1768,29 @@ def get_problem_sets():
 
 @app.route('/api/problem_sets', methods=['POST'])
 @login_required
+@rate_limit(per_minute=10, burst=3)
+@idempotent
 def create_problem_set():
     selector = get_selector()
-    data = request.json
+    if 'file' in request.files:
+        # Multipart upload: the file is parsed as a stream
+        data = request.form
+        problems_json = request.files['file'].stream
+        is_public = data.get('is_public', 'false').lower() in ('1', 'true', 'on')
+    else:
+        data = request.json
+        problems_json = data.get('problems_json')
+        is_public = data.get('is_public', False)
     name = data.get('name')
     description = data.get('description', '')
-    problems_json = data.get('problems_json')
-    is_public = data.get('is_public', False)
 
     if not name or not problems_json:
         return jsonify({'success': False, 'message': 'Name and problems data are required'})
 
-    set_id = selector.create_problem_set(name, description, problems_json, is_public)
+    try:
+        set_id = selector.create_problem_set(name, description, problems_json, is_public)
+    except UploadError as e:
+        return jsonify({'success': False, 'message': str(e)})
     if set_id:
         return jsonify({'success': True, 'set_id': set_id, 'message': f'Problem set "{name}" created successfully!'})
     return jsonify({'success': False, 'message': 'Failed to create problem set'})
@@ -1125,6 +1798,7 @@ def create_problem_set():
 
 @app.route('/api/problem_sets/<set_id>/activate', methods=['POST'])
 @login_required
+@rate_limit(per_minute=30, burst=10)
 def activate_problem_set(set_id):
     selector = get_selector()
     if selector.set_active_problem_set(set_id):
@@ -1134,6 +1808,7 @@ def activate_problem_set(set_id):
 
 @app.route('/api/problem_sets/<set_id>', methods=['DELETE'])
 @login_required
+@rate_limit(per_minute=10, burst=3)
 def delete_problem_set(set_id):
     selector = get_selector()
     if selector.delete_problem_set(set_id):
@@ -1141,8 +1816,34 @@ def delete_problem_set(set_id):
     return jsonify({'success': False, 'message': 'Failed to delete problem set or set does not exist'})
 
 
+@app.route('/api/problem_sets/<set_id>', methods=['PUT'])
+@login_required
+@rate_limit(per_minute=10, burst=3)
+@idempotent
+def update_problem_set(set_id):
+    selector = get_selector()
+    if 'file' in request.files:
+        data = request.form
+        problems_json = request.files['file'].stream
+    else:
+        data = request.json
+        problems_json = data.get('problems_json')
+
+    if not problems_json:
+        return jsonify({'success': False, 'message': 'Problems data is required'})
+
+    try:
+        changes = selector.update_problem_set(set_id, problems_json, data.get('name'), data.get('description'))
+    except UploadError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    if changes is None:
+        return jsonify({'success': False, 'message': 'Failed to update problem set or set does not exist'})
+    return jsonify({'success': True, 'message': 'Problem set updated successfully!', **changes})
+
+
 @app.route('/api/problem_sets/<set_id>/export', methods=['GET'])
 @login_required
+@replica_read
 def export_problem_set(set_id):
     selector = get_selector()
     set_data = selector.export_problem_set(set_id)
@@ -1153,30 +1854,34 @@ def export_problem_set(set_id):
 
 @app.route('/api/problem_sets/<set_id>/stats', methods=['GET'])
 @login_required
+@replica_read
 def get_problem_set_stats(set_id):
     selector = get_selector()
     if not selector._load_problem_set_by_id(set_id):
         return jsonify({'success': False, 'message': 'Problem set not found'})
 
-    all_problems = [url for urls in selector.problems_data.values() for url in urls]
-    completed_set = set(selector._get_completed_urls())
+    compiled = selector._compiled
+    progress = selector._progress()
+    total = compiled.mask().bit_count()
+    completed = (progress.completed_mask & compiled.mask()).bit_count()
+    # The lists need ids in set order; each problem is listed once, as it is counted
+    completed_problems, pending_problems = [], []
+    for pid in dict.fromkeys(compiled.ids):
+        (completed_problems if pid in progress.completed_set else pending_problems).append(pid)
 
-    completed_problems = [p for p in all_problems if p in completed_set]
-    pending_problems = [p for p in all_problems if p not in completed_set]
-
-    def enrich(url):
+    def enrich(pid):
         return {
-            'url': url,
-            'difficulty': selector._get_difficulty(url),
-            'category': selector._get_problem_category(url),
-            'is_revisit': selector.is_in_revisit(url)
+            'url': problem_table.url(pid),
+            'difficulty': problem_table.difficulty(pid),
+            'category': compiled.category_of(pid),
+            'is_revisit': pid in progress.revisit_set
         }
 
     return jsonify({
         'success': True,
-        'total': len(all_problems),
-        'completed': len(completed_problems),
-        'pending': len(pending_problems),
+        'total': total,
+        'completed': completed,
+        'pending': total - completed,
         'completed_problems': [enrich(u) for u in completed_problems],
         'pending_problems': [enrich(u) for u in pending_problems]
     })
@@ -1231,29 +1936,29 @@ def search_problem_sets_api():
 
 @app.route('/api/problem_set_details/<set_id>', methods=['GET'])
 @login_required
+@replica_read
 def get_problem_set_details(set_id):
     selector = get_selector()
     if not selector._load_problem_set_by_id(set_id):
         return jsonify({'success': False, 'error': 'Problem set not found'}), 404
 
     try:
-        difficulty_counts = {'Easy': 0, 'Medium': 0, 'Hard': 0}
+        compiled = selector._compiled
+        progress = selector._progress()
+        # Distinct problems per difficulty; the listing below repeats a problem under each of its categories
+        difficulty_counts = {d.capitalize(): compiled.mask(d).bit_count() for d in DIFFICULTIES}
         all_problems = []
-        completed_set = set(selector._get_completed_urls())
 
-        for category, problems in selector.problems_data.items():
-            for url in problems:
-                difficulty = selector._get_difficulty(url)
+        for category, ids in compiled.by_category():
+            for pid in ids:
+                difficulty = problem_table.difficulty(pid)
                 if difficulty:
-                    key = difficulty.capitalize()
-                    if key in difficulty_counts:
-                        difficulty_counts[key] += 1
                     all_problems.append({
-                        'url': url,
+                        'url': problem_table.url(pid),
                         'category': category,
-                        'difficulty': key,
-                        'completed': url in completed_set,
-                        'is_revisit': selector.is_in_revisit(url)
+                        'difficulty': difficulty.capitalize(),
+                        'completed': pid in progress.completed_set,
+                        'is_revisit': pid in progress.revisit_set
                     })
 
         return jsonify({
@@ -1300,17 +2005,7 @@ def seed_public_problem_sets():
             )
             db.session.add(ps)
             db.session.flush()
-
-            position = 0
-            for category, urls in data['problems'].items():
-                for url in urls:
-                    db.session.add(ProblemSetProblem(
-                        problem_set_id=ps.id,
-                        category=category,
-                        problem_url=url,
-                        position=position
-                    ))
-                    position += 1
+            add_problem_set_rows(ps, data['problems'])
 
             db.session.commit()
             print(f"Seeded public problem set: {data['name']}")
@@ -1320,9 +2015,34 @@ def seed_public_problem_sets():
 
 
 with app.app_context():
-    db.create_all()
+    db.create_all(bind_key=None)  # the primary only; replicas get their schema by replication
     seed_public_problem_sets()
 
 
+def warm_caches():
+    """Compile every public set, with its difficulties, into this process's caches."""
+    with app.app_context():
+        selector = LeetCodeProblemSelector(user_id=None)
+        sets = db.session.query(ProblemSet.set_id, ProblemSet.version).filter_by(is_public=True).all()
+        for set_id, version in sets:
+            selector._load_problem_set_by_id(set_id, version)
+        print(f"Warmed caches with {len(sets)} public problem sets")
+
+
+def create_app(preload: bool = True):
+    """WSGI entry point used by gunicorn.conf.py.
+
+    The app is built at import. With preload (in the gunicorn master, before
+    fork) the caches are warmed first and pooled DB connections closed, so
+    workers share the warm pages copy-on-write and open their own connections.
+    """
+    if preload:
+        warm_caches()
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+    return app
+
+
 if __name__ == '__main__':
     app.run(debug=True, port=3000)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks: set-based vs bitset availability and completion math.
+
+For synthetic problem sets of several sizes and completion ratios, times
+the three operations the selector performs, the previous way (lists of
+ids checked against a Python set) and with bitsets (bitsets.py):
+
+    available    problems of one difficulty the user hasn't completed
+    by_diff      the user's completed problems per difficulty
+    completed    how many of the set's problems the user has completed
+
+plus the one-off cost of building the user's completed bitset, which is
+paid once per progress snapshot (as is building the completed set).
+
+Usage:
+    python benchmarks/availability.py --output availability.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import bitsets  # noqa: E402
+from e2e import git_commit  # noqa: E402
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+def build_case(set_size, max_id, completed_ratio, rng):
+    ids = rng.sample(range(1, max_id + 1), set_size)
+    url = {pid: f"https://leetcode.com/problems/problem-{pid}/" for pid in range(1, max_id + 1)}
+    difficulty = {pid: rng.choice(DIFFICULTIES) for pid in ids}
+    # The user's progress covers problems from other sets too
+    completed = rng.sample(ids, int(set_size * completed_ratio)) + \
+        rng.sample(range(1, max_id + 1), int(set_size * completed_ratio / 2))
+    completed = list(dict.fromkeys(completed))
+    return ids, url, difficulty, completed
+
+
+def measure(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def run_case(set_size, max_id, completed_ratio, rng, number):
+    ids, url, difficulty, completed = build_case(set_size, max_id, completed_ratio, rng)
+
+    # Set-based: id pools per difficulty, checked against the user's set of
+    # completed ids (built once per progress snapshot, like ProgressFlags.completed_set)
+    pools = {d: [p for p in ids if difficulty[p] == d] for d in DIFFICULTIES}
+    in_set = set(ids)
+    completed_set = set(completed)
+
+    def sets_available():
+        return [url[p] for p in pools['medium'] if p not in completed_set]
+
+    def sets_by_difficulty():
+        counts = dict.fromkeys(DIFFICULTIES, 0)
+        for p in completed:
+            if p in in_set:
+                counts[difficulty[p]] += 1
+        return counts
+
+    def sets_completed():
+        return sum(1 for p in ids if p in completed_set)
+
+    # Bitsets: one mask per difficulty for the set, one for the user's completed problems
+    masks = {d: bitsets.from_ids(p for p in ids if difficulty[p] == d) for d in DIFFICULTIES}
+    set_mask = bitsets.from_ids(ids)
+    completed_mask = bitsets.from_ids(completed)
+
+    def bits_available():
+        return [url[p] for p in bitsets.to_ids(masks['medium'] & ~completed_mask)]
+
+    def bits_by_difficulty():
+        return {d: (completed_mask & masks[d]).bit_count() for d in DIFFICULTIES}
+
+    def bits_completed():
+        return (completed_mask & set_mask).bit_count()
+
+    assert sorted(sets_available()) == sorted(bits_available())
+    assert sets_by_difficulty() == bits_by_difficulty()
+    assert sets_completed() == bits_completed()
+
+    result = {'set_size': set_size, 'max_id': max_id, 'completed_ratio': completed_ratio,
+              'completed': len(completed),
+              'build_completed_mask_us': round(measure(lambda: bitsets.from_ids(completed), number), 2)}
+    for name, old, new in (('available', sets_available, bits_available),
+                           ('by_diff', sets_by_difficulty, bits_by_difficulty),
+                           ('completed', sets_completed, bits_completed)):
+        old_us, new_us = measure(old, number), measure(new, number)
+        result[name] = {'sets_us': round(old_us, 2), 'bitsets_us': round(new_us, 2),
+                        'speedup': round(old_us / new_us, 1)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='150,1000,3000', help='Comma-separated set sizes')
+    parser.add_argument('--max-id', type=int, default=4000, help='Highest problem id (bitset width)')
+    parser.add_argument('--ratios', default='0.1,0.5,0.9', help='Comma-separated completed ratios')
+    parser.add_argument('--number', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    print(f"{'size':>6}{'done':>6}{'mask us':>9}  {'available us':>22}  {'by_diff us':>22}  {'completed us':>22}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        for ratio in (float(r) for r in args.ratios.split(',')):
+            r = run_case(size, max(args.max_id, size), ratio, rng, args.number)
+            results.append(r)
+            cells = '  '.join(f"{r[k]['sets_us']:>9.1f} ->{r[k]['bitsets_us']:>7.1f} x{r[k]['speedup']:<4}"
+                              for k in ('available', 'by_diff', 'completed'))
+            print(f"{size:>6}{ratio:>6}{r['build_completed_mask_us']:>9.1f}  {cells}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'timestamp': datetime.utcnow().isoformat() + 'Z',
+                       'results': results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare database backends on the same concurrent workload.
+
+Runs benchmarks/load_test.py once per backend with identical load
+arguments and prints throughput, error rate and per-step latency side by
+side:
+
+    sqlite           temporary SQLite file with the default tuning
+                     (WAL, synchronous=NORMAL, busy timeout, mmap)
+    sqlite-untuned   the same with SQLite's own defaults (rollback journal,
+                     synchronous=FULL, no busy timeout, no mmap)
+    postgresql       --postgres-url, when given (it is written to)
+
+Usage:
+    python benchmarks/compare_backends.py --postgres-url postgresql://... --output compare.json
+    python benchmarks/compare_backends.py --backends sqlite,sqlite-untuned -- --users 50 --workers 4
+
+Arguments after -- are passed to every load_test.py run.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+UNTUNED_SQLITE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT_MS': '0',
+    'SQLITE_MMAP_SIZE': '0',
+}
+
+
+def run_load_test(backend, args, load_args, output):
+    env = dict(os.environ)
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'load_test.py'), '--label', backend, '--output', output]
+    if backend == 'postgresql':
+        cmd += ['--database-url', args.postgres_url]
+    elif backend == 'sqlite-untuned':
+        env.update(UNTUNED_SQLITE)
+    print(f"\n=== {backend} ===", flush=True)
+    subprocess.run(cmd + load_args, env=env, check=True)
+    with open(output) as f:
+        return json.load(f)
+
+
+def main():
+    argv = sys.argv[1:]
+    load_args = argv[argv.index('--') + 1:] if '--' in argv else []
+    argv = argv[:argv.index('--')] if '--' in argv else argv
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres-url')
+    parser.add_argument('--backends', help='Comma-separated; default: sqlite, sqlite-untuned, '
+                                           'plus postgresql when --postgres-url is given')
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(',') if args.backends else \
+        ['sqlite', 'sqlite-untuned'] + (['postgresql'] if args.postgres_url else [])
+    if 'postgresql' in backends and not args.postgres_url:
+        parser.error('postgresql needs --postgres-url')
+
+    reports = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            reports[backend] = run_load_test(backend, args, load_args, os.path.join(tmp, f"{backend}.json"))
+
+    print(f"\n{'':<26}" + ''.join(f"{b:>18}" for b in backends))
+    print(f"{'req/s':<26}" + ''.join(f"{reports[b]['overall'].get('throughput_rps'):>18}" for b in backends))
+    print(f"{'error %':<26}" + ''.join(f"{reports[b]['overall'].get('error_rate', 0) * 100:>18.2f}" for b in backends))
+    steps = sorted({s for r in reports.values() for s in r['steps']})
+    for step in steps:
+        cells = []
+        for b in backends:
+            r = reports[b]['steps'].get(step)
+            cells.append(f"{r['p50_ms']:>8.1f}/{r['p95_ms']:<9.1f}" if r else f"{'-':>18}")
+        print(f"{step + ' p50/p95 ms':<26}" + ''.join(cells))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the main user flows, with a fake LeetCode upstream.
+
+Starts benchmarks/fake_leetcode.py in-process, points the app at it through
+LEETCODE_GRAPHQL_URL, seeds a database from problem_sets/public plus
+synthetic users with realistic progress sizes, then times each scenario
+through the Flask test client:
+
+    cold_activate   activate a public set with empty process caches and no
+                    cached difficulties (every problem goes upstream)
+    warm_activate   activate a public set with caches filled
+    generate        POST /api/generate with force_new
+    mark_complete / mark_skip / mark_revisit
+    details         GET /api/problem_set_details/<set_id>
+    export, import  progress export / re-import of the same payload
+    search          POST /api/search_problem_sets
+
+Usage:
+    python benchmarks/e2e.py --label my-branch --output bench_e2e.json
+    python benchmarks/e2e.py --latency-ms 80 --error-rate 0.05 --iterations 100
+
+Defaults to a temporary SQLite database; pass --database-url to use an empty
+PostgreSQL database instead (it is written to). Reports throughput and
+p50/p95/p99 latency per scenario and writes them as JSON so runs can be
+compared across commits.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_leetcode import start_server  # noqa: E402
+
+SCENARIOS = ['cold_activate', 'warm_activate', 'generate', 'mark_complete', 'mark_skip', 'mark_revisit',
+             'details', 'export', 'import', 'search']
+SEARCH_QUERIES = ['neet', 'graph', 'dynamic', 'google', 'tree', 'sliding window', 'xyz']
+PASSWORD = 'bench-password'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms, errors, rejected):
+    latencies_ms = sorted(latencies_ms)
+    total_s = sum(latencies_ms) / 1000
+    return {
+        'count': len(latencies_ms),
+        'errors': errors,
+        'rejected': rejected,
+        'throughput_rps': round(len(latencies_ms) / total_s, 2) if total_s else None,
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else None,
+        'p50_ms': round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+        'p95_ms': round(percentile(latencies_ms, 95), 3) if latencies_ms else None,
+        'p99_ms': round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+        'max_ms': round(latencies_ms[-1], 3) if latencies_ms else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed_users(app, db, progress_sizes, rng):
+    """Create one synthetic user per progress size with that many progress rows."""
+    from sqlalchemy import insert
+    from app import create_user
+    from models import Problem, UserProgress
+
+    users = []
+    with app.app_context():
+        problem_ids = [pid for (pid,) in db.session.query(Problem.id).order_by(Problem.id)]
+        for i, size in enumerate(progress_sizes):
+            username = f"bench_{i}_{size}"
+            user, error = create_user(username, f"{username}@example.com", PASSWORD)
+            if error:
+                raise SystemExit(f"Could not create {username}: {error} (use an empty database)")
+
+            rows = []
+            for pid in rng.sample(problem_ids, min(size, len(problem_ids))):
+                roll = rng.random()
+                rows.append({
+                    'user_id': user.id, 'problem_id': pid,
+                    'is_completed': roll < 0.8, 'is_skipped': 0.8 <= roll < 0.9, 'is_revisit': roll >= 0.9,
+                    'completed_at': datetime.utcnow() if roll < 0.8 else None,
+                })
+            if rows:
+                db.session.execute(insert(UserProgress), rows)
+            db.session.commit()
+            users.append({'username': username, 'progress_size': size})
+    return users
+
+
+def drop_caches(app, db, set_id):
+    """Empty the per-process caches and forget every difficulty known for the set."""
+    from app import LeetCodeProblemSelector, problem_table
+    from models import DifficultyCache, Problem, ProblemSet, ProblemSetProblem
+    from problem_urls import problem_slug
+
+    with app.app_context():
+        rows = db.session.query(Problem.id, Problem.url) \
+            .join(ProblemSetProblem, ProblemSetProblem.problem_id == Problem.id) \
+            .join(ProblemSet, ProblemSet.id == ProblemSetProblem.problem_set_id) \
+            .filter(ProblemSet.set_id == set_id).all()
+        for i in range(0, len(rows), 500):
+            chunk = rows[i:i + 500]
+            DifficultyCache.query.filter(DifficultyCache.problem_slug.in_([problem_slug(url) for _, url in chunk])) \
+                .delete(synchronize_session=False)
+            Problem.query.filter(Problem.id.in_([pid for pid, _ in chunk])) \
+                .update({Problem.difficulty: None}, synchronize_session=False)
+        db.session.commit()
+    LeetCodeProblemSelector._compiled_sets.clear()
+    LeetCodeProblemSelector._difficulty_cache.clear()
+    problem_table.clear()
+
+
+class Bench:
+    def __init__(self, app, db, users, set_ids):
+        self.app = app
+        self.db = db
+        self.users = users
+        self.set_ids = set_ids
+        self.clients = []
+        self.queues = []
+        self.exports = []
+        self.warmed_sets = set()
+        for user in users:
+            client = app.test_client()
+            response = client.post('/api/login', json={'username': user['username'], 'password': PASSWORD})
+            if not response.get_json().get('success'):
+                raise SystemExit(f"Login failed for {user['username']}")
+            client.post(f"/api/problem_sets/{set_ids[0]}/activate")
+            self.clients.append(client)
+            self.queues.append([])
+            self.exports.append(None)
+
+    def next_url(self, u):
+        """A problem from user u's current session, generating a new one when it runs out."""
+        if not self.queues[u]:
+            body = self.clients[u].post('/api/generate', json={'force_new': True}).get_json() or {}
+            self.queues[u] = [p['url'] for p in body.get('problems', [])]
+        return self.queues[u].pop() if self.queues[u] else None
+
+    # Each scenario: prepare(i) runs untimed, op(i) is timed and returns a response
+    def scenario(self, name):
+        users = len(self.clients)
+
+        def user(i):
+            return i % users
+
+        def set_id(i):
+            return self.set_ids[i % len(self.set_ids)]
+
+        pending = {}
+
+        def prepare_mark(i):
+            pending['url'] = self.next_url(user(i))
+
+        def prepare_warm(i):
+            if set_id(i) not in self.warmed_sets:
+                self.clients[user(i)].post(f"/api/problem_sets/{set_id(i)}/activate")
+                self.warmed_sets.add(set_id(i))
+
+        def prepare_import(i):
+            u = user(i)
+            if self.exports[u] is None:
+                self.exports[u] = self.clients[u].get('/api/export_progress').get_json()
+
+        return {
+            'cold_activate': (lambda i: drop_caches(self.app, self.db, set_id(i)),
+                              lambda i: self.clients[user(i)].post(f"/api/problem_sets/{set_id(i)}/activate")),
+            'warm_activate': (prepare_warm, lambda i: self.clients[user(i)].post(f"/api/problem_sets/{set_id(i)}/activate")),
+            'generate': (None, lambda i: self.clients[user(i)].post('/api/generate', json={'force_new': True})),
+            'mark_complete': (prepare_mark, lambda i: self.clients[user(i)].post(
+                '/api/mark_complete', json={'url': pending['url']})),
+            'mark_skip': (prepare_mark, lambda i: self.clients[user(i)].post(
+                '/api/mark_skip', json={'url': pending['url']})),
+            'mark_revisit': (prepare_mark, lambda i: self.clients[user(i)].post(
+                '/api/mark_revisit', json={'url': pending['url']})),
+            'details': (prepare_warm, lambda i: self.clients[user(i)].get(f"/api/problem_set_details/{set_id(i)}")),
+            'export': (None, lambda i: self.clients[user(i)].get('/api/export_progress')),
+            'import': (prepare_import, lambda i: self.clients[user(i)].post(
+                '/api/import_progress', json=self.exports[user(i)])),
+            'search': (None, lambda i: self.clients[user(i)].post(
+                '/api/search_problem_sets', json={'query': SEARCH_QUERIES[i % len(SEARCH_QUERIES)]})),
+        }[name]
+
+    def run(self, name, iterations):
+        prepare, op = self.scenario(name)
+        # errors: HTTP 4xx/5xx; rejected: the app answered success=false
+        # (e.g. marking a problem that is already on the revisit list)
+        latencies, errors, rejected = [], 0, 0
+        for i in range(iterations):
+            if prepare:
+                prepare(i)
+            started = time.perf_counter()
+            response = op(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            body = response.get_json(silent=True)
+            if response.status_code >= 400:
+                errors += 1
+            elif isinstance(body, dict) and body.get('success') is False:
+                rejected += 1
+        return summarize(latencies, errors, rejected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output')
+    parser.add_argument('--database-url')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--cold-iterations', type=int, default=5,
+                        help='Iterations for cold_activate, which refetches a whole set upstream')
+    parser.add_argument('--progress-sizes', default='0,50,300,1000,2500',
+                        help='Comma-separated progress rows per synthetic user')
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    progress_sizes = [int(x) for x in args.progress_sizes.split(',')]
+    rng = random.Random(args.seed)
+
+    upstream = start_server(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed)
+    tmpdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+    os.environ['LEETCODE_GRAPHQL_URL'] = upstream.url
+    # Scenarios repeat one user's writes back to back; time the app, not the rate limits
+    os.environ['RATE_LIMIT_SCALE'] = '0'
+    os.chdir(REPO_ROOT)
+
+    print("Seeding database...")
+    from app import app, db
+    from models import ProblemSet
+
+    users = seed_users(app, db, progress_sizes, rng)
+    with app.app_context():
+        set_ids = [s for (s,) in db.session.query(ProblemSet.set_id)
+                   .filter(ProblemSet.is_public.is_(True)).order_by(ProblemSet.set_id)]
+
+    bench = Bench(app, db, users, set_ids)
+    results = {}
+    for name in scenarios:
+        iterations = args.cold_iterations if name == 'cold_activate' else args.iterations
+        results[name] = bench.run(name, iterations)
+        r = results[name]
+        print(f"{name:<15} n={r['count']:<5} err={r['errors']:<4} rej={r['rejected']:<4} {r['throughput_rps']:>9} req/s  "
+              f"p50 {r['p50_ms']:>9} ms  p95 {r['p95_ms']:>9} ms  p99 {r['p99_ms']:>9} ms")
+
+    report = {
+        'label': args.label,
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'config': {
+            'database': os.environ['DATABASE_URL'].split(':', 1)[0],
+            'iterations': args.iterations,
+            'cold_iterations': args.cold_iterations,
+            'progress_sizes': progress_sizes,
+            'upstream_latency_ms': args.latency_ms,
+            'upstream_error_rate': args.error_rate,
+            'seed': args.seed,
+        },
+        'upstream': upstream.stats(),
+        'scenarios': results,
+    }
+    upstream.shutdown()
+    if tmpdir is not None:
+        with app.app_context():
+            db.engine.dispose()
+        tmpdir.cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the LeetCode GraphQL endpoint used by difficulty fetches.
+
+Answers the questionData query with a difficulty taken from
+difficulty_cache.json when the slug is known, otherwise one derived from a
+hash of the slug, so results are stable across runs. Latency and error rate
+are configurable to model a slow or flaky upstream.
+
+Usage:
+    python benchmarks/fake_leetcode.py [--port 8765] [--latency-ms 50] [--error-rate 0.02]
+
+Point the app at it with LEETCODE_GRAPHQL_URL=http://127.0.0.1:8765/graphql.
+benchmarks/e2e.py starts one in-process via start_server().
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from problem_urls import problem_slug  # noqa: E402
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+KNOWN_DIFFICULTIES_PATH = os.path.join(REPO_ROOT, 'difficulty_cache.json')
+
+
+def load_known_difficulties(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {problem_slug(url): difficulty for url, difficulty in json.load(f).items()}
+
+
+class FakeLeetCodeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 0, error_rate: float = 0, known=None, seed=None):
+        super().__init__(address, FakeGraphQLHandler)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.known = known or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def difficulty_for(self, slug: str) -> str:
+        if slug in self.known:
+            return self.known[slug]
+        return DIFFICULTIES[int(hashlib.md5(slug.encode()).hexdigest(), 16) % 3]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors}
+
+
+class FakeGraphQLHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+
+        with server.lock:
+            server.requests += 1
+            failed = server.random.random() < server.error_rate
+            if failed:
+                server.errors += 1
+
+        if failed:
+            self._send(500, {'errors': [{'message': 'injected failure'}]})
+            return
+        try:
+            slug = json.loads(body)['variables']['titleSlug']
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {'errors': [{'message': 'bad request'}]})
+            return
+        self._send(200, {'data': {'question': {'difficulty': server.difficulty_for(slug).capitalize()}}})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host='127.0.0.1', port=0, latency_ms=0, error_rate=0, seed=None,
+                 known_path=KNOWN_DIFFICULTIES_PATH) -> FakeLeetCodeServer:
+    """Start a FakeLeetCodeServer on a background thread; call .shutdown() to stop it."""
+    server = FakeLeetCodeServer((host, port), latency_ms, error_rate, load_known_difficulties(known_path), seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = FakeLeetCodeServer((args.host, args.port), args.latency_ms, args.error_rate,
+                                load_known_difficulties(KNOWN_DIFFICULTIES_PATH), args.seed)
+    print(f"Fake LeetCode GraphQL listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Redis server, for exercising the shared cache tier.
+
+Speaks enough of the Redis protocol (RESP2) for shared_cache.py, events.py
+and request_limits.py: PING, AUTH, SELECT, GET, MGET, SET (with EX, PX and
+NX), DEL, DBSIZE, FLUSHDB, PUBLISH and SUBSCRIBE, in memory with per-key
+expiry. It is not a Redis replacement; use a real server in production.
+
+Usage:
+    python benchmarks/fake_redis.py [--port 6390]
+
+Point the app at it with SHARED_CACHE_URL, EVENTS_URL and/or
+IDEMPOTENCY_URL=redis://127.0.0.1:6390/0. check_shared_cache.py,
+check_live_updates.py and load_test.py --shared-cache start one in-process
+via start_server().
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RespHandler)
+        self.lock = threading.Lock()
+        self.data = {}
+        self.commands = 0
+        self.clients = set()
+        self.subscribers = {}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args):
+        name = args[0].upper()
+        with self.lock:
+            self.commands += 1
+            if name in (b'PING', b'AUTH', b'SELECT'):
+                return b'+PONG\r\n' if name == b'PING' else b'+OK\r\n'
+            if name == b'GET':
+                return _bulk(self._get(args[1]))
+            if name == b'MGET':
+                return b'*%d\r\n' % (len(args) - 1) + b''.join(_bulk(self._get(k)) for k in args[1:])
+            if name == b'SET':
+                expires, options = None, [a.upper() for a in args[3:]]
+                if b'EX' in options:
+                    expires = time.monotonic() + int(options[options.index(b'EX') + 1])
+                if b'PX' in options:
+                    expires = time.monotonic() + int(options[options.index(b'PX') + 1]) / 1000
+                if b'NX' in options and self._get(args[1]) is not None:
+                    return b'$-1\r\n'
+                self.data[args[1]] = (args[2], expires)
+                return b'+OK\r\n'
+            if name == b'DEL':
+                return b':%d\r\n' % sum(self.data.pop(k, None) is not None for k in args[1:])
+            if name == b'DBSIZE':
+                return b':%d\r\n' % len(self.data)
+            if name == b'FLUSHDB':
+                self.data.clear()
+                return b'+OK\r\n'
+            if name == b'PUBLISH':
+                handlers = list(self.subscribers.get(args[1], ()))
+        if name == b'PUBLISH':
+            message = b'*3\r\n' + _bulk(b'message') + _bulk(args[1]) + _bulk(args[2])
+            delivered = sum(handler.push(message) for handler in handlers)
+            return b':%d\r\n' % delivered
+        return b'-ERR unknown command\r\n'
+
+    def subscribe(self, handler, channels):
+        replies = []
+        with self.lock:
+            for count, channel in enumerate(channels, 1):
+                self.subscribers.setdefault(channel, set()).add(handler)
+                replies.append(b'*3\r\n' + _bulk(b'subscribe') + _bulk(channel) + b':%d\r\n' % count)
+        return b''.join(replies)
+
+    def unsubscribe_all(self, handler):
+        with self.lock:
+            for handlers in self.subscribers.values():
+                handlers.discard(handler)
+
+    def stop(self):
+        """Stop serving and drop open connections, as a crashed server would."""
+        self.shutdown()
+        self.server_close()
+        with self.lock:
+            clients, self.clients = list(self.clients), set()
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def _bulk(value):
+    return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        # PUBLISH from other connections writes here too
+        self.write_lock = threading.Lock()
+
+    def push(self, data: bytes) -> bool:
+        try:
+            with self.write_lock:
+                self.wfile.write(data)
+            return True
+        except OSError:
+            return False
+
+    def handle(self):
+        with self.server.lock:
+            self.server.clients.add(self.connection)
+        try:
+            while True:
+                args = self._read_command()
+                if args is None:
+                    return
+                if args[0].upper() == b'SUBSCRIBE':
+                    reply = self.server.subscribe(self, args[1:])
+                else:
+                    reply = self.server.execute(args)
+                with self.write_lock:
+                    self.wfile.write(reply)
+        except OSError:
+            pass
+        finally:
+            self.server.unsubscribe_all(self)
+            with self.server.lock:
+                self.server.clients.discard(self.connection)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line.startswith(b'*'):
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+def start_server(host='127.0.0.1', port=0) -> FakeRedisServer:
+    """Start a FakeRedisServer on a background thread; call .stop() to stop it."""
+    server = FakeRedisServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    server = FakeRedisServer((args.host, args.port))
+    print(f"Fake Redis listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the app under gunicorn.
+
+Starts a fake LeetCode upstream (benchmarks/fake_leetcode.py) and gunicorn
+with the requested worker model, then drives --users simulated users at
+once through a scripted session, --iterations times each:
+
+    login, activate a public set, generate, mark complete / skip / revisit,
+    open the set details page, check progress
+
+Reports overall throughput, error rate, per-step p50/p95/p99 latency and the
+time requests spent waiting for a pooled DB connection. Pool wait and SQL
+time come from the Server-Timing header (SERVER_TIMING=1), so they cover
+every worker, not just the one that would answer /metrics.
+
+Usage:
+    python benchmarks/load_test.py --users 50 --workers 4 --threads 8 --output load.json
+    python benchmarks/load_test.py --worker-class sync --workers 8 --latency-ms 200
+    python benchmarks/load_test.py --url http://127.0.0.1:5000   # already running server
+
+Defaults to a temporary SQLite database; pass --database-url to load-test
+PostgreSQL (it is written to). DB_POOL_SIZE / DB_MAX_OVERFLOW are passed
+through to the workers via --pool-size / --max-overflow. --shared-cache
+starts a fake Redis (benchmarks/fake_redis.py) and points SHARED_CACHE_URL
+at it, so workers share difficulties and compiled sets.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_leetcode import start_server  # noqa: E402
+import fake_redis  # noqa: E402
+from e2e import git_commit, percentile  # noqa: E402
+
+PASSWORD = 'load-test-password'
+
+
+def parse_server_timing(header):
+    """{'db': ms, 'pool': ms, ...} from a Server-Timing header."""
+    timings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.startswith('dur='):
+            try:
+                timings[name] = float(params[4:])
+            except ValueError:
+                pass
+    return timings
+
+
+class Recorder:
+    """Thread-safe collection of per-request samples."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []  # (step, latency_ms, status, server timings)
+
+    def add(self, step, latency_ms, status, timings):
+        with self.lock:
+            self.samples.append((step, latency_ms, status, timings))
+
+    def summary(self, wall_seconds):
+        steps = {}
+        for step, latency_ms, status, timings in self.samples:
+            steps.setdefault(step, []).append((latency_ms, status, timings))
+
+        def describe(samples):
+            latencies = sorted(s[0] for s in samples)
+            errors = sum(1 for s in samples if s[1] is None or s[1] >= 500)
+            pool = [s[2].get('pool', 0.0) for s in samples]
+            db = [s[2].get('db', 0.0) for s in samples]
+            return {
+                'count': len(samples),
+                'errors': errors,
+                'error_rate': round(errors / len(samples), 4),
+                'p50_ms': round(percentile(latencies, 50), 3),
+                'p95_ms': round(percentile(latencies, 95), 3),
+                'p99_ms': round(percentile(latencies, 99), 3),
+                'max_ms': round(latencies[-1], 3),
+                'db_ms_mean': round(sum(db) / len(db), 3),
+                'pool_wait_ms_mean': round(sum(pool) / len(pool), 3),
+                'pool_wait_ms_p95': round(percentile(sorted(pool), 95), 3),
+                'pool_wait_ms_max': round(max(pool), 3),
+            }
+
+        overall = describe([sample[1:] for sample in self.samples]) if self.samples else {}
+        overall['throughput_rps'] = round(len(self.samples) / wall_seconds, 2) if wall_seconds else None
+        return overall, {step: describe(samples) for step, samples in sorted(steps.items())}
+
+
+class SimulatedUser:
+    def __init__(self, base_url, index, set_ids, recorder, rng, timeout):
+        self.base_url = base_url
+        self.username = f"load_{index}_{int(time.time())}"
+        self.set_ids = set_ids
+        self.recorder = recorder
+        self.rng = rng
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    def call(self, step, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.add(step, (time.perf_counter() - started) * 1000, None, {})
+            return None
+        self.recorder.add(step, (time.perf_counter() - started) * 1000, response.status_code,
+                          parse_server_timing(response.headers.get('Server-Timing')))
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def run(self, iterations):
+        self.call('register', 'POST', '/api/register',
+                  json={'username': self.username, 'email': f"{self.username}@example.com", 'password': PASSWORD})
+        for _ in range(iterations):
+            self.call('logout', 'POST', '/api/logout')
+            self.call('login', 'POST', '/api/login', json={'username': self.username, 'password': PASSWORD})
+            set_id = self.rng.choice(self.set_ids)
+            self.call('activate', 'POST', f"/api/problem_sets/{set_id}/activate")
+            body = self.call('generate', 'POST', '/api/generate', json={'force_new': True}) or {}
+            urls = [p['url'] for p in body.get('problems', [])]
+            self.rng.shuffle(urls)
+            for step in ('mark_complete', 'mark_skip', 'mark_revisit'):
+                if urls:
+                    self.call(step, 'POST', f"/api/{step}", json={'url': urls.pop()})
+            self.call('details', 'GET', f"/api/problem_set_details/{set_id}")
+            self.call('progress', 'GET', '/api/progress')
+
+
+def wait_until_up(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + '/login', timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.25)
+    raise SystemExit(f"Server at {base_url} did not come up within {timeout}s")
+
+
+def start_gunicorn(args, env, port):
+    cmd = [sys.executable, '-m', 'gunicorn', 'app:app',
+           '--bind', f"127.0.0.1:{port}",
+           '--workers', str(args.workers),
+           '--worker-class', args.worker_class,
+           '--timeout', str(args.gunicorn_timeout),
+           '--log-level', 'warning']
+    if args.worker_class == 'gthread':
+        cmd += ['--threads', str(args.threads)]
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=env)
+
+
+def public_set_ids(env):
+    """Seed the database once (so workers don't race to) and list the public sets."""
+    script = ("import json\n"
+              "from app import app, db\n"
+              "from models import ProblemSet\n"
+              "with app.app_context():\n"
+              "    print(json.dumps([s for (s,) in db.session.query(ProblemSet.set_id)"
+              ".filter(ProblemSet.is_public.is_(True)).order_by(ProblemSet.set_id)]))\n")
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output')
+    parser.add_argument('--url', help='Target an already running server instead of starting gunicorn')
+    parser.add_argument('--database-url')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--worker-class', default='gthread', choices=['sync', 'gthread'])
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--max-overflow', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--gunicorn-timeout', type=int, default=120)
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--request-timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--shared-cache', action='store_true', help='Share caches between workers via a fake Redis')
+    args = parser.parse_args()
+
+    upstream = None
+    shared_cache = None
+    server = None
+    tmpdir = None
+    env = dict(os.environ)
+    if args.url:
+        base_url = args.url.rstrip('/')
+        set_ids = None
+    else:
+        upstream = start_server(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed)
+        if args.database_url:
+            env['DATABASE_URL'] = args.database_url
+        else:
+            tmpdir = tempfile.TemporaryDirectory()
+            env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'load.db')}"
+        env.update({
+            'LEETCODE_GRAPHQL_URL': upstream.url,
+            'SERVER_TIMING': '1',
+            'DB_POOL_SIZE': str(args.pool_size),
+            'DB_MAX_OVERFLOW': str(args.max_overflow),
+            # Simulated users write far faster than people click; measure the app, not the limits
+            'RATE_LIMIT_SCALE': '0',
+        })
+        if args.shared_cache:
+            shared_cache = fake_redis.start_server()
+            env['SHARED_CACHE_URL'] = shared_cache.url
+        print("Seeding database...")
+        set_ids = public_set_ids(env)
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_gunicorn(args, env, args.port)
+
+    try:
+        wait_until_up(base_url, 60)
+        if set_ids is None:
+            probe = SimulatedUser(base_url, 'probe', [], Recorder(), random.Random(), args.request_timeout)
+            probe.call('register', 'POST', '/api/register', json={
+                'username': probe.username, 'email': f"{probe.username}@example.com", 'password': PASSWORD})
+            sets = (probe.call('sets', 'GET', '/api/problem_sets') or {}).get('sets', [])
+            set_ids = [s['id'] for s in sets if s.get('is_public')]
+        if not set_ids:
+            raise SystemExit("No public problem sets to activate")
+
+        recorder = Recorder()
+        rng = random.Random(args.seed)
+        users = [SimulatedUser(base_url, i, set_ids, recorder, random.Random(rng.random()), args.request_timeout)
+                 for i in range(args.users)]
+        print(f"Driving {args.users} users x {args.iterations} iterations against {base_url}...")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as executor:
+            for future in [executor.submit(u.run, args.iterations) for u in users]:
+                future.result()
+        wall_seconds = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+                server.wait()
+        if upstream is not None:
+            upstream.shutdown()
+        if shared_cache is not None:
+            shared_cache.stop()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    overall, steps = recorder.summary(wall_seconds)
+    print(f"\n{'step':<14} {'n':>6} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'pool p95':>9}")
+    for step, r in steps.items():
+        print(f"{step:<14} {r['count']:>6} {r['error_rate'] * 100:>6.2f} {r['p50_ms']:>9} {r['p95_ms']:>9} "
+              f"{r['p99_ms']:>9} {r['pool_wait_ms_p95']:>9}")
+    print(f"\n{overall.get('count', 0)} requests in {wall_seconds:.1f}s: {overall.get('throughput_rps')} req/s, "
+          f"error rate {overall.get('error_rate', 0) * 100:.2f}%, "
+          f"mean pool wait {overall.get('pool_wait_ms_mean')} ms (max {overall.get('pool_wait_ms_max')} ms)")
+
+    report = {
+        'label': args.label,
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+        'config': {
+            'target': args.url or 'gunicorn',
+            'database': (args.database_url or 'sqlite').split(':', 1)[0],
+            'users': args.users,
+            'iterations': args.iterations,
+            'workers': args.workers,
+            'worker_class': args.worker_class,
+            'threads': args.threads if args.worker_class == 'gthread' else 1,
+            'pool_size': args.pool_size,
+            'max_overflow': args.max_overflow,
+            'upstream_latency_ms': args.latency_ms,
+            'upstream_error_rate': args.error_rate,
+        },
+        'wall_seconds': round(wall_seconds, 3),
+        'overall': overall,
+        'steps': steps,
+        'upstream': upstream.stats() if upstream is not None else None,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
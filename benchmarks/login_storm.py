@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Cheap API latency during a login storm, with and without the hashing pool.
+
+Starts gunicorn with gunicorn.conf.py on a seeded temporary SQLite
+database, once per mode, and for --duration seconds runs --stormers
+threads logging in back to back while one logged-in probe thread calls
+GET /api/check_problems (a cached, cheap request). Modes:
+
+    inline    PASSWORD_HASH_WORKERS=0: hashes run on the request threads
+    pool      PASSWORD_HASH_WORKERS / PASSWORD_HASH_QUEUE from the options
+
+For each mode it reports the probe's p50/p95/p99/max latency, the probe's
+latency with no storm running, and the logins that succeeded or were
+rejected with 503 per second.
+
+Usage:
+    python benchmarks/login_storm.py --workers 2 --threads 4 --stormers 16 --output login_storm.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_leetcode import start_server  # noqa: E402
+from e2e import git_commit, percentile  # noqa: E402
+from load_test import wait_until_up  # noqa: E402
+from preload import seed  # noqa: E402
+
+PASSWORD = 'login-storm-password'
+
+
+def login(base_url, username):
+    client = requests.Session()
+    response = client.post(f"{base_url}/api/login", json={'username': username, 'password': PASSWORD}, timeout=60)
+    return client, response
+
+
+def probe(client, base_url, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get(f"{base_url}/api/check_problems", timeout=60).raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.02)
+
+
+def storm(base_url, stop, outcomes):
+    while not stop.is_set():
+        _, response = login(base_url, 'stormer')
+        outcomes.append(response.status_code)
+        if response.status_code == 503:
+            # What the login page does: the user tries again
+            time.sleep(float(response.headers.get('Retry-After', 1)))
+
+
+def latency_summary(latencies):
+    values = sorted(latencies)
+    return {'requests': len(values),
+            **{f"p{p}_ms": round(percentile(values, p), 1) for p in (50, 95, 99)},
+            'max_ms': round(values[-1], 1)}
+
+
+def run(mode, args, env):
+    env = dict(env, WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+               PASSWORD_HASH_WORKERS='0' if mode == 'inline' else str(args.hash_workers))
+    if args.hash_queue is not None:
+        env['PASSWORD_HASH_QUEUE'] = str(args.hash_queue)
+    base_url = f"http://127.0.0.1:{args.port}"
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+           '--bind', f"127.0.0.1:{args.port}", '--log-level', 'warning']
+    server = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_up(base_url, 120)
+        prober, response = login(base_url, 'prober')
+        response.raise_for_status()
+
+        idle = []
+        stop = threading.Event()
+        thread = threading.Thread(target=probe, args=(prober, base_url, stop, idle))
+        thread.start()
+        time.sleep(min(5, args.duration))
+        stop.set()
+        thread.join()
+
+        latencies, outcomes = [], []
+        stop = threading.Event()
+        threads = [threading.Thread(target=probe, args=(prober, base_url, stop, latencies))] + \
+            [threading.Thread(target=storm, args=(base_url, stop, outcomes)) for _ in range(args.stormers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    return {'idle_probe': latency_summary(idle), 'storm_probe': latency_summary(latencies),
+            'logins_ok_per_s': round(outcomes.count(200) / args.duration, 2),
+            'logins_rejected_per_s': round(outcomes.count(503) / args.duration, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--stormers', type=int, default=16, help='Threads logging in back to back')
+    parser.add_argument('--hash-workers', type=int, default=1, help='PASSWORD_HASH_WORKERS in pool mode')
+    parser.add_argument('--hash-queue', type=int, help='PASSWORD_HASH_QUEUE (default: the app default)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of storm per mode')
+    parser.add_argument('--modes', default='inline,pool')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = start_server()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmpdir.name, 'login_storm.db')}",
+               LEETCODE_GRAPHQL_URL=upstream.url)
+    seed(env)
+    # Both users are created up front; the storm only logs in
+    subprocess.run([sys.executable, '-c',
+                    "from app import app, create_user\n"
+                    "with app.app_context():\n"
+                    f"    create_user('prober', 'prober@example.com', {PASSWORD!r})\n"
+                    f"    create_user('stormer', 'stormer@example.com', {PASSWORD!r})\n"],
+                   cwd=REPO_ROOT, env=dict(env, PASSWORD_HASH_WORKERS='0'), check=True, stdout=subprocess.DEVNULL)
+
+    results = {}
+    for mode in args.modes.split(','):
+        r = results[mode] = run(mode, args, env)
+        idle, busy = r['idle_probe'], r['storm_probe']
+        print(f"{mode:<7} probe idle p50 {idle['p50_ms']:>7.1f} ms | storm p50 {busy['p50_ms']:>7.1f}"
+              f"  p95 {busy['p95_ms']:>7.1f}  p99 {busy['p99_ms']:>7.1f}  max {busy['max_ms']:>7.1f} ms"
+              f" | logins ok {r['logins_ok_per_s']:.1f}/s  rejected {r['logins_rejected_per_s']:.1f}/s")
+
+    upstream.shutdown()
+    tmpdir.cleanup()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+                       'workers': args.workers, 'threads': args.threads, 'stormers': args.stormers,
+                       'hash_workers': args.hash_workers, 'hash_queue': args.hash_queue,
+                       'cpus': os.cpu_count(), 'results': results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Bytes sent and render time per HTML page, first visit vs repeat visit.
+
+Requests each page through the Flask test client (login and register
+anonymously, the main page and problem sets page as a logged-in user),
+follows its <link href> and <script src> references, and reports:
+
+    html          bytes of the rendered HTML
+    assets        bytes of the linked assets as sent (gzip when offered)
+    first visit   html + assets: what an empty browser cache downloads
+    repeat visit  html + assets not marked immutable: what a warm cache
+                  downloads again (immutable assets aren't re-requested)
+    render        median milliseconds to answer the page request
+
+Pages with inline CSS/JS have no linked assets, so the same script
+measures a tree from before static assets were split out.
+
+Usage:
+    python benchmarks/page_weight.py --iterations 200 --output page_weight.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from e2e import git_commit  # noqa: E402
+
+PAGES = (('login', '/login', False), ('register', '/register', False),
+         ('index', '/', True), ('problem_sets', '/problem_sets', True))
+ASSET_REFERENCE = re.compile(r'<(?:link[^>]+href|script[^>]+src)="([^"]+)"')
+
+
+def measure_page(client, path, iterations):
+    response = client.get(path)
+    assert response.status_code == 200, (path, response.status_code)
+    html = response.data
+
+    assets = cached = 0
+    for url in ASSET_REFERENCE.findall(html.decode('utf-8')):
+        asset = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert asset.status_code == 200, (url, asset.status_code)
+        assets += len(asset.data)
+        if 'immutable' in asset.headers.get('Cache-Control', ''):
+            cached += len(asset.data)
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'html_bytes': len(html), 'asset_bytes': assets,
+            'first_visit_bytes': len(html) + assets, 'repeat_visit_bytes': len(html) + assets - cached,
+            'render_ms': round(statistics.median(timings), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'page_weight.db')}"
+    os.chdir(REPO_ROOT)
+    from app import app
+
+    anonymous, user = app.test_client(), app.test_client()
+    user.post('/api/register', json={'username': 'pages', 'email': 'pages@example.com',
+                                     'password': 'page-weight-password'})
+
+    results = {}
+    print(f"{'page':<14}{'html':>9}{'assets':>9}{'first visit':>13}{'repeat visit':>14}{'render ms':>11}")
+    for name, path, logged_in in PAGES:
+        r = measure_page(user if logged_in else anonymous, path, args.iterations)
+        results[name] = r
+        print(f"{name:<14}{r['html_bytes']:>9}{r['asset_bytes']:>9}{r['first_visit_bytes']:>13}"
+              f"{r['repeat_visit_bytes']:>14}{r['render_ms']:>11.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+                       'iterations': args.iterations, 'pages': results}, f, indent=2)
+        print(f"Wrote {args.output}")
+    tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
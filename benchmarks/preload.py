@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Worker memory and warm-up with and without gunicorn preloading.
+
+Starts gunicorn with gunicorn.conf.py twice against the same seeded
+temporary SQLite database, once with GUNICORN_PRELOAD=1 (caches warmed in
+the master, shared copy-on-write) and once with GUNICORN_PRELOAD=0 (each
+worker imports and warms up on its own), and reports for each:
+
+    first response    seconds from spawning gunicorn to the first answered request
+    first activation  latency of each user's first activation of every public
+                      set (a worker's first use of a set compiles it unless preloaded)
+    memory            per-worker RSS, PSS and private (USS) memory from
+                      /proc/<pid>/smaps_rollup after the activations, plus the
+                      PSS total of master and workers
+
+Usage:
+    python benchmarks/preload.py --workers 4 --output preload.json
+
+Linux only (reads /proc).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_leetcode import start_server  # noqa: E402
+from e2e import git_commit, percentile  # noqa: E402
+
+PASSWORD = 'preload-password'
+MEMORY_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+
+
+def seed(env):
+    """Create and seed the database and fill its difficulty cache, so both runs start from the same data."""
+    script = ("import json\n"
+              "from app import app, db, warm_caches\n"
+              "from models import ProblemSet\n"
+              "warm_caches()\n"
+              "with app.app_context():\n"
+              "    print(json.dumps([s for (s,) in db.session.query(ProblemSet.set_id)"
+              ".filter(ProblemSet.is_public.is_(True)).order_by(ProblemSet.set_id)]))\n")
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name may contain spaces; fields after it are fixed
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                pass
+    return sorted(found)
+
+
+def memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in MEMORY_FIELDS:
+                values[name] = int(rest.split()[0])
+    return {'rss_kb': values['Rss'], 'pss_kb': values['Pss'],
+            'uss_kb': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def run(preload, args, env, set_ids):
+    env = dict(env, GUNICORN_PRELOAD='1' if preload else '0', WEB_CONCURRENCY=str(args.workers))
+    base_url = f"http://127.0.0.1:{args.port}"
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+           '--bind', f"127.0.0.1:{args.port}", '--log-level', 'warning']
+    started = time.perf_counter()
+    server = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                requests.get(base_url + '/login', timeout=2)
+                break
+            except requests.RequestException:
+                if time.perf_counter() - started > 120:
+                    raise SystemExit("gunicorn did not come up within 120s")
+                time.sleep(0.05)
+        first_response = time.perf_counter() - started
+
+        latencies = []
+        for i in range(args.users):
+            # A new connection per user spreads users over the workers
+            http = requests.Session()
+            username = f"preload_{int(preload)}_{i}"
+            http.post(base_url + '/api/register', timeout=60,
+                      json={'username': username, 'email': f"{username}@example.com", 'password': PASSWORD})
+            for set_id in set_ids:
+                t0 = time.perf_counter()
+                http.post(f"{base_url}/api/problem_sets/{set_id}/activate", timeout=60).raise_for_status()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            http.close()
+        latencies.sort()
+
+        workers = {pid: memory_kb(pid) for pid in children(server.pid)}
+        master = memory_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    def mean(key):
+        return round(sum(w[key] for w in workers.values()) / len(workers)) if workers else None
+
+    return {
+        'first_response_s': round(first_response, 3),
+        'first_activation_ms': {
+            'count': len(latencies),
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'max': round(latencies[-1], 3),
+        },
+        'worker_rss_kb_mean': mean('rss_kb'),
+        'worker_pss_kb_mean': mean('pss_kb'),
+        'worker_uss_kb_mean': mean('uss_kb'),
+        'total_pss_kb': master['pss_kb'] + sum(w['pss_kb'] for w in workers.values()),
+        'master': master,
+        'workers': list(workers.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    upstream = start_server()
+    tmpdir = tempfile.TemporaryDirectory()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmpdir.name, 'preload.db')}",
+               LEETCODE_GRAPHQL_URL=upstream.url)
+    try:
+        print("Seeding database...")
+        set_ids = seed(env)
+        results = {}
+        for preload in (True, False):
+            label = 'preload' if preload else 'no_preload'
+            print(f"Running {label} with {args.workers} workers...")
+            results[label] = run(preload, args, env, set_ids)
+    finally:
+        upstream.shutdown()
+        tmpdir.cleanup()
+
+    print(f"\n{'':<28}{'preload':>14}{'no preload':>14}")
+    rows = [
+        ('first response (s)', lambda r: r['first_response_s']),
+        ('first activation mean ms', lambda r: r['first_activation_ms']['mean']),
+        ('first activation p95 ms', lambda r: r['first_activation_ms']['p95']),
+        ('first activation max ms', lambda r: r['first_activation_ms']['max']),
+        ('worker RSS (KiB)', lambda r: r['worker_rss_kb_mean']),
+        ('worker PSS (KiB)', lambda r: r['worker_pss_kb_mean']),
+        ('worker USS (KiB)', lambda r: r['worker_uss_kb_mean']),
+        ('total PSS (KiB)', lambda r: r['total_pss_kb']),
+    ]
+    for name, value in rows:
+        print(f"{name:<28}{value(results['preload']):>14}{value(results['no_preload']):>14}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'timestamp': datetime.utcnow().isoformat() + 'Z',
+                       'workers': args.workers, 'users': args.users, 'sets': len(set_ids),
+                       'results': results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Memory held by compiled problem sets, per problem.
+
+Loads every public problem set into a throwaway SQLite database, then
+measures with tracemalloc the memory retained by all of them compiled
+together, in two representations:
+
+    dicts   the previous layout: per set, {category: [url]} and
+            {difficulty: [url]} lists plus url -> id and id -> url dicts,
+            and a slug -> difficulty dict for the sets' problems
+    arrays  the current layout (problem_index.py): one ProblemTable of URLs
+            and difficulty bytes, and per set array('I') ids with offsets
+
+and reports bytes per problem (per set entry, so a problem in two sets
+counts twice).
+
+Usage:
+    python benchmarks/set_memory.py --output set_memory.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from e2e import git_commit  # noqa: E402
+
+
+def retained_bytes(build):
+    """Bytes still allocated after build() returns, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return size, result
+
+
+def dict_layout(set_rows):
+    """The previous per-set structures, built from freshly loaded strings as each compile did."""
+    compiled = []
+    difficulties = {}
+    for rows in set_rows:
+        problems_data, difficulty_map = {}, {'easy': [], 'medium': [], 'hard': []}
+        problem_ids, problem_urls = {}, {}
+        for category, pid, url, slug, difficulty in rows:
+            url = ''.join(url)  # a distinct string per load, like an ORM row's attribute
+            problems_data.setdefault(category, []).append(url)
+            difficulty_map[difficulty].append(url)
+            problem_ids[url] = pid
+            problem_urls[pid] = url
+            difficulties[''.join(slug)] = difficulty
+        compiled.append((problems_data, difficulty_map, problem_ids, problem_urls))
+    return compiled, difficulties
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'set_memory.db')}"
+
+    from app import app, db, LeetCodeProblemSelector, problem_table
+    from check_query_budgets import seed_difficulty_cache
+    from models import DifficultyCache, Problem, ProblemSet, ProblemSetProblem
+    from problem_urls import problem_slug
+
+    with app.app_context():
+        seed_difficulty_cache(db, DifficultyCache, problem_slug)
+        sets = db.session.query(ProblemSet.id, ProblemSet.set_id) \
+            .filter(ProblemSet.is_public.is_(True)).order_by(ProblemSet.set_id).all()
+        selector = LeetCodeProblemSelector(user_id=None)
+        for _, set_id in sets:
+            selector._compile_problem_set(set_id)  # resolve difficulties up front
+        db.session.commit()
+
+        set_rows = []
+        for ps_id, _ in sets:
+            set_rows.append([
+                (category, pid, url, slug, difficulty or 'medium')
+                for category, pid, url, slug, difficulty in db.session.query(
+                    ProblemSetProblem.category, Problem.id, Problem.url, Problem.slug, Problem.difficulty)
+                .join(Problem, Problem.id == ProblemSetProblem.problem_id)
+                .filter(ProblemSetProblem.problem_set_id == ps_id)
+                .order_by(ProblemSetProblem.position)])
+
+        entries = sum(len(rows) for rows in set_rows)
+        unique = len({row[1] for rows in set_rows for row in rows})
+
+        dict_bytes, legacy = retained_bytes(lambda: dict_layout(set_rows))
+
+        def array_layout():
+            problem_table.clear()
+            compiled = [selector._compile_problem_set(set_id) for _, set_id in sets]
+            db.session.remove()
+            return compiled
+
+        array_bytes, compiled = retained_bytes(array_layout)
+
+    legacy_entries = sum(len(urls) for problems_data, *_ in legacy[0] for urls in problems_data.values())
+    assert sum(len(c) for c in compiled) == entries == legacy_entries
+    tmpdir.cleanup()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'sets': len(sets),
+        'set_entries': entries,
+        'unique_problems': unique,
+        'dicts': {'bytes': dict_bytes, 'bytes_per_problem': round(dict_bytes / entries, 1)},
+        'arrays': {'bytes': array_bytes, 'bytes_per_problem': round(array_bytes / entries, 1)},
+    }
+    print(f"{len(sets)} public sets, {entries} set entries, {unique} unique problems")
+    print(f"{'':<10}{'bytes':>12}{'bytes/problem':>16}")
+    for layout in ('dicts', 'arrays'):
+        print(f"{layout:<10}{report[layout]['bytes']:>12}{report[layout]['bytes_per_problem']:>16}")
+    print(f"arrays use {array_bytes / dict_bytes:.0%} of the dicts layout")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""Sets of problem ids as Python ints, bit i standing for problems.id i.
+
+Set algebra is then a single C-level operation over machine words:
+``pool & ~completed`` is "available", ``(a & b).bit_count()`` counts an
+intersection without building it. Ints are immutable, so masks can be
+shared between threads and, preloaded, between workers.
+"""
+
+from typing import Iterable, List
+
+
+def from_ids(ids: Iterable[int]) -> int:
+    ids = list(ids)
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for pid in ids:
+        buf[pid >> 3] |= 1 << (pid & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def to_ids(mask: int) -> List[int]:
+    """The ids in mask, ascending."""
+    ids: List[int] = []
+    words = (mask.bit_length() + 63) // 64
+    # Skip empty 64-bit words, then peel the lowest set bit off each non-empty one
+    for i, word in enumerate(memoryview(mask.to_bytes(words * 8, 'little')).cast('Q')):
+        base = i << 6
+        while word:
+            low = word & -word
+            ids.append(base + low.bit_length() - 1)
+            word ^= low
+    return ids
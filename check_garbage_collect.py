@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Check that garbage_collect.py never overwrites newer user state.
+
+Runs against a temporary SQLite database with two users whose sessions
+each hold a problem that was dropped from every set, and checks that:
+
+  1. a session changed between the scan and the write (here, regenerated)
+     is left as the newer writer left it, and isn't counted,
+  2. a session nobody touched has the dropped problem removed,
+  3. an expired upload nobody has active is deleted, its rows a batch per
+     transaction and the set row last, while one still active is kept.
+
+Usage:
+    python check_garbage_collect.py
+
+Exits non-zero on any failure.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, 'benchmarks')
+    import fake_leetcode
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = fake_leetcode.start_server()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmpdir.name, 'garbage_collect.db')}",
+        'LEETCODE_GRAPHQL_URL': upstream.url,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'RATE_LIMIT_SCALE': '0',
+    })
+
+    import garbage_collect
+    from app import app, db
+    from models import Problem, ProblemSet, ProblemSetProblem, User, UserSession
+    from sqlalchemy import delete, event, update
+
+    failures = []
+
+    def check(label, ok, detail=''):
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<62} {detail}")
+        if not ok:
+            failures.append(label)
+
+    with app.app_context():
+        set_id = db.session.query(ProblemSet.set_id).filter_by(is_public=True).order_by(ProblemSet.set_id).first()[0]
+
+    def new_user(name):
+        client = app.test_client()
+        client.post('/api/register', json={'username': name, 'email': f"{name}@example.com", 'password': 'pw-garbage'})
+        client.post(f"/api/problem_sets/{set_id}/activate")
+        client.post('/api/generate', json={'force_new': True})
+        with app.app_context():
+            user_id = db.session.query(User.id).filter_by(username=name).scalar()
+        return client, user_id
+
+    def session(user_id):
+        with app.app_context():
+            row = db.session.query(UserSession.problem_ids, UserSession.version).filter_by(user_id=user_id).one()
+            return list(row.problem_ids), row.version
+
+    try:
+        racing, racing_id = new_user('gc_racing')
+        idle, idle_id = new_user('gc_idle')
+        dropped = {session(racing_id)[0][0], session(idle_id)[0][0]}
+        with app.app_context():
+            # As if a set update removed them: no set holds these problems any more
+            db.session.execute(delete(ProblemSetProblem).where(ProblemSetProblem.problem_id.in_(dropped)))
+            db.session.commit()
+
+            in_any_set = {pid for (pid,) in db.session.query(ProblemSetProblem.problem_id).distinct()}
+            _, changes = garbage_collect.scan_session_problems(in_any_set, 0, 100)
+
+        racing.post('/api/generate', json={'force_new': True})
+        newer = session(racing_id)
+
+        with app.app_context():
+            applied = garbage_collect.rewrite_session_problems(changes)
+        applied_users = {user_id for user_id, *_ in applied}
+
+        check("1. a session regenerated after the scan keeps its new problems",
+              session(racing_id) == newer and racing_id not in applied_users,
+              f"version {newer[1]} -> {session(racing_id)[1]}")
+        idle_ids, _ = session(idle_id)
+        check("2. an untouched session loses the dropped problem",
+              idle_id in applied_users and not dropped & set(idle_ids), f"applied={len(applied)}")
+
+        with app.app_context():
+            urls = [f"https://leetcode.com/problems/{p.slug}/" for p in
+                    db.session.query(Problem.slug).order_by(Problem.id).limit(7)]
+        upload = json.dumps({'Arrays': urls})
+        for client in (idle, racing):
+            client.post('/api/load_problems', data={'json_text': upload})
+        # idle moves on to a public set; racing keeps its upload active
+        idle.post(f"/api/problem_sets/{set_id}/activate")
+        with app.app_context():
+            uploads = dict(db.session.query(ProblemSet.owner_user_id, ProblemSet.id)
+                           .filter(ProblemSet.set_id.like('uploaded%')))
+            db.session.execute(update(ProblemSet).where(ProblemSet.id.in_(uploads.values()))
+                               .values(created_at=datetime.utcnow() - timedelta(days=60)))
+            db.session.commit()
+
+            commits = []
+
+            def committed(session):
+                commits.append(session)
+            event.listen(db.session, 'after_commit', committed)
+            report = dict.fromkeys(['problem_sets', 'problem_set_problems'], 0)
+            garbage_collect.collect_uploaded_sets(
+                argparse.Namespace(dry_run=False, upload_retention_days=30, batch_size=3), report)
+            event.remove(db.session, 'after_commit', committed)
+            left = {owner for owner, in db.session.query(ProblemSet.owner_user_id)
+                    .filter(ProblemSet.id.in_(uploads.values()))}
+            rows_left = db.session.query(ProblemSetProblem.id) \
+                .filter(ProblemSetProblem.problem_set_id == uploads[idle_id]).count()
+        # One claim, three batches of rows, then the set row
+        check("3. an expired upload is deleted a batch per transaction",
+              report == {'problem_sets': 1, 'problem_set_problems': len(urls)} and not rows_left
+              and left == {racing_id} and len(commits) == 5,
+              f"report={report} commits={len(commits)}")
+    finally:
+        upstream.shutdown()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nGarbage collection OK.")
+
+
+if __name__ == '__main__':
+    main()
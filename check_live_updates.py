@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Check of the live update streams (/api/events, events.py) across processes.
+
+Seeds a temporary SQLite database, then starts two single-worker gunicorn
+instances on it (standing in for two workers behind one address) with
+EVENTS_URL pointing at a fake Redis (benchmarks/fake_redis.py). One user
+opens a stream on each instance and checks that:
+
+  1. a mark on instance A reaches the streams on both A and B, with the
+     progress after the write and the page id that made it,
+  2. a new session generated on B reaches A with its problems,
+  3. marks sent with "progress": false answer without the progress payload,
+  4. streams past EVENTS_MAX_STREAMS are refused with 503,
+  5. with the backend down, events still reach streams on the same
+     instance, and after it comes back the streams are told to resync.
+
+Usage:
+    python check_live_updates.py
+
+Exits non-zero on any failure.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+PASSWORD = 'pw-live-updates'
+MAX_STREAMS = 3
+
+
+class Stream:
+    """An open /api/events stream, parsed into (event, data) pairs on a background thread."""
+
+    def __init__(self, http, url):
+        self.events = queue.Queue()
+        self.response = http.get(url, stream=True, timeout=30)
+        self.status_code = self.response.status_code
+        if self.status_code == 200:
+            threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        event, data = None, None
+        try:
+            for line in self.response.iter_lines(decode_unicode=True):
+                if line.startswith('event: '):
+                    event = line[len('event: '):]
+                elif line.startswith('data: '):
+                    data = json.loads(line[len('data: '):])
+                elif line == '' and event is not None:
+                    self.events.put((event, data))
+                    event, data = None, None
+        except (requests.RequestException, ValueError, AttributeError):
+            # close() from the main thread pulls the connection out from under the read
+            pass
+
+    def next(self, event, timeout=5):
+        """The data of the next `event`, skipping others, or None after timeout seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                name, data = self.events.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if name == event:
+                return data
+
+    def close(self):
+        self.response.close()
+
+
+def start_instance(port, env):
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{port}",
+           '--workers', '1', '--log-level', 'warning']
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    started = time.monotonic()
+    while True:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/login", timeout=2)
+            return server
+        except requests.RequestException:
+            if time.monotonic() - started > 120 or server.poll() is not None:
+                raise SystemExit(f"gunicorn on port {port} did not come up")
+            time.sleep(0.1)
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, 'benchmarks')
+    import fake_leetcode
+    import fake_redis
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = fake_leetcode.start_server()
+    backend = fake_redis.start_server()
+    backend_port = backend.server_address[1]
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmpdir.name, 'live_updates.db')}",
+               LEETCODE_GRAPHQL_URL=upstream.url,
+               SECRET_KEY='live-updates-check',
+               EVENTS_URL=backend.url,
+               EVENTS_RETRY_SECONDS='1',
+               EVENTS_HEARTBEAT_SECONDS='1',
+               EVENTS_MAX_STREAMS=str(MAX_STREAMS),
+               GUNICORN_THREADS='8',
+               GUNICORN_PRELOAD='0')
+
+    # Create and seed the database once, before two processes race to do it
+    subprocess.run([sys.executable, '-c', 'import app'], env=env, check=True, stdout=subprocess.DEVNULL)
+    servers = [start_instance(8771, env), start_instance(8772, env)]
+    a, b = 'http://127.0.0.1:8771', 'http://127.0.0.1:8772'
+
+    failures = []
+    streams = []
+
+    def check(label, ok, detail=''):
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<58} {detail}")
+        if not ok:
+            failures.append(label)
+
+    try:
+        # Flask sessions are signed cookies, so one login works on both instances
+        http = requests.Session()
+        http.post(f"{a}/api/register", json={'username': 'live', 'email': 'live@example.com', 'password': PASSWORD})
+        set_id = next(s['id'] for s in http.get(f"{a}/api/problem_sets").json()['sets'] if s['is_public'])
+        http.post(f"{a}/api/problem_sets/{set_id}/activate").raise_for_status()
+        problems = http.post(f"{a}/api/generate", json={'force_new': True}).json()['problems']
+
+        # Each stream reads on its own connection, so give it its own session
+        def open_stream(base):
+            client = requests.Session()
+            client.cookies.update(http.cookies)
+            stream = Stream(client, f"{base}/api/events")
+            streams.append(stream)
+            return stream
+
+        stream_a, stream_b = open_stream(a), open_stream(b)
+        check('streams open on both instances', stream_a.status_code == 200 and stream_b.status_code == 200,
+              f"status={stream_a.status_code}/{stream_b.status_code}")
+        # The listener resyncs once when it first subscribes
+        stream_a.next('resync', 2)
+        stream_b.next('resync', 2)
+
+        writer = requests.Session()
+        writer.cookies.update(http.cookies)
+        url = problems[0]['url']
+        writer.post(f"{a}/api/mark_complete", json={'url': url}, headers={'X-Client-Id': 'page-1'})
+        for label, stream in (('same instance', stream_a), ('other instance', stream_b)):
+            data = stream.next('problem')
+            ok = data is not None and data['url'] == url and data['status'] == 'completed' \
+                and data['origin'] == 'page-1' and data['progress']['global']['total'] == 1 \
+                and data['set_progress']['completed'] == 1
+            check(f"1. mark on A reaches the stream on the {label}", ok,
+                  '' if data is None else f"total={data['progress']['global']['total']}")
+
+        generated = writer.post(f"{b}/api/generate", json={'force_new': True}).json()['problems']
+        data = stream_a.next('session')
+        check('2. new session on B reaches A with its problems',
+              data is not None and [p['url'] for p in data['problems']] == [p['url'] for p in generated],
+              '' if data is None else f"problems={len(data['problems'])}")
+        stream_b.next('session')
+
+        body = writer.post(f"{a}/api/mark_revisit", json={'url': generated[0]['url'], 'progress': False}).json()
+        data = stream_b.next('problem')
+        check('3. "progress": false skips the progress payload',
+              body.get('success') and 'progress' not in body and data is not None and data['status'] == 'revisit',
+              f"keys={sorted(body)}")
+        stream_a.next('problem')
+
+        extra = [open_stream(a) for _ in range(MAX_STREAMS)]
+        statuses = [s.status_code for s in extra]
+        check(f"4. streams past EVENTS_MAX_STREAMS={MAX_STREAMS} are refused",
+              statuses.count(503) == 1 and statuses.count(200) == MAX_STREAMS - 1, f"statuses={statuses}")
+
+        backend.stop()
+        writer.post(f"{a}/api/mark_complete", json={'url': generated[1]['url']})
+        data_a, data_b = stream_a.next('problem'), stream_b.next('problem', 2)
+        check('5. backend down: same-instance stream still gets the event',
+              data_a is not None and data_a['url'] == generated[1]['url'] and data_b is None,
+              f"A={'yes' if data_a else 'no'} B={'yes' if data_b else 'no'}")
+        backend = fake_redis.start_server(port=backend_port)
+        time.sleep(1)
+        resynced = stream_a.next('resync', 5) is not None and stream_b.next('resync', 5) is not None
+        # Publishing resumes once EVENTS_RETRY_SECONDS have passed
+        writer.post(f"{a}/api/mark_complete", json={'url': generated[2]['url']})
+        data = stream_b.next('problem')
+        check('   backend back: streams resync, then events cross again',
+              resynced and data is not None and data['url'] == generated[2]['url'])
+    finally:
+        for stream in streams:
+            stream.close()
+        for server in servers:
+            server.terminate()
+            server.wait(timeout=30)
+        backend.stop()
+        upstream.shutdown()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nLive updates OK.")
+
+
+if __name__ == '__main__':
+    main()
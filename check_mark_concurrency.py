@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Check that parallel marks of the same user's problems are applied exactly once.
+
+Seeds a temporary SQLite database and starts gunicorn on it with two
+workers of eight threads, so requests race across processes as well as
+threads. For several rounds, a barrier releases a batch of requests at
+once and the script checks that:
+
+  1. parallel mark_complete of one new problem: one succeeds, the others
+     answer "already completed", and the session counter moves by one,
+  2. parallel mark_complete of different session problems: every one
+     counts (no lost counter updates),
+  3. parallel mark_skip of one problem: one succeeds,
+  4. parallel mark_skip of different session problems: every skipped
+     problem is replaced in the session,
+  5. parallel mark_revisit of one problem: one succeeds,
+  6. complete, skip and revisit of one new problem at once: the problem
+     ends completed and marked for revisit,
+
+and that no request in any of them fails with a 5xx.
+
+Usage:
+    python check_mark_concurrency.py --rounds 5
+
+Exits non-zero on any failure.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+PASSWORD = 'pw-mark-concurrency'
+PORT = 8773
+BASE = f"http://127.0.0.1:{PORT}"
+
+
+def start_server(env):
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f"127.0.0.1:{PORT}",
+           '--log-level', 'warning']
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    started = time.monotonic()
+    while True:
+        try:
+            requests.get(f"{BASE}/login", timeout=2)
+            return server
+        except requests.RequestException:
+            if time.monotonic() - started > 120 or server.poll() is not None:
+                raise SystemExit(f"gunicorn on port {PORT} did not come up")
+            time.sleep(0.1)
+
+
+def fire(http, calls):
+    """Send (path, url) calls all at once, each on its own connection; their responses in order."""
+    barrier = threading.Barrier(len(calls))
+    responses = [None] * len(calls)
+
+    def send(i, path, url):
+        with requests.Session() as client:
+            client.cookies.update(http.cookies)
+            barrier.wait()
+            responses[i] = client.post(f"{BASE}{path}", json={'url': url, 'progress': False}, timeout=60)
+
+    threads = [threading.Thread(target=send, args=(i, *call)) for i, call in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--parallel', type=int, default=8, help='Requests released at once')
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, 'benchmarks')
+    import fake_leetcode
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = fake_leetcode.start_server()
+    env = dict(os.environ,
+               DATABASE_URL=f"sqlite:///{os.path.join(tmpdir.name, 'mark_concurrency.db')}",
+               LEETCODE_GRAPHQL_URL=upstream.url,
+               SECRET_KEY='mark-concurrency-check',
+               RATE_LIMIT_SCALE='0',
+               WEB_CONCURRENCY='2',
+               GUNICORN_THREADS='8')
+    subprocess.run([sys.executable, '-c', 'import app'], env=env, check=True, stdout=subprocess.DEVNULL)
+    server = start_server(env)
+
+    failures = []
+    errors = []
+
+    def check(label, ok, detail=''):
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<62} {detail}")
+        if not ok:
+            failures.append(label)
+
+    def successes(responses):
+        errors.extend(r.status_code for r in responses if r.status_code >= 500)
+        return sum(r.status_code == 200 and r.json()['success'] for r in responses)
+
+    try:
+        http = requests.Session()
+        http.post(f"{BASE}/api/register", json={'username': 'marks', 'email': 'marks@example.com',
+                                                'password': PASSWORD})
+        # The largest public set, so every round gets a full session of new problems
+        sets = [s for s in http.get(f"{BASE}/api/problem_sets").json()['sets'] if s['is_public']]
+        set_id = max(sets, key=lambda s: s['problem_count'])['id']
+        http.post(f"{BASE}/api/problem_sets/{set_id}/activate").raise_for_status()
+
+        marked = set()
+
+        def new_session():
+            # Skipped problems can come back in later sessions; only use ones not marked yet
+            problems = http.post(f"{BASE}/api/generate", json={'force_new': True}).json()['problems']
+            problems = [p for p in problems if p['url'] not in marked]
+            marked.update(p['url'] for p in problems)
+            return problems
+
+        def progress():
+            return http.get(f"{BASE}/api/progress").json()
+
+        n = args.parallel
+        for round_no in range(1, args.rounds + 1):
+            tag = f"[round {round_no}]"
+            problems = new_session()
+
+            target = problems[0]
+            before = progress()['session'][target['difficulty']]
+            won = successes(fire(http, [('/api/mark_complete', target['url'])] * n))
+            after = progress()['session'][target['difficulty']]
+            check(f"{tag} 1. one problem completed {n}x at once", won == 1 and after == before + 1,
+                  f"succeeded={won} counter {before}->{after}")
+
+            batch = problems[1:1 + n]
+            before = progress()['session']['total']
+            won = successes(fire(http, [('/api/mark_complete', p['url']) for p in batch]))
+            after = progress()['session']['total']
+            check(f"{tag} 2. {len(batch)} problems completed at once", won == len(batch)
+                  and after == before + len(batch), f"succeeded={won} counter {before}->{after}")
+
+            problems = new_session()
+            won = successes(fire(http, [('/api/mark_skip', problems[0]['url'])] * n))
+            check(f"{tag} 3. one problem skipped {n}x at once", won == 1, f"succeeded={won}")
+
+            batch = [p['url'] for p in problems[1:1 + n]]
+            size = progress()['session']['total_problems']
+            responses = fire(http, [('/api/mark_skip', url) for url in batch])
+            won = successes(responses)
+            # A replacement is drawn from every uncompleted problem, so it can be one skipped alongside
+            replacements = {(r.json().get('replacement') or {}).get('url') for r in responses if r.status_code == 200}
+            state = http.get(f"{BASE}/api/bootstrap").json()
+            left = [url for url in batch if url in {p['url'] for p in state['problems']} and url not in replacements]
+            check(f"{tag} 4. {len(batch)} problems skipped at once", won == len(batch) and not left
+                  and state['progress']['session']['total_problems'] == size,
+                  f"succeeded={won} still in session={len(left)}")
+
+            target = problems[1 + n]['url']
+            won = successes(fire(http, [('/api/mark_revisit', target)] * n))
+            check(f"{tag} 5. one problem marked for revisit {n}x at once", won == 1, f"succeeded={won}")
+
+            target = problems[2 + n]['url']
+            calls = [(path, target) for path in ('/api/mark_complete', '/api/mark_skip', '/api/mark_revisit')]
+            successes(fire(http, calls * (n // len(calls) or 1)))
+            flags = http.get(f"{BASE}/api/export_progress").json()['progress']
+            check(f"{tag} 6. complete, skip and revisit of one problem at once",
+                  target in flags['completed'] and target in flags['revisit'] and target not in flags['skipped'])
+
+        check('no 5xx responses', not errors, f"{len(errors)} errors")
+        http.close()
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+        upstream.shutdown()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nConcurrent marks OK.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Check how migrations/001_problems_table.py groups stored URLs into problems.
+
+The migration itself targets PostgreSQL; this checks the grouping it
+inserts problems from, with no database, that:
+
+  1. different problems stored with a /description/ suffix stay separate
+     problems, each under its canonical URL,
+  2. spelling variants of one problem (suffixes, query strings,
+     leetcode.cn, a bare slug) become one problem,
+  3. every stored URL maps to the problem it names.
+
+Usage:
+    python check_migrations.py
+
+Exits non-zero on any failure.
+"""
+
+import importlib.util
+import os
+import sys
+
+
+def load_migration(name):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations', f"{name}.py")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    migration = load_migration('001_problems_table')
+    failures = []
+
+    def check(label, ok, detail=''):
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<62} {detail}")
+        if not ok:
+            failures.append(label)
+
+    described = ['https://leetcode.com/problems/two-sum/description/',
+                 'https://leetcode.com/problems/add-two-numbers/description/']
+    url_by_slug, slug_by_url = migration.group_urls(described)
+    check("1. two /description/ URLs stay two problems",
+          url_by_slug == {'two-sum': 'https://leetcode.com/problems/two-sum/',
+                          'add-two-numbers': 'https://leetcode.com/problems/add-two-numbers/'},
+          f"problems={sorted(url_by_slug)}")
+
+    variants = ['https://leetcode.com/problems/two-sum/',
+                'https://leetcode.com/problems/two-sum/description/',
+                'https://leetcode.com/problems/two-sum/solutions/?envType=study-plan',
+                'https://leetcode.cn/problems/two-sum/',
+                'two-sum']
+    url_by_slug, slug_by_url = migration.group_urls(variants + described[1:])
+    check("2. spelling variants of one problem become one problem",
+          sorted(url_by_slug) == ['add-two-numbers', 'two-sum'], f"problems={sorted(url_by_slug)}")
+    check("3. every URL maps to the problem it names",
+          all(slug_by_url[url] == 'two-sum' for url in variants)
+          and slug_by_url[described[1]] == 'add-two-numbers')
+
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nMigration URL grouping OK.")
+
+
+if __name__ == '__main__':
+    main()
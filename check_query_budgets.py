@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Query-budget regression check for every route.
+
+Runs a scripted pass over every registered endpoint against a throwaway
+database seeded from problem_sets/public, counts the SQL statements each
+request issues and fails when one goes over the budget declared in BUDGETS
+below. Routes missing from BUDGETS fail too, so new routes must declare one.
+
+Usage:
+    python check_query_budgets.py [--database-url URL] [--verbose]
+
+Defaults to a temporary SQLite file; pass --database-url to run against an
+empty PostgreSQL database instead. Exits non-zero on any failure and prints
+the statements issued by each offending request.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+# Budgets assume warm per-process caches (difficulty cache, compiled sets,
+# user state) except where a step says otherwise; they must not grow with
+# the number of problems, sets or progress rows. The first read after a write
+# reloads the user's state, which is where the extra query or two comes from.
+# Compiling a set (activate, load_problems) reads the difficulties it is
+# missing from the difficulty_cache table in 500-slug chunks. The stream
+# opened by stream_events stays open, so the writes after it also read back
+# the progress they publish to it.
+BUDGETS = {
+    'login': 0,
+    'register': 0,
+    'api_register': 5,
+    'api_logout': 2,
+    'api_login': 1,
+    'api_current_user': 2,
+    'index': 2,
+    'asset': 0,
+    'problem_sets_page': 1,
+    'get_problem_sets': 3,
+    'activate_problem_set': 7,
+    'check_problems': 3,
+    'bootstrap': 5,
+    'stream_events': 2,
+    'generate_problems': 8,
+    'mark_complete': 7,
+    'mark_skip': 9,
+    'mark_revisit': 7,
+    'get_progress': 5,
+    'get_list': 3,
+    'get_list_by_difficulty': 3,
+    'get_completed': 3,
+    'export_progress': 3,
+    'import_progress': 12,
+    'get_problem_set_stats': 3,
+    'get_problem_set_details': 3,
+    'search_problem_sets_api': 3,
+    'create_problem_set': 6,
+    'export_problem_set': 4,
+    'update_problem_set': 9,
+    'load_problems': 13,
+    'delete_problem_set': 9,
+    'reset_progress': 7,
+    'metrics': 0,
+}
+
+IGNORED_ENDPOINTS = {'static'}
+
+IMPORTED_COMPLETED = 200
+METRICS_TOKEN = 'budget-check'
+
+
+def seed_difficulty_cache(db, DifficultyCache, problem_slug):
+    """Fill difficulty_cache for every public problem so no request goes upstream."""
+    with open('difficulty_cache.json') as f:
+        known = {problem_slug(k): v for k, v in json.load(f).items()}
+
+    slugs = set()
+    for filename in os.listdir('problem_sets/public'):
+        if filename.endswith('.json'):
+            with open(os.path.join('problem_sets/public', filename)) as f:
+                for urls in json.load(f)['problems'].values():
+                    slugs.update(problem_slug(u) for u in urls)
+
+    db.session.add_all(DifficultyCache(problem_slug=s, difficulty=known.get(s, 'medium')) for s in slugs)
+    db.session.commit()
+
+
+def build_steps(state):
+    """Scripted pass over every route: (endpoint, method, path or callable, kwargs)."""
+    def first_session_url(offset):
+        return lambda: {'json': {'url': state['session'][offset]['url']}}
+
+    return [
+        ('login', 'GET', '/login', {}),
+        ('register', 'GET', '/register', {}),
+        ('api_register', 'POST', '/api/register',
+         {'json': {'username': 'budget', 'email': 'budget@example.com', 'password': 'secret1'}}),
+        ('api_logout', 'POST', '/api/logout', {}),
+        ('api_login', 'POST', '/api/login', {'json': {'username': 'budget', 'password': 'secret1'}}),
+        ('api_current_user', 'GET', '/api/current_user', {}),
+        ('index', 'GET', '/', {}),
+        ('asset', 'GET', lambda: f"/assets/{state['asset']}", {}),
+        ('problem_sets_page', 'GET', '/problem_sets', {}),
+        ('get_problem_sets', 'GET', '/api/problem_sets', {}),
+        ('activate_problem_set', 'POST', lambda: f"/api/problem_sets/{state['set_id']}/activate", {}),
+        ('check_problems', 'GET', '/api/check_problems', {}),
+        ('generate_problems', 'POST', '/api/generate', {'json': {'force_new': True}}),
+        ('generate_problems', 'POST', '/api/generate', {'json': {}}),
+        ('bootstrap', 'GET', '/api/bootstrap', {}),
+        ('stream_events', 'GET', '/api/events', {}),
+        ('mark_complete', 'POST', '/api/mark_complete', first_session_url(0)),
+        ('mark_skip', 'POST', '/api/mark_skip', first_session_url(1)),
+        ('mark_revisit', 'POST', '/api/mark_revisit', first_session_url(2)),
+        ('get_progress', 'GET', '/api/progress', {}),
+        ('get_list', 'GET', '/api/lists/skipped', {}),
+        ('get_list', 'GET', '/api/lists/revisit', {}),
+        ('get_list_by_difficulty', 'GET', '/api/lists/revisit/all', {}),
+        ('get_completed', 'GET', '/api/completed/global/all', {}),
+        ('get_completed', 'GET', '/api/completed/session/easy', {}),
+        ('export_progress', 'GET', '/api/export_progress', {}),
+        ('import_progress', 'POST', '/api/import_progress', lambda: {'json': state['import']}),
+        ('get_progress', 'GET', '/api/progress', {}),
+        ('get_problem_set_stats', 'GET', lambda: f"/api/problem_sets/{state['set_id']}/stats", {}),
+        ('get_problem_set_details', 'GET', lambda: f"/api/problem_set_details/{state['set_id']}", {}),
+        ('search_problem_sets_api', 'POST', '/api/search_problem_sets', {'json': {'query': 'neet'}}),
+        ('create_problem_set', 'POST', '/api/problem_sets',
+         lambda: {'json': {'name': 'Budget Set', 'problems_json': json.dumps(state['upload'])}}),
+        ('export_problem_set', 'GET', lambda: f"/api/problem_sets/{state['new_set_id']}/export", {}),
+        ('update_problem_set', 'PUT', lambda: f"/api/problem_sets/{state['new_set_id']}",
+         lambda: {'json': {'problems_json': json.dumps(state['update'])}}),
+        ('load_problems', 'POST', '/api/load_problems', lambda: {'data': {'json_text': json.dumps(state['load'])}}),
+        ('delete_problem_set', 'DELETE', lambda: f"/api/problem_sets/{state['new_set_id']}", {}),
+        ('reset_progress', 'POST', '/api/reset_progress', {}),
+        ('metrics', 'GET', '/metrics', {'headers': {'Authorization': f"Bearer {METRICS_TOKEN}"}}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url')
+    parser.add_argument('--verbose', action='store_true', help='Print statements for every request')
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    tmpdir = None
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmpdir.name, 'budget.db')}"
+
+    os.environ['METRICS_TOKEN'] = METRICS_TOKEN
+
+    from sqlalchemy import event
+    from app import app, db, static_assets, LeetCodeProblemSelector
+    from models import DifficultyCache
+    from problem_urls import problem_slug
+
+    with app.app_context():
+        seed_difficulty_cache(db, DifficultyCache, problem_slug)
+        LeetCodeProblemSelector._difficulty_cache.clear()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    public = {}
+    for filename in sorted(os.listdir('problem_sets/public')):
+        if filename.endswith('.json'):
+            with open(os.path.join('problem_sets/public', filename)) as f:
+                data = json.load(f)
+            public[data['id']] = data
+    all_urls = sorted({u for d in public.values() for urls in d['problems'].values() for u in urls})
+    set_id = next(i for i in sorted(public) if i.startswith('neetcode_150'))
+
+    state = {
+        'set_id': set_id,
+        'asset': static_assets.assets['js/index.js'].fingerprinted,
+        'upload': {'Budget': all_urls[:50]},
+        # Different contents from 'upload', so the full store path is measured, not a dedupe hit
+        'load': {'Uploaded': all_urls[50:100]},
+        # 'upload' with rows dropped, moved and added
+        'update': {'Budget': all_urls[60:65] + all_urls[10:40] + all_urls[45:50]},
+        'import': {'progress': {
+            'completed': all_urls[:IMPORTED_COMPLETED], 'skipped': all_urls[-20:], 'revisit': all_urls[-40:-20],
+            'global_stats': {}, 'current_session': {'problems': all_urls[:30]},
+        }},
+    }
+
+    client = app.test_client()
+    # Warm the per-process caches the budgets assume
+    client.get('/login')
+
+    failures = []
+    covered = set()
+    print(f"{'endpoint':<28} {'method':<7} {'path':<52} {'queries':>7} {'budget':>7}")
+    for endpoint, method, path, kwargs in build_steps(state):
+        path = path() if callable(path) else path
+        kwargs = kwargs() if callable(kwargs) else kwargs
+        statements.clear()
+        response = client.open(path, method=method, **kwargs)
+        issued = list(statements)
+        covered.add(endpoint)
+
+        if response.status_code >= 400:
+            failures.append((endpoint, path, f"HTTP {response.status_code}", issued))
+        body = response.get_json(silent=True) or {}
+        if endpoint == 'generate_problems':
+            state['session'] = body.get('problems', [])
+        elif endpoint == 'create_problem_set':
+            state['new_set_id'] = body.get('set_id')
+
+        budget = BUDGETS.get(endpoint)
+        over = budget is not None and len(issued) > budget
+        print(f"{endpoint:<28} {method:<7} {path[:52]:<52} {len(issued):>7} "
+              f"{'-' if budget is None else budget:>7}{'  OVER' if over else ''}")
+        if over:
+            failures.append((endpoint, path, f"{len(issued)} queries > budget {budget}", issued))
+        elif args.verbose:
+            for stmt in issued:
+                print(f"    {' '.join(stmt.split())[:160]}")
+
+    registered = {rule.endpoint for rule in app.url_map.iter_rules()} - IGNORED_ENDPOINTS
+    for endpoint in sorted(registered - covered):
+        failures.append((endpoint, '-', 'route not exercised by check_query_budgets.py', []))
+    for endpoint in sorted(registered - set(BUDGETS)):
+        failures.append((endpoint, '-', 'no budget declared in BUDGETS', []))
+
+    if tmpdir is not None:
+        with app.app_context():
+            db.engine.dispose()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"\n{len(failures)} failure(s):")
+        for endpoint, path, reason, issued in failures:
+            print(f"\n{endpoint} {path}: {reason}")
+            for stmt in issued:
+                print(f"    {' '.join(stmt.split())[:300]}")
+        sys.exit(1)
+    print("\nAll routes within budget.")
+
+
+if __name__ == '__main__':
+    main()
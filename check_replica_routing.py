@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Routing check for read replicas (db_routing.py) against two local databases.
+
+Builds a primary SQLite database, snapshots it into a replica file, then
+writes to the primary so the two differ and checks, by recording which
+database every statement ran on, that:
+
+  1. @replica_read GET routes read from the replica,
+  2. writes, and requests right after a user's own write, use the primary,
+  3. a replica that passed its connection check isn't probed again on
+     every routed request,
+  4. reads fall back to the primary when the replica is unreachable.
+
+Usage:
+    python check_replica_routing.py
+
+Exits non-zero on any failure.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+STICKY_SECONDS = 0.5
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    tmpdir = tempfile.TemporaryDirectory()
+    primary = os.path.join(tmpdir.name, 'primary.db')
+    replica = os.path.join(tmpdir.name, 'replica.db')
+    unreachable = os.path.join(tmpdir.name, 'missing', 'replica.db')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{primary}",
+        'DATABASE_REPLICA_URLS': f"sqlite:///{replica},sqlite:///{unreachable}",
+        'REPLICA_STICKY_SECONDS': str(STICKY_SECONDS),
+    })
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import app, db, replica_router
+    from check_query_budgets import seed_difficulty_cache
+    from models import DifficultyCache, ProblemSet
+    from problem_urls import problem_slug
+
+    with app.app_context():
+        seed_difficulty_cache(db, DifficultyCache, problem_slug)
+        set_id = db.session.query(ProblemSet.set_id).filter_by(is_public=True).order_by(ProblemSet.set_id).first()[0]
+
+    used = Counter()
+    event.listen(Engine, 'before_cursor_execute',
+                 lambda conn, *rest: used.update([os.path.basename(conn.engine.url.database)]))
+
+    client = app.test_client()
+    client.post('/api/register', json={'username': 'routing', 'email': 'routing@example.com', 'password': 'pw-routing'})
+    client.post(f"/api/problem_sets/{set_id}/activate")
+    url = client.post('/api/generate', json={'force_new': True}).get_json()['problems'][0]['url']
+    # "Replicate" up to here, then diverge: the primary has one completed problem, the replica none.
+    # The backup API includes commits still in the primary's WAL file, which a file copy would miss.
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+    failures = []
+
+    def check(label, method, path, expect, completed=None, **kwargs):
+        used.clear()
+        body = client.open(path, method=method, **kwargs).get_json() or {}
+        databases = set(used)
+        ok = databases == {expect}
+        if completed is not None:
+            ok = ok and body.get('global', {}).get('total') == completed
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<44} {method:<5} {path:<28} {', '.join(sorted(databases))}")
+        if not ok:
+            failures.append(label)
+
+    check('write goes to the primary', 'POST', '/api/mark_complete', 'primary.db', json={'url': url})
+    check('read right after own write: primary', 'GET', '/api/progress', 'primary.db', completed=1)
+    time.sleep(STICKY_SECONDS + 0.1)
+    check('read after the sticky window: replica', 'GET', '/api/progress', 'replica.db', completed=0)
+    check('second replica is down: first serves', 'GET', '/api/progress', 'replica.db', completed=0)
+    check('unmarked GET route stays on the primary', 'GET', '/api/current_user', 'primary.db')
+
+    # Each routed request opens the replica once for its own reads; a probe would be a second
+    connects = []
+
+    def connected(conn):
+        connects.append(conn)
+    with app.app_context():
+        replica_engine = db.engines['replica_0']
+    event.listen(replica_engine, 'engine_connect', connected)
+    for _ in range(3):
+        client.get('/api/progress')
+    event.remove(replica_engine, 'engine_connect', connected)
+    ok = len(connects) == 3
+    print(f"{'ok  ' if ok else 'FAIL'} {'healthy replica is not re-probed per request':<44} "
+          f"{len(connects)} replica connects for 3 reads")
+    if not ok:
+        failures.append('healthy replica is not re-probed per request')
+
+    replica_router.bind_keys = [k for k in replica_router.bind_keys if k != 'replica_0']
+    check('only replica down: primary fallback', 'GET', '/api/progress', 'primary.db', completed=1)
+
+    tmpdir.cleanup()
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nReplica routing OK.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Check of per-user rate limits and Idempotency-Key replay (request_limits.py).
+
+Runs the app through the Flask test client on a temporary SQLite database
+and checks, with keys held in the process and then on a fake Redis
+(benchmarks/fake_redis.py) with a fresh store per request standing in for
+another worker, that:
+
+  1. a repeated /api/generate with the same key replays the first session
+     instead of generating a new one,
+  2. reusing a key for a different body is refused with 422,
+  3. concurrent duplicates of /api/mark_skip run once: one replacement is
+     drawn and the others replay it,
+  4. a failed request (success: false) is not stored, so a retry with the
+     same key runs again,
+  5. a replay makes no database queries,
+  6. an upload repeated with its key replays, while a different upload of
+     the same size with that key is refused with 422,
+  7. past a route's burst the user gets 429 with Retry-After, other users
+     are unaffected, and replays don't use up the bucket.
+
+Usage:
+    python check_request_limits.py
+
+Exits non-zero on any failure.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from sqlalchemy import event
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, 'benchmarks')
+    import fake_leetcode
+    import fake_redis
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = fake_leetcode.start_server()
+    shared = fake_redis.start_server()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmpdir.name, 'request_limits.db')}",
+        'LEETCODE_GRAPHQL_URL': upstream.url,
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    })
+
+    from app import LeetCodeProblemSelector, app, db, request_limits
+    from models import ProblemSet
+    from request_limits import LocalIdempotencyStore, RedisIdempotencyStore
+
+    with app.app_context():
+        set_id = db.session.query(ProblemSet.set_id).filter_by(is_public=True).order_by(ProblemSet.set_id).first()[0]
+
+    failures = []
+
+    def check(label, ok, detail=''):
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<62} {detail}")
+        if not ok:
+            failures.append(label)
+
+    def new_user(name):
+        client = app.test_client()
+        client.post('/api/register', json={'username': name, 'email': f"{name}@example.com", 'password': 'pw-limits'})
+        client.post(f"/api/problem_sets/{set_id}/activate")
+        return client
+
+    def run(mode, new_store):
+        request_limits.store = new_store()
+        client = new_user(f"limits_{mode}")
+
+        key = {'Idempotency-Key': 'generate-1'}
+        first = client.post('/api/generate', json={'force_new': True}, headers=key)
+        request_limits.store = new_store()
+        again = client.post('/api/generate', json={'force_new': True}, headers=key)
+        check(f"[{mode}] 1. repeated key replays the first generate",
+              again.status_code == 200 and again.headers.get('Idempotent-Replayed') == 'true'
+              and again.json['problems'] == first.json['problems'])
+
+        other = client.post('/api/generate', json={'force_new': True, 'easy_count': 1}, headers=key)
+        check(f"[{mode}] 2. same key with a different body is refused", other.status_code == 422,
+              f"status={other.status_code}")
+
+        url = first.json['problems'][0]['url']
+        responses = []
+
+        def skip():
+            response = client.post('/api/mark_skip', json={'url': url}, headers={'Idempotency-Key': 'skip-1'})
+            responses.append(response)
+
+        threads = [threading.Thread(target=skip) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        replacements = {(r.json.get('replacement') or {}).get('url') for r in responses}
+        replayed = sum(r.headers.get('Idempotent-Replayed') == 'true' for r in responses)
+        check(f"[{mode}] 3. concurrent duplicate skips run once",
+              all(r.status_code == 200 for r in responses) and len(replacements) == 1 and replayed == 3,
+              f"replacements={len(replacements)} replayed={replayed}")
+
+        failing = {'Idempotency-Key': 'import-1'}
+        exported = client.get('/api/export_progress').json
+        original = LeetCodeProblemSelector.import_progress
+
+        def broken(self, import_data):
+            raise RuntimeError('database is locked')
+        LeetCodeProblemSelector.import_progress = broken
+        try:
+            failed = client.post('/api/import_progress', json=exported, headers=failing)
+        finally:
+            LeetCodeProblemSelector.import_progress = original
+        retried = client.post('/api/import_progress', json=exported, headers=failing)
+        check(f"[{mode}] 4. a failed request is not replayed to its retry",
+              not failed.json.get('success'), f"first={failed.json}")
+        check(f"[{mode}]    the retry ran",
+              retried.status_code == 200 and retried.json.get('success')
+              and retried.headers.get('Idempotent-Replayed') is None,
+              f"retry={retried.status_code} replayed={retried.headers.get('Idempotent-Replayed')}")
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            replayed = client.post('/api/generate', json={'force_new': True}, headers=key)
+        finally:
+            with app.app_context():
+                event.remove(db.engine, 'before_cursor_execute', count)
+        check(f"[{mode}] 5. a replay makes no database queries",
+              replayed.headers.get('Idempotent-Replayed') == 'true' and not statements,
+              f"statements={len(statements)}")
+
+        def upload(content, upload_key):
+            return client.post('/api/load_problems', headers={'Idempotency-Key': upload_key},
+                               data={'file': (io.BytesIO(content), 'problems.json')},
+                               content_type='multipart/form-data')
+        slug = f"two-sum-{mode}"
+        first_upload = json.dumps({'Arrays': [f"https://leetcode.com/problems/{slug}/"]}).encode('utf-8')
+        other_upload = first_upload.replace(b'Arrays', b'Arrayz')
+        stored = upload(first_upload, f"upload-{mode}")
+        repeated = upload(first_upload, f"upload-{mode}")
+        different = upload(other_upload, f"upload-{mode}")
+        check(f"[{mode}] 6. a repeated upload replays, a different one is refused",
+              stored.json.get('success') and repeated.headers.get('Idempotent-Replayed') == 'true'
+              and different.status_code == 422,
+              f"first={stored.json.get('success')} repeat={repeated.headers.get('Idempotent-Replayed')} "
+              f"different={different.status_code}")
+
+        # generate's burst is 5 and one was used above; replays and the 422 took none
+        codes = [client.post('/api/generate', json={'force_new': True}).status_code for _ in range(5)]
+        limited = client.post('/api/generate', json={'force_new': True})
+        bystander = new_user(f"bystander_{mode}").post('/api/generate', json={'force_new': True})
+        check(f"[{mode}] 7. past the burst: 429 with Retry-After, others unaffected",
+              codes == [200] * 4 + [429] and limited.status_code == 429
+              and int(limited.headers.get('Retry-After', 0)) >= 1 and bystander.status_code == 200,
+              f"codes={codes + [limited.status_code]} bystander={bystander.status_code}")
+
+    try:
+        run('local', lambda: request_limits.store if isinstance(request_limits.store, LocalIdempotencyStore)
+            else LocalIdempotencyStore(10000, 600))
+        run('shared', lambda: RedisIdempotencyStore(shared.url))
+    finally:
+        shared.stop()
+        upstream.shutdown()
+        tmpdir.cleanup()
+
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nRequest limits OK.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Check of the shared cache tier (shared_cache.py) against a fake Redis.
+
+Uses a temporary SQLite database, a fake LeetCode upstream and a fake
+Redis (benchmarks/fake_redis.py). Emptying this process's cache tiers
+stands in for a second worker, and checks that:
+
+  1. the first activation of a set fetches its difficulties upstream,
+  2. another worker gets the compiled set from the shared tier, with no
+     upstream fetches and no problem set queries,
+  3. with the compiled set gone, difficulties still come from the shared
+     tier rather than the database or upstream,
+  4. with the shared cache down, requests still succeed without it and
+     the failures are counted, not raised.
+
+Usage:
+    python check_shared_cache.py
+
+Exits non-zero on any failure.
+"""
+
+import os
+import sys
+import tempfile
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, 'benchmarks')
+    import fake_leetcode
+    import fake_redis
+
+    tmpdir = tempfile.TemporaryDirectory()
+    upstream = fake_leetcode.start_server()
+    shared = fake_redis.start_server()
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(tmpdir.name, 'shared_cache.db')}",
+        'LEETCODE_GRAPHQL_URL': upstream.url,
+        'SHARED_CACHE_URL': shared.url,
+    })
+
+    from sqlalchemy import event
+    from app import app, db, difficulty_cache, compiled_set_cache, problem_table, request_metrics
+    from models import DifficultyCache, Problem, ProblemSet
+
+    with app.app_context():
+        set_id = db.session.query(ProblemSet.set_id).filter_by(is_public=True).order_by(ProblemSet.set_id).first()[0]
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    failures = []
+
+    def lookups(cache, tier, result):
+        return request_metrics.cache_lookups._values.get((cache, tier, result), 0)
+
+    def new_worker():
+        difficulty_cache.clear()
+        compiled_set_cache.clear()
+        problem_table.clear()
+
+    def activate(label, username, expect_fetches=None, expect_set_queries=None, expect_lookups=None):
+        expect_lookups = expect_lookups or {}
+        client = app.test_client()
+        client.post('/api/register', json={'username': username, 'email': f"{username}@example.com",
+                                           'password': 'pw-shared'})
+        fetches = upstream.stats()['requests']
+        before = {key: lookups(*key) for key in expect_lookups}
+        del statements[:]
+        response = client.post(f"/api/problem_sets/{set_id}/activate")
+        fetched = upstream.stats()['requests'] - fetches
+        set_queries = sum('FROM problem_set_problems' in s for s in statements)
+        moved = {key: lookups(*key) - before[key] for key in expect_lookups}
+
+        ok = response.status_code == 200
+        ok = ok and (expect_fetches is None or fetched == expect_fetches)
+        ok = ok and (expect_set_queries is None or set_queries == expect_set_queries)
+        ok = ok and all((moved[key] > 0) == expected for key, expected in expect_lookups.items())
+        counts = ' '.join(f"{'/'.join(key)}+{moved[key]}" for key in expect_lookups)
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<46} status={response.status_code} upstream={fetched} "
+              f"set_queries={set_queries} {counts}")
+        if not ok:
+            failures.append(label)
+        return fetched
+
+    cold = activate('cold start fetches upstream', 'shared1')
+    if not cold:
+        failures.append('cold start made no upstream fetches')
+
+    new_worker()
+    activate('another worker: compiled set from shared tier', 'shared2', expect_fetches=0, expect_set_queries=0,
+             expect_lookups={('compiled_set', 'shared', 'hit'): True})
+
+    new_worker()
+    for key in [k for k in shared.data if b':compiled_set:' in k]:
+        del shared.data[key]
+    with app.app_context():
+        DifficultyCache.query.delete()
+        Problem.query.update({Problem.difficulty: None})
+        db.session.commit()
+    activate('recompile: difficulties from shared tier', 'shared3', expect_fetches=0,
+             expect_lookups={('difficulty', 'shared', 'hit'): True, ('difficulty', 'shared', 'miss'): False})
+
+    shared.stop()
+    new_worker()
+    activate('shared cache down: request still succeeds', 'shared4',
+             expect_lookups={('compiled_set', 'shared', 'error'): True})
+
+    upstream.shutdown()
+    tmpdir.cleanup()
+    if failures:
+        print(f"\n{len(failures)} failure(s)")
+        sys.exit(1)
+    print("\nShared cache OK.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Read-replica routing for the Flask-SQLAlchemy session.
+
+Replicas are ordinary SQLALCHEMY_BINDS named replica_0, replica_1, ... with
+no models bound to them. A request to a view marked @replica_read is given
+a healthy replica (round robin) in session.info, and RoutingSession sends
+that request's reads there. Flushes and DML always go to the primary, and
+once a request has written, the rest of it reads from the primary too.
+
+After a write, ReplicaRouter keeps the user on the primary for
+REPLICA_STICKY_SECONDS (stored in the signed session cookie, so it holds
+across workers) so users read their own writes despite replication lag. A
+replica whose connection check fails is skipped for REPLICA_RETRY_SECONDS
+and its reads fall back to the primary; one that passes isn't checked again
+for REPLICA_HEALTH_SECONDS, so routed requests don't each pay for a probe.
+"""
+
+import itertools
+import threading
+import time
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import DBAPIError
+
+REPLICA_KEY = 'replica_engine'
+WROTE_KEY = 'wrote_primary'
+STICKY_COOKIE_KEY = 'primary_until'
+REPLICA_PREFIX = 'replica_'
+
+
+def replica_read(view):
+    """Mark a read-only view as safe to serve from a read replica."""
+    view.replica_read = True
+    return view
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and (self._flushing or getattr(clause, 'is_dml', False)):
+            # Writes go to the primary, and so does everything the request reads after them
+            self.info[WROTE_KEY] = True
+            self.info.pop(REPLICA_KEY, None)
+        elif bind is None and self.info.get(REPLICA_KEY) is not None:
+            return self.info[REPLICA_KEY]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.db = None
+        self.bind_keys = []
+        self.sticky_seconds = 5
+        self.retry_seconds = 30
+        self.health_seconds = 5
+        self._down_until = {}
+        self._healthy_until = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self.db = db
+        self.bind_keys = sorted(k for k in app.config.get('SQLALCHEMY_BINDS') or {} if k.startswith(REPLICA_PREFIX))
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        self.retry_seconds = app.config.get('REPLICA_RETRY_SECONDS', self.retry_seconds)
+        self.health_seconds = app.config.get('REPLICA_HEALTH_SECONDS', self.health_seconds)
+        if self.bind_keys:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, 'replica_read', False):
+            return
+        if session.get(STICKY_COOKIE_KEY, 0) > time.time():
+            return
+        engine = self.healthy_replica()
+        if engine is not None:
+            self.db.session.info[REPLICA_KEY] = engine
+
+    def _after_request(self, response):
+        if self.db.session.info.get(WROTE_KEY):
+            session[STICKY_COOKIE_KEY] = time.time() + self.sticky_seconds
+        return response
+
+    def healthy_replica(self):
+        """A replica engine that accepts connections, or None to use the primary."""
+        start = next(self._counter)
+        for i in range(len(self.bind_keys)):
+            key = self.bind_keys[(start + i) % len(self.bind_keys)]
+            now = time.monotonic()
+            if self._down_until.get(key, 0) > now:
+                continue
+            engine = self.db.engines[key]
+            if self._healthy_until.get(key, 0) > now:
+                return engine
+            try:
+                engine.connect().close()
+            except DBAPIError as e:
+                with self._lock:
+                    self._down_until[key] = time.monotonic() + self.retry_seconds
+                    self._healthy_until.pop(key, None)
+                print(f"Replica {key} unavailable, reading from the primary for {self.retry_seconds}s: {e}")
+                continue
+            with self._lock:
+                self._healthy_until[key] = time.monotonic() + self.health_seconds
+            return engine
+        return None
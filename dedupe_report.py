@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Storage report for content-addressed problem set de-duplication.
+
+Prints how many problem_set_problems rows uploads avoided by activating an
+identical existing set (problem_sets.dedupe_hits x set size), and lists
+groups of sets that still share a content_hash, e.g. copies stored before
+de-duplication or identical sets owned by different users, with the rows
+they hold beyond the first copy.
+
+Usage:
+    python dedupe_report.py [--json report.json] [--top 20]
+
+Requires migrations/005_problem_set_content_hash.py. Set DATABASE_URL env var
+to override the default connection string.
+"""
+
+import argparse
+import json
+import os
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func  # noqa: E402
+
+from app import app, db  # noqa: E402
+from models import ProblemSet, ProblemSetProblem  # noqa: E402
+
+
+def build_report(top: int) -> dict:
+    sizes = dict(db.session.query(ProblemSetProblem.problem_set_id, func.count(ProblemSetProblem.id))
+                 .group_by(ProblemSetProblem.problem_set_id).all())
+    sets = db.session.query(ProblemSet.id, ProblemSet.set_id, ProblemSet.is_public, ProblemSet.owner_user_id,
+                            ProblemSet.content_hash, ProblemSet.dedupe_hits).all()
+
+    saved_rows = sum((s.dedupe_hits or 0) * sizes.get(s.id, 0) for s in sets)
+    groups = {}
+    for s in sets:
+        if s.content_hash:
+            groups.setdefault(s.content_hash, []).append(s)
+
+    duplicates = []
+    for content_hash, members in groups.items():
+        if len(members) < 2:
+            continue
+        size = sizes.get(members[0].id, 0)
+        duplicates.append({
+            'content_hash': content_hash,
+            'rows_per_copy': size,
+            'extra_rows': size * (len(members) - 1),
+            'sets': [{'set_id': m.set_id, 'is_public': m.is_public, 'owner_user_id': m.owner_user_id}
+                     for m in members],
+        })
+    duplicates.sort(key=lambda d: d['extra_rows'], reverse=True)
+
+    return {
+        'problem_sets': len(sets),
+        'unhashed_sets': sum(1 for s in sets if not s.content_hash),
+        'stored_rows': sum(sizes.values()),
+        'dedupe_hits': sum(s.dedupe_hits or 0 for s in sets),
+        'rows_saved': saved_rows,
+        'duplicate_groups': len(duplicates),
+        'duplicate_rows': sum(d['extra_rows'] for d in duplicates),
+        'top_duplicates': duplicates[:top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--top', type=int, default=20, help='Duplicate groups to list')
+    args = parser.parse_args()
+
+    with app.app_context():
+        report = build_report(args.top)
+
+    print(f"{report['problem_sets']} problem sets, {report['stored_rows']:,} stored problem rows "
+          f"({report['unhashed_sets']} without a content hash)")
+    print(f"Uploads answered by an existing set: {report['dedupe_hits']:,}, "
+          f"rows not stored: {report['rows_saved']:,}")
+    print(f"Sets sharing contents: {report['duplicate_groups']} groups holding "
+          f"{report['duplicate_rows']:,} rows beyond the first copy")
+    for d in report['top_duplicates']:
+        ids = ', '.join(s['set_id'] for s in d['sets'])
+        print(f"  {d['content_hash'][:12]}  {d['extra_rows']:>8,} rows  {ids}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == '__main__':
+    main()
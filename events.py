@@ -0,0 +1,235 @@
+"""Per-user live update streams (Server-Sent Events).
+
+A write that changes what a user sees (a mark, a new session, an import or
+a reset) publishes one small event after it commits, and every open
+/api/events stream of that user, in any tab or on any device, receives it.
+Open pages apply events instead of polling and refetching after each
+action.
+
+EventBroker fans events out inside a process to per-stream bounded queues.
+With EVENTS_URL (redis://[:password@]host:port/db) set, events are
+PUBLISHed on one channel and a listener thread in every worker SUBSCRIBEs
+to it and delivers them locally, so a stream served by one worker sees
+writes handled by another. The backend is best effort: when it is
+unreachable events are delivered within the process only, and the backend
+is retried after EVENTS_RETRY_SECONDS. A stream that may have missed
+events (queue overflow, listener reconnect) gets a ``resync`` event and
+the page refetches its state.
+
+Each open stream holds a worker thread for up to EVENTS_STREAM_SECONDS, so
+EVENTS_MAX_STREAMS caps them per process; past the cap, or with it set to
+0, /api/events answers 503 and pages fall back to refetching after writes.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from shared_cache import FORMAT_VERSION, RespClient, SharedCacheError
+
+
+class Subscription:
+    """One open stream's queue of (event, data) pairs."""
+
+    def __init__(self, user_id: int, max_queued: int):
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(max_queued)
+
+    def put(self, event: str, data: Dict):
+        try:
+            self._queue.put_nowait((event, data))
+        except queue.Full:
+            # The stream is not keeping up; it will tell the page to resync
+            self.overflowed = True
+
+    def get(self, timeout: float):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self):
+        while self.get(0) is not None:
+            pass
+
+
+class RedisPubSub:
+    """Cross-worker backend: PUBLISH on a Redis-protocol channel, one SUBSCRIBE listener per process."""
+
+    def __init__(self, url: str, channel: str, retry_seconds: float = 30, timeout: float = 0.25):
+        self.client = RespClient(url, timeout)
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_listener)
+
+    def _forget_listener(self):
+        # Threads don't survive fork; a worker starts its own on first use
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, e: Exception):
+        self._down_until = time.monotonic() + self.retry_seconds
+        print(f"Event backend unavailable, delivering locally for {self.retry_seconds}s: {e}")
+
+    def publish(self, message: bytes) -> bool:
+        """False when the backend is down (the caller delivers locally instead)."""
+        if not self.available:
+            return False
+        try:
+            self.client.pipeline([('PUBLISH', self.channel, message)])
+            return True
+        except (OSError, SharedCacheError) as e:
+            self._failed(e)
+            return False
+
+    def start(self, deliver, resync):
+        """Start this process's listener: deliver(message) per event, resync() after each reconnect."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, args=(deliver, resync),
+                                                  name='event-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self, deliver, resync):
+        while True:
+            try:
+                for message in self.client.subscribe(self.channel):
+                    if message is None:
+                        # Anything published while we were not subscribed is lost
+                        resync()
+                    else:
+                        deliver(message)
+            except (OSError, SharedCacheError) as e:
+                print(f"Event listener disconnected, retrying in {self.retry_seconds}s: {e}")
+            time.sleep(self.retry_seconds)
+
+
+class EventBroker:
+    """Fans out per-user events to open streams, optionally across workers via a RedisPubSub backend."""
+
+    def __init__(self):
+        self.backend: Optional[RedisPubSub] = None
+        self.max_streams = 0
+        self.max_queued = 100
+        self.heartbeat_seconds = 15.0
+        self.stream_seconds = 300.0
+        self.reconnect_ms = 3000
+        self.metrics = None
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_subscribers)
+
+    def init_app(self, app, metrics=None):
+        self.max_streams = app.config.get('EVENTS_MAX_STREAMS', 0)
+        self.max_queued = app.config.get('EVENTS_QUEUE_SIZE', 100)
+        self.heartbeat_seconds = app.config.get('EVENTS_HEARTBEAT_SECONDS', 15.0)
+        self.stream_seconds = app.config.get('EVENTS_STREAM_SECONDS', 300.0)
+        self.metrics = metrics
+        url = app.config.get('EVENTS_URL')
+        if url:
+            self.backend = RedisPubSub(url, f"lcs:{FORMAT_VERSION}:events",
+                                       app.config.get('EVENTS_RETRY_SECONDS', 30))
+
+    def _forget_subscribers(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def open_streams(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """A new subscription for user_id, or None when this process is at EVENTS_MAX_STREAMS."""
+        with self._lock:
+            if sum(len(subs) for subs in self._subscribers.values()) >= self.max_streams:
+                return None
+            subscription = Subscription(user_id, self.max_queued)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        if self.backend is not None:
+            self.backend.start(self._deliver_message, self._resync_all)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subs = self._subscribers.get(subscription.user_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[subscription.user_id]
+
+    def may_deliver(self, user_id: int) -> bool:
+        """Whether an event for user_id could reach a stream (with a backend, one may be open in another worker)."""
+        if self.backend is not None and self.backend.available:
+            return True
+        with self._lock:
+            return user_id in self._subscribers
+
+    def publish(self, user_id: int, event: str, data: Dict):
+        """Send event to every open stream of user_id, in this process and, with a backend, all others."""
+        if self.backend is not None:
+            message = json.dumps({'user_id': user_id, 'event': event, 'data': data}, separators=(',', ':'))
+            if self.backend.publish(message.encode('utf-8')):
+                self._count(event, 'shared')
+                return
+        self._count(event, 'local')
+        self._deliver(user_id, event, data)
+
+    def _count(self, event: str, delivery: str):
+        if self.metrics is not None:
+            self.metrics.events.inc((event, delivery))
+
+    def _deliver(self, user_id: int, event: str, data: Dict):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for subscription in subs:
+            subscription.put(event, data)
+
+    def _deliver_message(self, message: bytes):
+        try:
+            payload = json.loads(message)
+            self._deliver(payload['user_id'], payload['event'], payload['data'])
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    def _resync_all(self):
+        with self._lock:
+            subs = [s for user_subs in self._subscribers.values() for s in user_subs]
+        for subscription in subs:
+            subscription.put('resync', {})
+
+    def stream(self, subscription: Subscription):
+        """SSE text for subscription until EVENTS_STREAM_SECONDS pass (the page reconnects) or the client leaves."""
+        deadline = time.monotonic() + self.stream_seconds
+        try:
+            # Sent at once, so the page knows the stream is live
+            yield f"retry: {self.reconnect_ms}\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    subscription.drain()
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                item = subscription.get(min(self.heartbeat_seconds, remaining))
+                if item is None:
+                    # A comment line keeps proxies from timing out the idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+        finally:
+            self.unsubscribe(subscription)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Garbage collection for rows nothing refers to any more.
+
+Policies, each applied in bounded batches with a commit per batch so no
+transaction holds locks for long:
+
+  uploaded-sets     private uploaded_* sets older than --upload-retention-days
+                    that no user has active, with their problem rows. Each set
+                    is first claimed (renamed gc-<id>, no owner) so it can't be
+                    activated; its rows then go a batch per transaction and the
+                    set row last, and a run that stops midway is finished by
+                    the next
+  dangling-active   user_active_sets rows naming a set_id that no longer exists
+                    (set_id is not a foreign key)
+  session-problems  problem ids in user_sessions.problem_ids that are no longer
+                    in any problem set (e.g. removed by a set update)
+  idle-sessions     sessions not regenerated for --session-retention-days whose
+                    user has no active set
+
+Policies run in the order above, so a later one also collects what an
+earlier one orphaned; --dry-run counts each against the current data and can
+under-count those knock-on rows. Progress rows are user data and are never
+collected. Every user whose rows change has its state_version bumped, so
+running workers reload their state.
+
+Usage:
+    python garbage_collect.py --dry-run
+    python garbage_collect.py [--upload-retention-days 30] [--session-retention-days 180]
+                              [--batch-size 500] [--only uploaded-sets,dangling-active]
+
+Set DATABASE_URL env var to override the default connection string.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import String, and_, cast, delete, exists, func, literal, or_, update  # noqa: E402
+
+from app import app, db, user_states  # noqa: E402
+from models import ProblemSet, ProblemSetProblem, UserActiveSet, UserSession  # noqa: E402
+
+POLICIES = ('uploaded-sets', 'dangling-active', 'session-problems', 'idle-sessions')
+# set_id of an uploaded set being collected, gc-<problem_sets.id>; generated
+# set ids never contain '-', so no live set can match it
+CLAIMED_PREFIX = 'gc-'
+
+
+def orphaned_upload_filter(cutoff):
+    """Uploaded sets past retention that nobody has active, as one set-based condition."""
+    return (ProblemSet.set_id.like('uploaded\\_%', escape='\\'),
+            ProblemSet.is_public == False,  # noqa: E712
+            ProblemSet.created_at < cutoff,
+            ~exists().where(UserActiveSet.set_id == ProblemSet.set_id))
+
+
+def claimed_filter():
+    """Sets claimed for collection by an earlier (possibly interrupted) run."""
+    return and_(ProblemSet.set_id.like(f"{CLAIMED_PREFIX}%"),
+                ProblemSet.is_public == False,  # noqa: E712
+                ProblemSet.owner_user_id == None)  # noqa: E711
+
+
+def collect_uploaded_sets(args, report):
+    conditions = orphaned_upload_filter(datetime.utcnow() - timedelta(days=args.upload_retention_days))
+    if args.dry_run:
+        sets, rows = db.session.query(func.count(func.distinct(ProblemSet.id)), func.count(ProblemSetProblem.id)) \
+            .outerjoin(ProblemSetProblem, ProblemSetProblem.problem_set_id == ProblemSet.id) \
+            .filter(or_(and_(*conditions), claimed_filter())).one()
+        report['problem_sets'] += sets
+        report['problem_set_problems'] += rows
+        return
+
+    # Claim the sets first, in one short transaction per batch: renamed to
+    # gc-<id> and ownerless, nobody can activate, list or dedupe onto them
+    # while their rows are deleted over many transactions below
+    while True:
+        batch = db.session.query(ProblemSet.id, ProblemSet.owner_user_id) \
+            .filter(*conditions).order_by(ProblemSet.id).limit(args.batch_size).all()
+        if not batch:
+            break
+        # Conditions re-checked on update: a set activated meanwhile is kept
+        db.session.execute(
+            update(ProblemSet).where(ProblemSet.id.in_([set_pk for set_pk, _ in batch]), *conditions)
+            .values(set_id=literal(CLAIMED_PREFIX) + cast(ProblemSet.id, String), owner_user_id=None),
+            execution_options={'synchronize_session': False}
+        )
+        for owner_user_id in {owner for _, owner in batch if owner is not None}:
+            user_states.touch(db.session, owner_user_id)
+        db.session.commit()
+
+    # Then each claimed set's rows, a commit per batch, and the set row last
+    while True:
+        set_pk = db.session.query(ProblemSet.id).filter(claimed_filter()).order_by(ProblemSet.id).limit(1).scalar()
+        if set_pk is None:
+            return
+        while True:
+            row_ids = [i for (i,) in db.session.query(ProblemSetProblem.id)
+                       .filter(ProblemSetProblem.problem_set_id == set_pk).limit(args.batch_size)]
+            if not row_ids:
+                break
+            db.session.execute(delete(ProblemSetProblem).where(ProblemSetProblem.id.in_(row_ids)))
+            db.session.commit()
+            report['problem_set_problems'] += len(row_ids)
+        db.session.execute(delete(ProblemSet).where(ProblemSet.id == set_pk))
+        db.session.commit()
+        report['problem_sets'] += 1
+
+
+def collect_dangling_active_sets(args, report):
+    dangling = ~exists().where(ProblemSet.set_id == UserActiveSet.set_id)
+    if args.dry_run:
+        report['user_active_sets'] += db.session.query(func.count(UserActiveSet.user_id)).filter(dangling).scalar()
+        return
+
+    while True:
+        user_ids = [u for (u,) in db.session.query(UserActiveSet.user_id).filter(dangling)
+                    .order_by(UserActiveSet.user_id).limit(args.batch_size)]
+        if not user_ids:
+            return
+        db.session.execute(delete(UserActiveSet).where(UserActiveSet.user_id.in_(user_ids), dangling))
+        for user_id in user_ids:
+            user_states.touch(db.session, user_id)
+        db.session.commit()
+        report['user_active_sets'] += len(user_ids)
+
+
+def scan_session_problems(in_any_set, after_user_id: int, limit: int):
+    """(last user id scanned, changes) for the next page of sessions; None when there are no more.
+
+    Each change is (user_id, version read, kept problem ids, ids dropped).
+    """
+    # Keyset pagination over sessions; arrays are filtered here because
+    # JSON array operators differ between PostgreSQL and SQLite
+    sessions = db.session.query(UserSession.user_id, UserSession.problem_ids, UserSession.version) \
+        .filter(UserSession.user_id > after_user_id) \
+        .order_by(UserSession.user_id).limit(limit).all()
+    if not sessions:
+        return None
+    changes = []
+    for user_id, problem_ids, version in sessions:
+        kept = [pid for pid in problem_ids or () if pid in in_any_set]
+        if len(kept) != len(problem_ids or ()):
+            changes.append((user_id, version, kept, len(problem_ids) - len(kept)))
+    return sessions[-1].user_id, changes
+
+
+def rewrite_session_problems(changes) -> list:
+    """Write scanned changes as a compare-and-set on each session's version; the changes applied.
+
+    A session regenerated, skipped into or marked since the scan has a
+    newer version and is left alone; the next run looks at it again.
+    """
+    applied = []
+    for user_id, version, kept, dropped in changes:
+        result = db.session.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.version == version)
+            .values(problem_ids=kept, version=version + 1)
+        )
+        if result.rowcount:
+            user_states.touch(db.session, user_id)
+            applied.append((user_id, version, kept, dropped))
+    db.session.commit()
+    return applied
+
+
+def collect_session_problems(args, report):
+    in_any_set = {pid for (pid,) in db.session.query(ProblemSetProblem.problem_id).distinct()}
+    last_user_id = 0
+    while True:
+        page = scan_session_problems(in_any_set, last_user_id, args.batch_size)
+        if page is None:
+            return
+        last_user_id, changes = page
+        if not args.dry_run and changes:
+            changes = rewrite_session_problems(changes)
+        report['session_problem_ids'] += sum(dropped for *_, dropped in changes)
+        report['sessions_rewritten'] += len(changes)
+
+
+def collect_idle_sessions(args, report):
+    cutoff = datetime.utcnow() - timedelta(days=args.session_retention_days)
+    idle = ((UserSession.generated_at == None) | (UserSession.generated_at < cutoff),  # noqa: E711
+            ~exists().where(UserActiveSet.user_id == UserSession.user_id))
+    if args.dry_run:
+        report['user_sessions'] += db.session.query(func.count(UserSession.user_id)).filter(*idle).scalar()
+        return
+
+    while True:
+        user_ids = [u for (u,) in db.session.query(UserSession.user_id).filter(*idle)
+                    .order_by(UserSession.user_id).limit(args.batch_size)]
+        if not user_ids:
+            return
+        db.session.execute(delete(UserSession).where(UserSession.user_id.in_(user_ids), *idle))
+        for user_id in user_ids:
+            user_states.touch(db.session, user_id)
+        db.session.commit()
+        report['user_sessions'] += len(user_ids)
+
+
+COLLECTORS = {
+    'uploaded-sets': collect_uploaded_sets,
+    'dangling-active': collect_dangling_active_sets,
+    'session-problems': collect_session_problems,
+    'idle-sessions': collect_idle_sessions,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dry-run', action='store_true', help='Count what would be collected; change nothing')
+    parser.add_argument('--upload-retention-days', type=int, default=30)
+    parser.add_argument('--session-retention-days', type=int, default=180)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(POLICIES)}")
+    args = parser.parse_args()
+
+    policies = args.only.split(',') if args.only else list(POLICIES)
+    unknown = set(policies) - set(POLICIES)
+    if unknown:
+        parser.error(f"unknown policy: {', '.join(sorted(unknown))}")
+
+    report = dict.fromkeys(['problem_sets', 'problem_set_problems', 'user_active_sets',
+                            'session_problem_ids', 'sessions_rewritten', 'user_sessions'], 0)
+    with app.app_context():
+        for policy in policies:
+            started = time.perf_counter()
+            COLLECTORS[policy](args, report)
+            print(f"{policy:<18} done in {time.perf_counter() - started:.2f}s")
+
+    verb = 'Would reclaim' if args.dry_run else 'Reclaimed'
+    print(f"\n{verb}:")
+    for key, count in report.items():
+        print(f"  {key:<22} {count:>10,}")
+
+
+if __name__ == '__main__':
+    main()
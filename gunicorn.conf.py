@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration: preload the app in the master, then fork workers.
+
+The master imports the app once (schema check and public set seeding run
+once, not per worker), compiles every public problem set with its
+difficulties, then forks. Workers start with warm caches and share those
+pages copy-on-write instead of each building its own copy on first use.
+gc.freeze() moves everything loaded so far out of the collector's reach,
+so garbage collections in a worker don't write to (and so copy) the
+shared pages. Each worker then starts its password hashing pool before it
+serves.
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+    GUNICORN_PRELOAD=0 gunicorn -c gunicorn.conf.py   # import and warm up per worker
+
+Settings come from the environment: GUNICORN_BIND (default 0.0.0.0:8000),
+WEB_CONCURRENCY (workers, default 2 x CPUs + 1), GUNICORN_WORKER_CLASS
+(default gthread), GUNICORN_THREADS (default 4), GUNICORN_TIMEOUT
+(default 60) and GUNICORN_PRELOAD (default 1). Command-line flags
+override them. benchmarks/preload.py compares worker memory and
+time-to-first-request with and without preloading.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+wsgi_app = 'app:create_app()' if preload_app else 'app:app'
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is built and before the first fork
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the app is loaded and before its threads start,
+    # so the password hashing pool can fork safely (see password_hashing.py)
+    from app import password_hasher
+    password_hasher.start()
@@ -0,0 +1,254 @@
+"""Per-request SQL and latency instrumentation exposed as Prometheus text.
+
+For every request this records wall time, number of SQL statements, time
+spent in the database and time spent waiting on outbound HTTP (difficulty
+fetches), labelled by Flask endpoint. /metrics renders the histograms in the
+Prometheus text exposition format. Requests slower than SLOW_REQUEST_MS are
+logged together with the SQL they ran.
+
+Time spent waiting for a pooled connection is only measured when the engine
+uses TimedQueuePool. With SERVER_TIMING enabled each response also carries
+a Server-Timing header, so load tests can aggregate across workers.
+
+Metrics are per process; under gunicorn each worker reports its own series.
+/metrics is only served with METRICS_TOKEN configured, to requests that
+send it as a bearer token: route names, SQL counts and pool state are not
+for the public. SQL is timed on the app's own engines only.
+"""
+
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from flask import Response, abort, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+MAX_RECORDED_STATEMENTS = 200
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets, label_names=('endpoint',)):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        # labels -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = ',' if base else ''
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{base}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            lines.append(f'{self.name}{{{base}}} {value}')
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestStats:
+    """What one request spent its time on."""
+    __slots__ = ('started', 'query_count', 'db_seconds', 'pool_wait_seconds', 'http_seconds', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.http_seconds = 0.0
+        self.statements: List[Tuple[float, str]] = []
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that charges time spent getting a connection to the current request."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats = RequestMetrics.current()
+            if stats is not None:
+                stats.pool_wait_seconds += time.perf_counter() - started
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.slow_request_ms = None
+        self.server_timing = False
+        self.token = None
+        self.requests = Counter('app_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+        self.request_seconds = Histogram('app_request_duration_seconds', 'Wall time per request', LATENCY_BUCKETS)
+        self.db_queries = Histogram('app_db_queries_per_request', 'SQL statements per request', QUERY_COUNT_BUCKETS)
+        self.db_seconds = Histogram('app_db_seconds_per_request', 'Time spent in SQL per request', LATENCY_BUCKETS)
+        self.pool_wait_seconds = Histogram('app_db_pool_wait_seconds_per_request',
+                                           'Time spent waiting for a pooled DB connection per request',
+                                           LATENCY_BUCKETS)
+        self.http_seconds = Histogram('app_outbound_http_seconds_per_request',
+                                      'Time spent waiting on outbound HTTP per request', LATENCY_BUCKETS)
+        self.cache_lookups = Counter('app_cache_lookups_total', 'Cache lookups by cache, tier and result',
+                                     ('cache', 'tier', 'result'))
+        self.events = Counter('app_events_published_total', 'Live update events published by event and delivery',
+                              ('event', 'delivery'))
+        self.password_hashes = Counter('app_password_hash_jobs_total', 'Password hash jobs by operation and result',
+                                       ('operation', 'result'))
+        self.rate_limited = Counter('app_rate_limited_total', 'Requests rejected by per-user rate limits',
+                                    ('endpoint',))
+        self.idempotency = Counter('app_idempotency_keys_total', 'Requests with an Idempotency-Key by result',
+                                   ('endpoint', 'result'))
+        self._logger = None
+
+    def init_app(self, app, db):
+        self.slow_request_ms = app.config.get('SLOW_REQUEST_MS')
+        self.server_timing = app.config.get('SERVER_TIMING', False)
+        self.token = app.config.get('METRICS_TOKEN')
+        self._logger = app.logger
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    @staticmethod
+    def current() -> RequestStats:
+        """Stats for the request being served, or None outside a request."""
+        if not has_app_context():
+            return None
+        return g.get('request_stats')
+
+    # -- SQLAlchemy hooks ------------------------------------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's context, not the connection: a statement that
+        # raises never reaches after_cursor_execute, and its context goes with it
+        context.query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = context.query_started
+        stats = self.current()
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - started
+        stats.query_count += 1
+        stats.db_seconds += elapsed
+        if self.slow_request_ms and len(stats.statements) < MAX_RECORDED_STATEMENTS:
+            stats.statements.append((elapsed, statement))
+
+    # -- Outbound HTTP ---------------------------------------------------
+
+    @contextmanager
+    def track_outbound(self):
+        """Charge the enclosed block's wall time to the current request's outbound HTTP time."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.current()
+            if stats is not None:
+                stats.http_seconds += time.perf_counter() - started
+
+    # -- Flask hooks -----------------------------------------------------
+
+    def _before_request(self):
+        g.request_stats = RequestStats()
+
+    def _after_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+
+        elapsed = time.perf_counter() - stats.started
+        endpoint = request.endpoint or 'unmatched'
+        labels = (endpoint,)
+        self.requests.inc((endpoint, request.method, str(response.status_code)))
+        self.request_seconds.observe(labels, elapsed)
+        self.db_queries.observe(labels, stats.query_count)
+        self.db_seconds.observe(labels, stats.db_seconds)
+        self.pool_wait_seconds.observe(labels, stats.pool_wait_seconds)
+        self.http_seconds.observe(labels, stats.http_seconds)
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'app;dur={elapsed * 1000:.3f}, db;dur={stats.db_seconds * 1000:.3f}, '
+                f'pool;dur={stats.pool_wait_seconds * 1000:.3f}, upstream;dur={stats.http_seconds * 1000:.3f}'
+            )
+
+        if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+            lines = [f"Slow request {request.method} {request.path} ({endpoint}): {elapsed * 1000:.1f} ms, "
+                     f"{stats.query_count} queries, {stats.db_seconds * 1000:.1f} ms SQL, "
+                     f"{stats.pool_wait_seconds * 1000:.1f} ms pool wait, "
+                     f"{stats.http_seconds * 1000:.1f} ms outbound HTTP"]
+            for seconds, statement in stats.statements:
+                lines.append(f"  [{seconds * 1000:.2f} ms] {' '.join(statement.split())}")
+            self._logger.warning('\n'.join(lines))
+        return response
+
+    # -- Exposition ------------------------------------------------------
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.request_seconds, self.db_queries, self.db_seconds,
+                       self.pool_wait_seconds, self.http_seconds, self.cache_lookups, self.events,
+                       self.password_hashes, self.rate_limited, self.idempotency):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        if not self.token:
+            abort(404)
+        sent = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(sent.encode('utf-8'), f"Bearer {self.token}".encode('utf-8')):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer realm="metrics"'})
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
@@ -3,232 +3,391 @@
 Migrate existing file-based data to PostgreSQL.
 
 Usage:
-    python migrate_to_postgres.py
+    python migrate_to_postgres.py [--workers 4] [--batch-size 1000]
+                                  [--checkpoint .migrate_checkpoint.json] [--restart]
 
 Set DATABASE_URL env var to override the default connection string.
 Default: postgresql://localhost/leetcode_selector
+
+Existing keys are loaded in bulk and new rows are inserted in batches with
+ON CONFLICT DO NOTHING, so reruns and overlapping workers never duplicate
+rows. User directories are migrated by --workers processes in parallel.
+Each finished step and user directory is recorded in the checkpoint file;
+a rerun skips them. Pass --restart to ignore the checkpoint.
 """
 
+import argparse
 import json
+import multiprocessing
 import os
 import sys
+import time
 from datetime import datetime
 
-from app import app, seed_public_problem_sets
-from models import db, User, ProblemSet, ProblemSetProblem, DifficultyCache, \
-    UserProgress, UserSession, UserSessionProblem, UserActiveSet
-from werkzeug.security import generate_password_hash
+from sqlalchemy import func
 
+from app import app, seed_public_problem_sets, add_problem_set_rows, resolve_problem_ids
+from problem_urls import canonical_url, problem_slug
+from upserts import insert_ignore as insert_ignore_rows
+from models import db, User, Problem, ProblemSet, DifficultyCache, \
+    UserProgress, UserSession, UserActiveSet
 
-def migrate_difficulty_cache():
-    """Migrate global difficulty_cache.json → difficulty_cache table."""
-    cache_file = 'difficulty_cache.json'
-    if not os.path.exists(cache_file):
-        print("No global difficulty_cache.json found, skipping.")
-        return
+DEFAULT_CHECKPOINT = '.migrate_checkpoint.json'
+USERS_DIR = 'users'
 
-    with open(cache_file) as f:
-        cache = json.load(f)
 
-    count = 0
-    for slug, difficulty in cache.items():
-        if not DifficultyCache.query.filter_by(problem_slug=slug).first():
-            db.session.add(DifficultyCache(problem_slug=slug, difficulty=difficulty))
-            count += 1
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
 
+def insert_ignore(model, rows, batch_size):
+    """Insert dict rows in batches, skipping rows that hit a unique constraint."""
+    for i in range(0, len(rows), batch_size):
+        insert_ignore_rows(db.session, model, rows[i:i + batch_size])
     db.session.commit()
-    print(f"Migrated {count} difficulty cache entries.")
 
 
-def migrate_users():
-    """Migrate users/users.json → users table. Returns {old_id: new_user} map."""
-    users_file = 'users/users.json'
-    if not os.path.exists(users_file):
-        print("No users/users.json found, skipping user migration.")
-        return {}
+def chunks(items, size=500):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
-    with open(users_file) as f:
-        users_db = json.load(f)
 
-    user_map = {}  # old string ID → new User object
-    for old_id, data in users_db.items():
-        existing = User.query.filter_by(username=data['username']).first()
-        if existing:
-            print(f"  User '{data['username']}' already exists, skipping.")
-            user_map[old_id] = existing
-            continue
+class Checkpoint:
+    """Completed steps and user directories, persisted after every update."""
 
-        user = User(
-            username=data['username'],
-            email=data['email'],
-            password_hash=data['password_hash'],
-            created_at=datetime.strptime(data.get('created_at', '2026-01-01 00:00:00'), '%Y-%m-%d %H:%M:%S')
-        )
-        db.session.add(user)
-        db.session.flush()
-        user_map[old_id] = user
-        print(f"  Migrated user: {data['username']} (old id={old_id} → new id={user.id})")
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.data = {'steps': [], 'user_dirs': []}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+            print(f"Resuming from {path}: {len(self.data['steps'])} steps, "
+                  f"{len(self.data['user_dirs'])} user directories already done.")
 
-    db.session.commit()
-    return user_map
+    def done(self, kind, key) -> bool:
+        return key in self.data[kind]
+
+    def mark(self, kind, key):
+        self.data[kind].append(key)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def report(name, rows, started):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"  {name}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+
+def user_dirs():
+    if not os.path.exists(USERS_DIR):
+        return []
+    return sorted(d for d in os.listdir(USERS_DIR)
+                  if os.path.isdir(os.path.join(USERS_DIR, d)) and d != 'users')
 
 
-def migrate_private_problem_sets(old_user_id: str, new_user: User):
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def migrate_difficulty_cache(batch_size):
+    """Migrate global difficulty_cache.json → difficulty_cache table."""
+    cache_file = 'difficulty_cache.json'
+    if not os.path.exists(cache_file):
+        print("No global difficulty_cache.json found, skipping.")
+        return 0
+
+    cache = {problem_slug(k): v for k, v in read_json(cache_file).items()}
+    existing = {slug for (slug,) in db.session.query(DifficultyCache.problem_slug)}
+    rows = [{'problem_slug': slug, 'difficulty': difficulty, 'updated_at': datetime.utcnow()}
+            for slug, difficulty in cache.items() if slug not in existing]
+    insert_ignore(DifficultyCache, rows, batch_size)
+    print(f"Migrated {len(rows)} difficulty cache entries.")
+    return len(rows)
+
+
+def migrate_users(batch_size):
+    """Migrate users/users.json → users table. Returns (rows inserted, {old_id: new user id})."""
+    users_file = os.path.join(USERS_DIR, 'users.json')
+    if not os.path.exists(users_file):
+        print("No users/users.json found, skipping user migration.")
+        return 0, {}
+
+    users_db = read_json(users_file)
+    existing = {name for (name,) in db.session.query(User.username)}
+    rows = [{
+        'username': data['username'],
+        'email': data['email'],
+        'password_hash': data['password_hash'],
+        'created_at': datetime.strptime(data.get('created_at', '2026-01-01 00:00:00'), '%Y-%m-%d %H:%M:%S'),
+        'state_version': 0,
+    } for data in users_db.values() if data['username'] not in existing]
+    insert_ignore(User, rows, batch_size)
+
+    ids = {}
+    for chunk in chunks(data['username'] for data in users_db.values()):
+        ids.update(db.session.query(User.username, User.id).filter(User.username.in_(chunk)))
+    user_map = {old_id: ids[data['username']] for old_id, data in users_db.items() if data['username'] in ids}
+    print(f"Migrated {len(rows)} users ({len(users_db) - len(rows)} already existed).")
+    return len(rows), user_map
+
+
+def collect_problem_urls(dirs):
+    urls = set()
+    for old_id in dirs:
+        progress_file = os.path.join(USERS_DIR, old_id, 'progress.json')
+        if os.path.exists(progress_file):
+            data = read_json(progress_file)
+            for key in ('completed', 'skipped', 'revisit'):
+                urls.update(data.get(key, []))
+            urls.update(data.get('current_session', {}).get('problems', []))
+        sets_dir = os.path.join(USERS_DIR, old_id, 'problem_sets')
+        if os.path.exists(sets_dir):
+            for filename in os.listdir(sets_dir):
+                if filename.endswith('.json'):
+                    try:
+                        for problem_urls in read_json(os.path.join(sets_dir, filename))['problems'].values():
+                            urls.update(problem_urls)
+                    except (ValueError, KeyError, AttributeError) as e:
+                        print(f"  Skipping unreadable set {old_id}/{filename}: {e}")
+    return urls
+
+
+def resolve_all_problems(dirs):
+    """Create every problems row up front so parallel workers only ever read them."""
+    urls = collect_problem_urls(dirs)
+    before = db.session.query(func.count(Problem.id)).scalar()
+    for chunk in chunks(urls, 5000):
+        resolve_problem_ids(chunk)
+        db.session.commit()
+    after = db.session.query(func.count(Problem.id)).scalar()
+    print(f"Resolved {len(urls)} problem URLs ({after - before} new problems).")
+    return after - before
+
+
+def migrate_private_problem_sets(old_user_id: str, user_id: int) -> int:
     """Migrate users/{old_id}/problem_sets/*.json → problem_sets table."""
-    sets_dir = f'users/{old_user_id}/problem_sets'
+    sets_dir = os.path.join(USERS_DIR, old_user_id, 'problem_sets')
     if not os.path.exists(sets_dir):
-        return
-
-    for filename in os.listdir(sets_dir):
-        if not filename.endswith('.json'):
+        return 0
+
+    files = {}
+    for filename in sorted(os.listdir(sets_dir)):
+        if filename.endswith('.json'):
+            try:
+                data = read_json(os.path.join(sets_dir, filename))
+                files[data['id']] = data
+            except (ValueError, KeyError) as e:
+                print(f"    Error reading {filename}: {e}")
+    existing = {s for (s,) in db.session.query(ProblemSet.set_id).filter(ProblemSet.set_id.in_(list(files)))}
+
+    rows = 0
+    for set_id, data in files.items():
+        if set_id in existing:
             continue
-        filepath = os.path.join(sets_dir, filename)
         try:
-            with open(filepath) as f:
-                data = json.load(f)
-
-            set_id = data['id']
-            if ProblemSet.query.filter_by(set_id=set_id).first():
-                print(f"    Problem set '{set_id}' already exists, skipping.")
-                continue
-
             ps = ProblemSet(
                 set_id=set_id,
                 name=data['name'],
                 description=data.get('description', ''),
                 is_public=False,
-                owner_user_id=new_user.id,
-                created_by=data.get('created_by', str(new_user.id)),
+                owner_user_id=user_id,
+                created_by=data.get('created_by', str(user_id)),
                 created_at=datetime.utcnow()
             )
             db.session.add(ps)
             db.session.flush()
-
-            position = 0
-            for category, urls in data['problems'].items():
-                for url in urls:
-                    db.session.add(ProblemSetProblem(
-                        problem_set_id=ps.id,
-                        category=category,
-                        problem_url=url,
-                        position=position
-                    ))
-                    position += 1
-
+            add_problem_set_rows(ps, data['problems'])
             db.session.commit()
-            print(f"    Migrated private set: {data['name']}")
+            rows += 1 + sum(len(urls) for urls in data['problems'].values())
         except Exception as e:
             db.session.rollback()
-            print(f"    Error migrating {filename}: {e}")
+            print(f"    Error migrating set {set_id}: {e}")
+    return rows
 
 
-def migrate_user_progress(old_user_id: str, new_user: User):
+def migrate_user_progress(old_user_id: str, user_id: int, batch_size: int) -> int:
     """Migrate users/{old_id}/progress.json → user_progress + user_sessions tables."""
-    progress_file = f'users/{old_user_id}/progress.json'
-    if not os.path.exists(progress_file):
-        print(f"  No progress.json for user {old_user_id}, skipping.")
-        return
-
-    with open(progress_file) as f:
-        data = json.load(f)
-
-    # Migrate completed
-    completed = data.get('completed', [])
-    skipped = data.get('skipped', [])
-    revisit = data.get('revisit', [])
-
-    # Build combined url set
-    all_urls = set(completed) | set(skipped) | set(revisit)
-    skipped_set = set(skipped)
-    completed_set = set(completed)
-    revisit_set = set(revisit)
-
-    existing = {r.problem_url for r in UserProgress.query.filter_by(user_id=new_user.id).all()}
-
-    count = 0
-    for url in all_urls:
-        if url in existing:
-            continue
-        row = UserProgress(
-            user_id=new_user.id,
-            problem_url=url,
-            is_completed=url in completed_set,
-            is_skipped=url in skipped_set and url not in completed_set,
-            is_revisit=url in revisit_set,
-            completed_at=datetime.utcnow() if url in completed_set else None
-        )
-        db.session.add(row)
-        count += 1
-
-    db.session.flush()
-
-    # Migrate session
-    session_data = data.get('current_session', {})
-    session_problems = session_data.get('problems', [])
-
-    if session_problems:
-        s = UserSession.query.filter_by(user_id=new_user.id).first()
-        if not s:
-            s = UserSession(
-                user_id=new_user.id,
-                easy_completed=session_data.get('easy_completed', 0),
-                medium_completed=session_data.get('medium_completed', 0),
-                hard_completed=session_data.get('hard_completed', 0),
-                total_completed=session_data.get('total_completed', 0),
-                generated_at=datetime.utcnow()
-            )
-            db.session.add(s)
-            db.session.flush()
-
-            for i, url in enumerate(session_problems):
-                db.session.add(UserSessionProblem(session_id=s.id, problem_url=url, position=i))
-
-    # Migrate active set
-    active_file = f'users/{old_user_id}/active_problem_set.json'
+    rows = 0
+    progress_file = os.path.join(USERS_DIR, old_user_id, 'progress.json')
+    if os.path.exists(progress_file):
+        data = read_json(progress_file)
+        completed = {canonical_url(u) for u in data.get('completed', [])}
+        skipped = {canonical_url(u) for u in data.get('skipped', [])}
+        revisit = {canonical_url(u) for u in data.get('revisit', [])}
+        session_data = data.get('current_session', {})
+        session_problems = [canonical_url(u) for u in session_data.get('problems', [])]
+
+        # Every problem was created by resolve_all_problems; this only reads
+        problem_ids = resolve_problem_ids(completed | skipped | revisit | set(session_problems))
+        existing = {pid for (pid,) in db.session.query(UserProgress.problem_id).filter_by(user_id=user_id)}
+
+        progress_rows = []
+        for url in sorted(completed | skipped | revisit):
+            pid = problem_ids[url]
+            if pid in existing:
+                continue
+            existing.add(pid)
+            progress_rows.append({
+                'user_id': user_id,
+                'problem_id': pid,
+                'is_completed': url in completed,
+                'is_skipped': url in skipped and url not in completed,
+                'is_revisit': url in revisit,
+                'completed_at': datetime.utcnow() if url in completed else None,
+            })
+        insert_ignore(UserProgress, progress_rows, batch_size)
+        rows += len(progress_rows)
+
+        if session_problems and db.session.get(UserSession, user_id) is None:
+            insert_ignore(UserSession, [{
+                'user_id': user_id,
+                'problem_ids': [problem_ids[url] for url in session_problems],
+                'version': 1,
+                'easy_completed': session_data.get('easy_completed', 0),
+                'medium_completed': session_data.get('medium_completed', 0),
+                'hard_completed': session_data.get('hard_completed', 0),
+                'total_completed': session_data.get('total_completed', 0),
+                'generated_at': datetime.utcnow(),
+            }], batch_size)
+            rows += 1
+
+    active_file = os.path.join(USERS_DIR, old_user_id, 'active_problem_set.json')
     if os.path.exists(active_file):
         try:
-            with open(active_file) as f:
-                active_data = json.load(f)
-            set_id = active_data.get('set_id')
-            if set_id and not UserActiveSet.query.filter_by(user_id=new_user.id).first():
-                db.session.add(UserActiveSet(user_id=new_user.id, set_id=set_id))
+            set_id = read_json(active_file).get('set_id')
+            if set_id and db.session.get(UserActiveSet, user_id) is None:
+                insert_ignore(UserActiveSet, [{'user_id': user_id, 'set_id': set_id,
+                                               'updated_at': datetime.utcnow()}], batch_size)
+                rows += 1
         except Exception as e:
+            db.session.rollback()
             print(f"  Error migrating active set: {e}")
+    return rows
 
-    db.session.commit()
-    print(f"  Migrated {count} progress rows for user {new_user.username} "
-          f"({len(completed)} completed, {len(skipped)} skipped, {len(revisit)} revisit).")
 
+def migrate_user_dir(task):
+    """Worker entry point: migrate one user directory, return (old_id, rows, error)."""
+    old_id, user_id, batch_size = task
+    with app.app_context():
+        try:
+            rows = migrate_private_problem_sets(old_id, user_id)
+            rows += migrate_user_progress(old_id, user_id, batch_size)
+            return old_id, rows, None
+        except Exception as e:
+            db.session.rollback()
+            return old_id, 0, str(e)
+        finally:
+            db.session.remove()
+
+
+def init_worker():
+    # Forked workers must not reuse the parent's pooled connections
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint file')
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, restart=args.restart)
+    total_started = time.perf_counter()
+    total_rows = 0
+
     with app.app_context():
         print("Creating tables if they don't exist...")
-        db.create_all()
+        db.create_all(bind_key=None)  # the primary only; replicas get their schema by replication
 
         print("\n1. Migrating difficulty cache...")
-        migrate_difficulty_cache()
+        if checkpoint.done('steps', 'difficulty_cache'):
+            print("  Already done.")
+        else:
+            started = time.perf_counter()
+            rows = migrate_difficulty_cache(args.batch_size)
+            report('difficulty_cache', rows, started)
+            total_rows += rows
+            checkpoint.mark('steps', 'difficulty_cache')
 
         print("\n2. Seeding public problem sets...")
-        seed_public_problem_sets()
+        if checkpoint.done('steps', 'public_sets'):
+            print("  Already done.")
+        else:
+            seed_public_problem_sets()
+            checkpoint.mark('steps', 'public_sets')
 
         print("\n3. Migrating users...")
-        user_map = migrate_users()
-
-        print("\n4. Migrating per-user data...")
-        users_dir = 'users'
-        if os.path.exists(users_dir):
-            for old_id in os.listdir(users_dir):
-                if not os.path.isdir(os.path.join(users_dir, old_id)) or old_id == 'users':
-                    continue
-                if old_id not in user_map:
-                    print(f"  No user mapping for directory '{old_id}', skipping.")
-                    continue
-                new_user = user_map[old_id]
-                print(f"  Processing user {old_id} → {new_user.username}...")
-                migrate_private_problem_sets(old_id, new_user)
-                migrate_user_progress(old_id, new_user)
-
-        print("\nMigration complete!")
+        started = time.perf_counter()
+        rows, user_map = migrate_users(args.batch_size)
+        report('users', rows, started)
+        total_rows += rows
+
+        pending = []
+        for old_id in user_dirs():
+            if checkpoint.done('user_dirs', old_id):
+                continue
+            if old_id not in user_map:
+                print(f"  No user mapping for directory '{old_id}', skipping.")
+                continue
+            pending.append((old_id, user_map[old_id], args.batch_size))
+
+        print(f"\n4. Resolving problem ids for {len(pending)} user directories...")
+        started = time.perf_counter()
+        rows = resolve_all_problems([old_id for old_id, _, _ in pending])
+        report('problems', rows, started)
+        total_rows += rows
+        db.session.remove()
+
+    print(f"\n5. Migrating per-user data with {args.workers} worker(s)...")
+    started = time.perf_counter()
+    rows = 0
+    failed = []
+    if args.workers > 1 and len(pending) > 1:
+        with multiprocessing.Pool(args.workers, initializer=init_worker) as pool:
+            results = pool.imap_unordered(migrate_user_dir, pending)
+            for old_id, user_rows, error in results:
+                rows += user_rows
+                if error:
+                    failed.append(old_id)
+                    print(f"  {old_id}: FAILED ({error})")
+                else:
+                    checkpoint.mark('user_dirs', old_id)
+                    print(f"  {old_id}: {user_rows} rows")
+    else:
+        for task in pending:
+            old_id, user_rows, error = migrate_user_dir(task)
+            rows += user_rows
+            if error:
+                failed.append(old_id)
+                print(f"  {old_id}: FAILED ({error})")
+            else:
+                checkpoint.mark('user_dirs', old_id)
+                print(f"  {old_id}: {user_rows} rows")
+    report('per-user data', rows, started)
+    total_rows += rows
+
+    print()
+    report('total', total_rows, total_started)
+    if failed:
+        print(f"\n{len(failed)} user directories failed; rerun to retry them: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nMigration complete!")
 
 
 if __name__ == '__main__':
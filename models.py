@@ -2,7 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model, UserMixin):
@@ -13,6 +15,8 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped whenever any of the user's rows change; see state_cache.UserStateCache
+    state_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     progress = db.relationship('UserProgress', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     session = db.relationship('UserSession', backref='user', uselist=False, cascade='all, delete-orphan')
@@ -21,6 +25,16 @@ class User(db.Model, UserMixin):
                                    foreign_keys='ProblemSet.owner_user_id')
 
 
+class Problem(db.Model):
+    """Canonical problem record; set, progress and session rows reference it by id."""
+    __tablename__ = 'problems'
+
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(300), unique=True, nullable=False, index=True)
+    url = db.Column(db.String(500), nullable=False)
+    difficulty = db.Column(db.String(20), nullable=True)
+
+
 class ProblemSet(db.Model):
     __tablename__ = 'problem_sets'
 
@@ -32,6 +46,12 @@ class ProblemSet(db.Model):
     owner_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     created_by = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # SHA-256 of the ordered (category, URL) rows; see app.ContentHasher
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+    # Uploads answered with this set instead of storing a copy
+    dedupe_hits = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped on every in-place content update; compiled-set caches key on it
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     problems = db.relationship('ProblemSetProblem', backref='problem_set', lazy='dynamic',
                                cascade='all, delete-orphan', order_by='ProblemSetProblem.position')
@@ -43,9 +63,11 @@ class ProblemSetProblem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     problem_set_id = db.Column(db.Integer, db.ForeignKey('problem_sets.id'), nullable=False, index=True)
     category = db.Column(db.String(200), nullable=False)
-    problem_url = db.Column(db.String(500), nullable=False)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id'), nullable=False, index=True)
     position = db.Column(db.Integer, default=0)
 
+    problem = db.relationship('Problem', lazy='joined')
+
     __table_args__ = (
         db.Index('ix_psp_set_category', 'problem_set_id', 'category'),
     )
@@ -66,14 +88,16 @@ class UserProgress(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    problem_url = db.Column(db.String(500), nullable=False)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id'), nullable=False, index=True)
     is_completed = db.Column(db.Boolean, default=False)
     is_skipped = db.Column(db.Boolean, default=False)
     is_revisit = db.Column(db.Boolean, default=False)
     completed_at = db.Column(db.DateTime, nullable=True)
 
+    problem = db.relationship('Problem', lazy='joined')
+
     __table_args__ = (
-        db.UniqueConstraint('user_id', 'problem_url', name='uq_user_problem'),
+        db.UniqueConstraint('user_id', 'problem_id', name='uq_user_problem'),
         db.Index('ix_up_user_completed', 'user_id', 'is_completed'),
         db.Index('ix_up_user_skipped', 'user_id', 'is_skipped'),
         db.Index('ix_up_user_revisit', 'user_id', 'is_revisit'),
@@ -81,30 +105,23 @@ class UserProgress(db.Model):
 
 
 class UserSession(db.Model):
-    """Stores the current active problem session for a user."""
+    """Stores the current active problem session for a user.
+
+    problem_ids holds the session's problems.id values in display order, so
+    reading a session is one primary-key fetch and regenerating it is one
+    row update. version is bumped on every change to the row.
+    """
     __tablename__ = 'user_sessions'
 
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    problem_ids = db.Column(db.JSON, nullable=False, default=list)
+    version = db.Column(db.Integer, nullable=False, default=0)
     easy_completed = db.Column(db.Integer, default=0)
     medium_completed = db.Column(db.Integer, default=0)
     hard_completed = db.Column(db.Integer, default=0)
     total_completed = db.Column(db.Integer, default=0)
     generated_at = db.Column(db.DateTime, nullable=True)
 
-    session_problems = db.relationship('UserSessionProblem', backref='session', lazy='dynamic',
-                                       cascade='all, delete-orphan', order_by='UserSessionProblem.position')
-
-
-class UserSessionProblem(db.Model):
-    """Problems in a user's current session (ordered)."""
-    __tablename__ = 'user_session_problems'
-
-    id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('user_sessions.id'), nullable=False, index=True)
-    problem_url = db.Column(db.String(500), nullable=False)
-    position = db.Column(db.Integer, default=0)
-
 
 class UserActiveSet(db.Model):
     """Tracks which problem set a user currently has active."""
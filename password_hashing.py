@@ -0,0 +1,150 @@
+"""Password hashing and verification on a bounded per-worker process pool.
+
+A pbkdf2 hash at Werkzeug's default iteration count costs about half a
+second of CPU. Done on the request thread, a burst of logins holds every
+gunicorn thread and the cheap API calls queue behind it. PasswordHasher
+runs hashes in PASSWORD_HASH_WORKERS processes and lets at most
+PASSWORD_HASH_QUEUE (default four per process) more jobs wait for them. Past that, and for a job not
+finished within PASSWORD_HASH_TIMEOUT seconds, it raises HasherBusy at once
+and the route answers 503, so the remaining threads keep serving.
+
+New hashes use PASSWORD_HASH_METHOD (a werkzeug.security method, default
+pbkdf2:sha256 at Werkzeug's current iterations). verify() also returns a
+replacement hash when a correct password was stored with other parameters,
+so old hashes are upgraded on the user's next login.
+
+Pool processes are forked, so the pool has to be started while the worker
+has no other threads: gunicorn.conf.py calls start() in each worker before
+it serves. Elsewhere (the development server) the pool starts on first use.
+PASSWORD_HASH_WORKERS=0 hashes on the request thread.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Werkzeug's scrypt defaults: n, r, p
+SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+
+class HasherBusy(Exception):
+    """The hashing pool is saturated or too slow; the caller should retry later."""
+
+
+def full_method(method: str) -> str:
+    """method with Werkzeug's defaults filled in, as it is recorded in a stored hash."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        return f"pbkdf2:{args[0] if args else 'sha256'}:{args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS}"
+    if name == 'scrypt':
+        return ':'.join(['scrypt', *args, *SCRYPT_DEFAULTS[len(args):]])
+    return method
+
+
+def needs_rehash(password_hash: str, method: str) -> bool:
+    return password_hash.split('$', 1)[0] != full_method(method)
+
+
+# Run in the pool processes
+
+def _hash(password: str, method: str) -> str:
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash: str, password: str, method: str) -> Tuple[bool, Optional[str]]:
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = 'pbkdf2:sha256'
+        self.workers = 1
+        self.max_queued = 4
+        self.timeout = 10.0
+        self.metrics = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget_pool)
+
+    def init_app(self, app, metrics=None):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 1)
+        self.max_queued = app.config.get('PASSWORD_HASH_QUEUE', max(1, self.workers) * 4)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10.0)
+        self.metrics = metrics
+        self._forget_pool()
+
+    def _forget_pool(self):
+        # A pool's processes and manager thread belong to the process that started it
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queued) if self.workers else None
+
+    def start(self):
+        """Fork the pool's processes now; call before this process starts other threads."""
+        if self.workers:
+            self._executor().submit(os.getpid).result()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        # A pool process died; the next job starts a new pool
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _count(self, operation: str, result: str):
+        if self.metrics is not None:
+            self.metrics.password_hashes.inc((operation, result))
+
+    def _run(self, operation: str, fn, *args):
+        if not self.workers:
+            self._count(operation, 'inline')
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self._count(operation, 'busy')
+            raise HasherBusy(f"{self.workers + self.max_queued} password hashes already in progress")
+
+        pool = self._executor()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool as e:
+            self._slots.release()
+            self._discard(pool)
+            self._count(operation, 'error')
+            raise HasherBusy('Password hashing pool restarting') from e
+        # The slot is held until the job finishes, even if this request stops waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(self.timeout)
+        except FutureTimeoutError as e:
+            self._count(operation, 'timeout')
+            raise HasherBusy(f"Password hashing took over {self.timeout}s") from e
+        except BrokenProcessPool as e:
+            self._discard(pool)
+            self._count(operation, 'error')
+            raise HasherBusy('Password hashing pool restarting') from e
+        self._count(operation, 'ok')
+        return result
+
+    def hash(self, password: str) -> str:
+        return self._run('hash', _hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """(whether password matches, a new hash to store if the stored one uses old parameters)."""
+        return self._run('verify', _verify, password_hash, password, self.method)
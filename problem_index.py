@@ -0,0 +1,142 @@
+"""Compact, array-backed problem data for compiled problem sets.
+
+ProblemTable holds every problem a process has seen exactly once, indexed
+by problems.id: its URL in a list and its difficulty as one byte in an
+array('B'). A CompiledSet refers to problems only by id: an array('I') of
+ids in set order with category offsets, the same ids regrouped by
+difficulty, a sorted copy for membership and category lookups by
+bisection, and one bitset (bitsets.py) per difficulty for availability and
+completion counts. Sets that share problems share the URL strings, and a
+set costs 16 bytes per problem, plus bitsets sized by the highest problem
+id, instead of several list slots and dict entries.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bitsets
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+# One byte per problem; 0 is "not known"
+DIFFICULTY_CODES = {name: code for code, name in enumerate(DIFFICULTIES, 1)}
+
+
+class ProblemTable:
+    """Problem URLs and difficulties by problems.id, shared by every compiled set in the process."""
+
+    def __init__(self):
+        self._urls: List[Optional[str]] = []
+        self._difficulties = array('B')
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._urls) - self._urls.count(None)
+
+    def add(self, pid: int, url: str, difficulty: Optional[str] = None):
+        """Record a problem; url also becomes an alias for pid if the problem is already known."""
+        with self._lock:
+            missing = pid + 1 - len(self._urls)
+            if missing > 0:
+                self._urls.extend([None] * missing)
+                self._difficulties.extend(bytes(missing))
+            if self._urls[pid] is None:
+                self._urls[pid] = url
+            self._ids[url] = pid
+            if difficulty is not None:
+                self._difficulties[pid] = DIFFICULTY_CODES.get(difficulty, 0)
+
+    def id(self, url: str) -> Optional[int]:
+        return self._ids.get(url)
+
+    def url(self, pid: int) -> Optional[str]:
+        return self._urls[pid] if pid < len(self._urls) else None
+
+    def difficulty_code(self, pid: int) -> int:
+        return self._difficulties[pid] if pid < len(self._difficulties) else 0
+
+    def difficulty(self, pid: int) -> Optional[str]:
+        code = self.difficulty_code(pid)
+        return DIFFICULTIES[code - 1] if code else None
+
+    def clear(self):
+        with self._lock:
+            self._urls = []
+            self._difficulties = array('B')
+            self._ids = {}
+
+
+class CompiledSet:
+    """One version of a problem set as arrays of problem ids (see ProblemTable for the problems)."""
+
+    __slots__ = ('version', 'categories', 'ids', 'category_offsets', 'by_difficulty', 'difficulty_offsets',
+                 'problems_mask', 'difficulty_masks', '_sorted_ids', '_sorted_positions')
+
+    def __init__(self, version: int, rows: Iterable[Tuple[str, int]], difficulty_code: Callable[[int], int]):
+        """rows are (category, problem id) in set order; categories keep their first-seen order."""
+        grouped: Dict[str, List[int]] = {}
+        for category, pid in rows:
+            grouped.setdefault(category, []).append(pid)
+
+        self.version = version
+        self.categories = tuple(grouped)
+        self.ids = array('I')
+        self.category_offsets = array('I', [0])
+        for pids in grouped.values():
+            self.ids.extend(pids)
+            self.category_offsets.append(len(self.ids))
+
+        # A problem listed under several categories is drawn from its pool once
+        pools: List[List[int]] = [[] for _ in DIFFICULTIES]
+        for pid in dict.fromkeys(self.ids):
+            code = difficulty_code(pid)
+            if code:
+                pools[code - 1].append(pid)
+        self.by_difficulty = array('I')
+        self.difficulty_offsets = array('I', [0])
+        for pool in pools:
+            self.by_difficulty.extend(pool)
+            self.difficulty_offsets.append(len(self.by_difficulty))
+        self.problems_mask = bitsets.from_ids(self.ids)
+        self.difficulty_masks = tuple(bitsets.from_ids(pool) for pool in pools)
+
+        order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+        self._sorted_ids = array('I', (self.ids[i] for i in order))
+        self._sorted_positions = array('I', order)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pid: int) -> bool:
+        i = bisect_left(self._sorted_ids, pid)
+        return i < len(self._sorted_ids) and self._sorted_ids[i] == pid
+
+    def by_category(self) -> Iterator[Tuple[str, array]]:
+        offsets = self.category_offsets
+        for i, category in enumerate(self.categories):
+            yield category, self.ids[offsets[i]:offsets[i + 1]]
+
+    def pool(self, difficulty: str) -> array:
+        """Distinct ids of the set's problems with the given difficulty, in set order."""
+        code = DIFFICULTY_CODES[difficulty]
+        return self.by_difficulty[self.difficulty_offsets[code - 1]:self.difficulty_offsets[code]]
+
+    def mask(self, difficulty: Optional[str] = None) -> int:
+        """Bitset of the set's problems with the given difficulty, or of all of them (each counted once)."""
+        if difficulty is None:
+            return self.problems_mask
+        return self.difficulty_masks[DIFFICULTY_CODES[difficulty] - 1]
+
+    def category_of(self, pid: int) -> Optional[str]:
+        i = bisect_left(self._sorted_ids, pid)
+        if i == len(self._sorted_ids) or self._sorted_ids[i] != pid:
+            return None
+        return self.categories[bisect_right(self.category_offsets, self._sorted_positions[i]) - 1]
+
+    def nbytes(self) -> int:
+        """Bytes held in this set's arrays and bitsets (the category names and URLs are counted elsewhere)."""
+        return sum(a.itemsize * len(a) for a in (self.ids, self.category_offsets, self.by_difficulty,
+                                                 self.difficulty_offsets, self._sorted_ids, self._sorted_positions)) \
+            + sum((mask.bit_length() + 7) // 8 for mask in (self.problems_mask, *self.difficulty_masks))
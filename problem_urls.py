@@ -0,0 +1,39 @@
+"""Canonical form for LeetCode problem URLs.
+
+Every path that stores or looks up a problem goes through
+normalize_problem_url so that spelling variants such as
+``.../two-sum/description/``, ``...?envType=study-plan`` or
+``leetcode.cn/problems/two-sum`` land on the same slug.
+"""
+
+from typing import Tuple
+from urllib.parse import urlsplit
+
+CANONICAL_URL = 'https://leetcode.com/problems/{slug}/'
+
+
+def normalize_problem_url(url: str) -> Tuple[str, str]:
+    """Return (slug, canonical_url) for a problem URL or bare slug; ('', '') if it names no problem."""
+    url = (url or '').strip()
+    if '/' not in url:
+        slug = url
+    else:
+        if '://' not in url:
+            url = 'https://' + url.lstrip('/')
+        segments = [s for s in urlsplit(url).path.split('/') if s]
+        if 'problems' in segments and segments.index('problems') + 1 < len(segments):
+            slug = segments[segments.index('problems') + 1]
+        else:
+            slug = segments[-1] if segments else ''
+    slug = slug.lower()
+    if not slug:
+        return '', ''
+    return slug, CANONICAL_URL.format(slug=slug)
+
+
+def problem_slug(url: str) -> str:
+    return normalize_problem_url(url)[0]
+
+
+def canonical_url(url: str) -> str:
+    return normalize_problem_url(url)[1]
@@ -0,0 +1,326 @@
+"""Per-user rate limits and Idempotency-Key replay for write routes.
+
+@rate_limit(per_minute, burst) gives each user a token bucket per view:
+``burst`` requests at once, refilled at ``per_minute``. A request that finds
+the bucket empty gets a 429 with Retry-After without running the view.
+Buckets live in each worker process (an LRU of RATE_LIMIT_BUCKETS), so they
+catch floods from one client rather than enforce an exact quota across
+workers. RATE_LIMIT_SCALE multiplies every limit; 0 turns them off.
+
+@idempotent views honour an ``Idempotency-Key`` header. The first request
+with a key claims it and runs; its response is kept for
+IDEMPOTENCY_TTL_SECONDS and replayed, with ``Idempotent-Replayed: true``,
+to repeats of that key by the same user on the same view, without running
+the view again. The user comes from the signed session cookie, so a replay
+makes no database queries. Failures (a 5xx, or ``success: false`` in the
+body, which is how the routes here report caught errors) are not kept, so a
+retry runs the request again. A repeat that arrives while the first is still running
+waits up to IDEMPOTENCY_WAIT_SECONDS for its response, then gets a 409.
+Reusing a key for a different request body gets a 422; for form posts that
+means any different field or uploaded file content.
+
+Keys are held per process (IDEMPOTENCY_CACHE_SIZE entries) unless
+IDEMPOTENCY_URL (redis://[:password@]host:port/db) is set, in which case
+claims and responses go to that server so repeats are caught whichever
+worker they reach. When it is unreachable, requests run without replay and
+it is retried after IDEMPOTENCY_RETRY_SECONDS.
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import Response, current_app, g, jsonify, request, session
+from flask_login import current_user
+
+from shared_cache import FORMAT_VERSION, RespClient, SharedCacheError
+from state_cache import LRUCache
+
+MAX_KEY_LENGTH = 255
+# A claim whose request never finishes (its worker died) is freed after this;
+# longer than any request may run (gunicorn's timeout)
+PENDING_TTL_SECONDS = 120
+# Response headers that are part of what a replay returns
+REPLAYED_HEADERS = ('Content-Type', 'Retry-After')
+# Bodies read through request.form/request.files rather than as raw data
+FORM_MIMETYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def rate_limit(per_minute: float, burst: int):
+    """Limit a view to `burst` requests at once per user, refilled at `per_minute`."""
+    def decorator(view):
+        view.rate_limit = (per_minute, burst)
+        return view
+    return decorator
+
+
+def idempotent(view):
+    """Replay the stored response to repeated requests with the same Idempotency-Key."""
+    view.idempotent = True
+    return view
+
+
+def _error(status: int, message: str, retry_after: Optional[int] = None) -> Response:
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+class TokenBuckets:
+    """Token buckets by key; an idle key is forgotten once the LRU needs its slot."""
+
+    def __init__(self, max_entries: int = 10000):
+        self._buckets = LRUCache(max_entries)
+        self._lock = threading.Lock()
+
+    def take(self, key, per_minute: float, burst: int) -> float:
+        """0 if a token was taken, else the seconds until one is available."""
+        rate = per_minute / 60.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets.put(key, (tokens - 1, now))
+                return 0.0
+            self._buckets.put(key, (tokens, now))
+            return (1 - tokens) / rate
+
+
+class LocalIdempotencyStore:
+    """Claims and stored responses in this process."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._records = LRUCache(max_entries, ttl)
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, fingerprint: str, ttl: float) -> Optional[Dict]:
+        """None if this request now owns key, else the existing record (pending or done)."""
+        # A pending claim is always completed or released by the request that holds it
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                self._records.put(key, {'fingerprint': fingerprint, 'response': None})
+                self._pending[key] = threading.Event()
+            return record
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        event = self._pending.get(key)
+        if event is not None:
+            event.wait(timeout)
+        return self._records.get(key)
+
+    def complete(self, key: str, record: Dict, ttl: float):
+        self._records.put(key, record)
+        self._finish(key)
+
+    def release(self, key: str):
+        self._records.pop(key)
+        self._finish(key)
+
+    def _finish(self, key: str):
+        with self._lock:
+            event = self._pending.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+class RedisIdempotencyStore:
+    """Claims and stored responses on a Redis-protocol server shared by all workers."""
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, url: str, retry_seconds: float = 30, timeout: float = 0.25):
+        self.client = RespClient(url, timeout)
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, e: Exception):
+        self._down_until = time.monotonic() + self.retry_seconds
+        print(f"Idempotency store unavailable, running requests without replay for {self.retry_seconds}s: {e}")
+
+    def _command(self, *commands):
+        if not self.available:
+            return None
+        try:
+            return self.client.pipeline(list(commands))
+        except (OSError, SharedCacheError) as e:
+            self._failed(e)
+            return None
+
+    def claim(self, key: str, fingerprint: str, ttl: float) -> Optional[Dict]:
+        pending = json.dumps({'fingerprint': fingerprint, 'response': None})
+        # SET NX claims the key; the GET returns the record when someone else holds it
+        replies = self._command(('SET', key, pending, 'PX', int(ttl * 1000), 'NX'), ('GET', key))
+        if replies is None or replies[0] is not None:
+            # Claimed, or the store is down and the request runs unguarded
+            return None
+        if replies[1] is None:
+            # Freed between the two commands; treat it as still in progress
+            return {'fingerprint': fingerprint, 'response': None}
+        return json.loads(replies[1])
+
+    def wait(self, key: str, timeout: float) -> Optional[Dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            replies = self._command(('GET', key))
+            record = json.loads(replies[0]) if replies and replies[0] is not None else None
+            if record is None or record['response'] is not None or time.monotonic() >= deadline:
+                return record
+            time.sleep(self.POLL_SECONDS)
+
+    def complete(self, key: str, record: Dict, ttl: float):
+        self._command(('SET', key, json.dumps(record), 'PX', int(ttl * 1000)))
+
+    def release(self, key: str):
+        self._command(('DEL', key))
+
+
+class RequestLimits:
+    """Applies @rate_limit and @idempotent to requests (see the module docstring)."""
+
+    def __init__(self):
+        self.scale = 1.0
+        self.ttl = 600.0
+        self.wait_seconds = 5.0
+        self.buckets: Optional[TokenBuckets] = None
+        self.store = None
+        self.metrics = None
+
+    def init_app(self, app, metrics=None):
+        self.scale = app.config.get('RATE_LIMIT_SCALE', 1.0)
+        self.ttl = app.config.get('IDEMPOTENCY_TTL_SECONDS', 600.0)
+        self.wait_seconds = app.config.get('IDEMPOTENCY_WAIT_SECONDS', 5.0)
+        self.metrics = metrics
+        self.buckets = TokenBuckets(app.config.get('RATE_LIMIT_BUCKETS', 10000))
+        url = app.config.get('IDEMPOTENCY_URL')
+        if url:
+            self.store = RedisIdempotencyStore(url, app.config.get('IDEMPOTENCY_RETRY_SECONDS', 30))
+        else:
+            self.store = LocalIdempotencyStore(app.config.get('IDEMPOTENCY_CACHE_SIZE', 10000), self.ttl)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _count(self, metric: str, *labels):
+        if self.metrics is not None:
+            getattr(self.metrics, metric).inc((request.endpoint, *labels))
+
+    def _before_request(self):
+        view = current_app.view_functions.get(request.endpoint)
+        limit = getattr(view, 'rate_limit', None)
+        replay = getattr(view, 'idempotent', False)
+        if not (limit or replay):
+            return None
+
+        key = request.headers.get('Idempotency-Key')
+        if replay and key:
+            if len(key) > MAX_KEY_LENGTH:
+                return _error(400, f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+            # The signed session cookie names the user, so a replay is answered
+            # without loading the user (and its state version) from the database
+            user_id = session.get('_user_id')
+            if user_id is None and current_user.is_authenticated:
+                # Logged in from the remember cookie
+                user_id = current_user.id
+            if user_id is not None:
+                response = self._claim(key, user_id)
+                if response is not None:
+                    return response
+
+        if not current_user.is_authenticated:
+            # login_required turns anonymous requests away; they keep no claim
+            self._release()
+            return None
+
+        if limit and self.scale > 0:
+            per_minute, burst = limit
+            wait = self.buckets.take((current_user.id, request.endpoint), per_minute * self.scale,
+                                     max(1, round(burst * self.scale)))
+            if wait:
+                self._count('rate_limited')
+                self._release()
+                return _error(429, 'Too many requests, please slow down', math.ceil(wait))
+        return None
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha256(f"{request.method} {request.path}\n".encode('utf-8'))
+        if request.mimetype in FORM_MIMETYPES:
+            # The form parser has spooled any files already; hash them in chunks and rewind for the view
+            for name, value in sorted(request.form.items(multi=True)):
+                digest.update(json.dumps([name, value]).encode('utf-8'))
+            for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+                digest.update(json.dumps([name, file.filename]).encode('utf-8'))
+                size = 0
+                for chunk in iter(lambda: file.stream.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+                file.stream.seek(0)
+                digest.update(f"\n{size}\n".encode('utf-8'))
+        else:
+            digest.update(request.get_data(cache=True))
+        return digest.hexdigest()
+
+    def _claim(self, key: str, user_id) -> Optional[Response]:
+        scoped = f"lcs:{FORMAT_VERSION}:idempotency:{user_id}:{request.endpoint}:" \
+                 f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+        fingerprint = self._fingerprint()
+        record = self.store.claim(scoped, fingerprint, min(self.ttl, PENDING_TTL_SECONDS))
+        if record is None:
+            g.idempotency_key = (scoped, fingerprint)
+            self._count('idempotency', 'new')
+            return None
+
+        if record['fingerprint'] != fingerprint:
+            self._count('idempotency', 'mismatch')
+            return _error(422, 'Idempotency-Key was already used for a different request')
+        if record['response'] is None:
+            record = self.store.wait(scoped, self.wait_seconds)
+        if record is None or record['response'] is None:
+            self._count('idempotency', 'conflict')
+            return _error(409, 'A request with this Idempotency-Key is still in progress', 1)
+
+        self._count('idempotency', 'replayed')
+        stored = record['response']
+        response = Response(stored['body'], status=stored['status'], headers=stored['headers'])
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+
+    def _release(self):
+        claim = g.pop('idempotency_key', None)
+        if claim is not None:
+            self.store.release(claim[0])
+
+    def _after_request(self, response: Response) -> Response:
+        claim = g.pop('idempotency_key', None)
+        if claim is None:
+            return response
+        key, fingerprint = claim
+        if response.status_code >= 500 or response.is_streamed or self._is_failure(response):
+            # Let a retry run the request again
+            self.store.release(key)
+            return response
+        stored = {'status': response.status_code, 'body': response.get_data(as_text=True),
+                  'headers': {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}}
+        self.store.complete(key, {'fingerprint': fingerprint, 'response': stored}, self.ttl)
+        return response
+
+    @staticmethod
+    def _is_failure(response: Response) -> bool:
+        body = response.get_json(silent=True) if response.is_json else None
+        return isinstance(body, dict) and body.get('success') is False
+
+    def _teardown_request(self, exc=None):
+        # A request that failed before after_request ran leaves no claim behind
+        self._release()
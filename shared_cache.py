@@ -0,0 +1,259 @@
+"""Two-tier cache: a per-process LRU in front of an optional shared tier.
+
+Each worker keeps hot entries in its own LRUCache. With SHARED_CACHE_URL
+(redis://[:password@]host:port/db) set, local misses fall through to a
+Redis-protocol server shared by every worker, so a difficulty fetched or a
+problem set compiled by one worker is a hit for all the others instead of
+being warmed up again per process.
+
+Shared keys are ``<prefix>:<FORMAT_VERSION>:<cache>:<key>``; bump
+FORMAT_VERSION whenever an encoding changes so old blobs are never read.
+Values are serialized by the cache's own encode/decode (JSON, never pickle).
+
+The shared tier is best effort: a timeout or error counts as a miss and the
+tier is skipped for SHARED_CACHE_RETRY_SECONDS. Lookups are counted per
+cache, tier and result in app_cache_lookups_total.
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from state_cache import LRUCache
+
+FORMAT_VERSION = 'v1'
+_MISSING = object()
+
+
+class SharedCacheError(Exception):
+    pass
+
+
+def _encode_command(args) -> bytes:
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise SharedCacheError('Connection closed by the shared cache')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest
+    if kind == b'-':
+        raise SharedCacheError(rest.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise SharedCacheError('Connection closed by the shared cache')
+        return data[:-2]
+    if kind == b'*':
+        length = int(rest)
+        return None if length < 0 else [_read_reply(reader) for _ in range(length)]
+    raise SharedCacheError(f"Unexpected reply from the shared cache: {line[:40]!r}")
+
+
+class RespClient:
+    """Minimal Redis-protocol (RESP2) client with one connection per thread."""
+
+    def __init__(self, url: str, timeout: float = 0.25):
+        parsed = urlparse(url)
+        if parsed.scheme != 'redis':
+            raise ValueError(f"Unsupported shared cache URL {url!r}; expected redis://host:port/db")
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+        # A connection opened before fork (e.g. while preloading) must not be shared with the parent
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self, extra_setup=()):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        setup = ([('AUTH', self.password)] if self.password else []) + \
+            ([('SELECT', self.db)] if self.db else []) + list(extra_setup)
+        try:
+            if setup:
+                self._roundtrip(conn, setup)
+        except (OSError, SharedCacheError):
+            conn[1].close()
+            sock.close()
+            raise
+        return conn
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _roundtrip(self, conn, commands):
+        sock, reader = conn
+        sock.sendall(b''.join(_encode_command(c) for c in commands))
+        return [_read_reply(reader) for _ in commands]
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """Send commands in one write and return their replies in order."""
+        try:
+            return self._roundtrip(self._connection(), commands)
+        except (OSError, SharedCacheError):
+            # The stream may be out of step with the replies; start over next time
+            self.close()
+            raise
+
+    def subscribe(self, channel: str):
+        """Yield None once subscribed to channel, then each message published on it.
+
+        Uses a dedicated connection that blocks until a message arrives; raises
+        OSError or SharedCacheError when the connection drops.
+        """
+        sock, reader = self._connect([('SUBSCRIBE', channel)])
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            sock.settimeout(None)
+            yield None
+            while True:
+                reply = _read_reply(reader)
+                if isinstance(reply, list) and len(reply) == 3 and reply[0] == b'message':
+                    yield reply[2]
+        finally:
+            reader.close()
+            sock.close()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+
+class RedisTier:
+    """Best-effort shared tier on a Redis-protocol server."""
+
+    def __init__(self, url: str, ttl: int = 86400, retry_seconds: float = 30, timeout: float = 0.25):
+        self.client = RespClient(url, timeout)
+        self.ttl = ttl
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, e: Exception):
+        self._down_until = time.monotonic() + self.retry_seconds
+        print(f"Shared cache unavailable, skipping it for {self.retry_seconds}s: {e}")
+
+    def get_many(self, keys: List[str]) -> Optional[Dict[str, bytes]]:
+        """{key: blob} for the keys present, or None when the tier is unavailable."""
+        if not self.available:
+            return None
+        try:
+            values = self.client.pipeline([('MGET', *keys)])[0]
+        except (OSError, SharedCacheError) as e:
+            self._failed(e)
+            return None
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    def set_many(self, items: Dict[str, bytes]):
+        if not items or not self.available:
+            return
+        try:
+            self.client.pipeline([('SET', k, v, 'EX', self.ttl) for k, v in items.items()])
+        except (OSError, SharedCacheError) as e:
+            self._failed(e)
+
+
+class TieredCache:
+    """Process-local LRU in front of an optional shared tier, with per-tier hit/miss counts."""
+
+    def __init__(self, name: str, max_entries: int, shared: Optional[RedisTier] = None,
+                 encode: Callable = None, decode: Callable = None, metrics=None, key_prefix: str = 'lcs'):
+        self.name = name
+        self.local = LRUCache(max_entries)
+        self.shared = shared
+        self.encode = encode or (lambda value: value.encode('utf-8'))
+        self.decode = decode or (lambda blob: blob.decode('utf-8'))
+        self.metrics = metrics
+        self._prefix = f"{key_prefix}:{FORMAT_VERSION}:{name}:"
+
+    def _count(self, tier: str, result: str, amount: int):
+        if self.metrics is not None and amount:
+            self.metrics.cache_lookups.inc((self.name, tier, result), amount)
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: Iterable) -> Dict:
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._count('local', 'hit', len(found))
+        self._count('local', 'miss', len(missing))
+        if not missing or self.shared is None:
+            return found
+
+        blobs = self.shared.get_many([self._prefix + str(key) for key in missing])
+        if blobs is None:
+            self._count('shared', 'error', len(missing))
+            return found
+        hits = 0
+        for key in missing:
+            blob = blobs.get(self._prefix + str(key))
+            if blob is None:
+                continue
+            try:
+                value = self.decode(blob)
+            except ValueError:
+                continue
+            found[key] = value
+            self.local.put(key, value)
+            hits += 1
+        self._count('shared', 'hit', hits)
+        self._count('shared', 'miss', len(missing) - hits)
+        return found
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict, shared: bool = True):
+        """Store items locally and, unless shared=False, in the shared tier."""
+        for key, value in items.items():
+            self.local.put(key, value)
+        if shared and self.shared is not None:
+            self.shared.set_many({self._prefix + str(key): self.encode(value) for key, value in items.items()})
+
+    def pop(self, key):
+        """Drop key from this process; shared entries are versioned and expire on their own."""
+        return self.local.pop(key)
+
+    def clear(self):
+        """Empty this process's tier (the shared tier is left alone)."""
+        self.local.clear()
@@ -0,0 +1,47 @@
+"""Connect-time tuning for SQLite, the embedded single-node backend.
+
+With DATABASE_URL=sqlite:///path.db every new connection gets:
+
+    journal_mode = WAL       readers don't block the writer or each other
+    synchronous = NORMAL     fsync at checkpoints, not every commit (safe with WAL)
+    busy_timeout            wait for the write lock instead of failing with
+                            "database is locked" when two requests write at once
+    mmap_size               serve reads from the page cache without copies
+
+Each is configurable (SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE). The listener goes on the app's
+own SQLite engines (primary and any replica binds), so other engines in the
+process and other dialects are untouched.
+"""
+
+import sqlite3
+
+from sqlalchemy import event
+
+
+class SQLiteTuning:
+    def __init__(self):
+        self.pragmas = {}
+
+    def init_app(self, app, db):
+        self.pragmas = {
+            'journal_mode': app.config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            'synchronous': app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            'busy_timeout': int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            'mmap_size': int(app.config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        }
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', self._on_connect)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
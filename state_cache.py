@@ -0,0 +1,230 @@
+"""Per-process cache of rarely-changing per-user state.
+
+Every request used to re-read the user row, the active set row and the
+session before doing any work. UserStateCache keeps a bounded, TTL'd
+snapshot of that state per user, keyed by users.state_version.
+
+Any flush that touches a user's rows (progress, session, active set, owned
+sets, the user row itself) bumps that user's state_version in the same
+transaction and drops the local entry, so a write in one worker is seen by
+every other worker on its next request: load() always compares the cached
+version against the database before serving a snapshot.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+import bitsets
+from models import User, UserProgress, UserSession, UserActiveSet, ProblemSet
+
+_TOUCHED_KEY = 'touched_user_ids'
+_NOT_LOADED = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with an optional per-entry TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, stored_at = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[0] if item else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SessionView:
+    """Read-only copy of a UserSession row."""
+    __slots__ = ('problem_ids', 'version', 'easy_completed', 'medium_completed',
+                 'hard_completed', 'total_completed', 'generated_at')
+
+    def __init__(self, s: UserSession):
+        self.problem_ids: Tuple[int, ...] = tuple(s.problem_ids or ())
+        self.version = s.version or 0
+        self.easy_completed = s.easy_completed or 0
+        self.medium_completed = s.medium_completed or 0
+        self.hard_completed = s.hard_completed or 0
+        self.total_completed = s.total_completed or 0
+        self.generated_at = s.generated_at
+
+
+class ProgressFlags:
+    """A user's completed / skipped / revisit problem ids, in row order, plus completed as a bitset."""
+    __slots__ = ('completed', 'skipped', 'revisit', 'completed_set', 'revisit_set', 'completed_mask')
+
+    def __init__(self, rows):
+        completed: List[int] = []
+        skipped: List[int] = []
+        revisit: List[int] = []
+        for problem_id, is_completed, is_skipped, is_revisit in rows:
+            if is_completed:
+                completed.append(problem_id)
+            if is_skipped:
+                skipped.append(problem_id)
+            if is_revisit:
+                revisit.append(problem_id)
+        self.completed = tuple(completed)
+        self.skipped = tuple(skipped)
+        self.revisit = tuple(revisit)
+        self.completed_set = frozenset(completed)
+        self.revisit_set = frozenset(revisit)
+        self.completed_mask = bitsets.from_ids(completed)
+
+
+class UserState(UserMixin):
+    """Snapshot of one user's state at a given users.state_version.
+
+    Doubles as the Flask-Login user object. The session and progress parts
+    are filled lazily by the selector the first time a request needs them.
+    """
+
+    def __init__(self, user: User, active_set_id: Optional[str]):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.state_version = user.state_version or 0
+        self.active_set_id = active_set_id
+        # Content version of the active set, refreshed by every load()
+        self.active_set_version: Optional[int] = None
+        self.session = _NOT_LOADED
+        self.progress: Optional[ProgressFlags] = None
+        self.stale = False
+
+    @property
+    def session_loaded(self) -> bool:
+        return self.session is not _NOT_LOADED
+
+
+def _owner_user_id(obj) -> Optional[int]:
+    if isinstance(obj, (UserProgress, UserSession, UserActiveSet)):
+        return obj.user_id
+    if isinstance(obj, ProblemSet):
+        return obj.owner_user_id
+    if isinstance(obj, User):
+        return obj.id
+    return None
+
+
+class UserStateCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self._entries = LRUCache(max_entries, ttl)
+        # Incremented on every local write to any user's state; lets
+        # request-scoped caches notice writes made since they were filled
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self._entries = LRUCache(app.config.get('USER_STATE_CACHE_SIZE', self._entries.max_entries),
+                                 app.config.get('USER_STATE_CACHE_TTL', self._entries.ttl))
+
+        @event.listens_for(db.session, 'before_flush')
+        def collect_touched_users(session, flush_context, instances):
+            for obj in chain(session.new, session.dirty, session.deleted):
+                user_id = _owner_user_id(obj)
+                if user_id is not None:
+                    self.touch(session, user_id)
+
+        @event.listens_for(db.session, 'before_commit')
+        def bump_state_versions(session):
+            session.flush()
+            touched = session.info.get(_TOUCHED_KEY)
+            if touched:
+                session.execute(
+                    User.__table__.update()
+                    .where(User.__table__.c.id.in_(sorted(touched)))
+                    .values(state_version=User.__table__.c.state_version + 1)
+                )
+
+        @event.listens_for(db.session, 'after_commit')
+        def drop_committed_users(session):
+            for user_id in session.info.pop(_TOUCHED_KEY, ()):
+                self.invalidate(user_id)
+
+        @event.listens_for(db.session, 'after_rollback')
+        def forget_touched_users(session):
+            session.info.pop(_TOUCHED_KEY, None)
+
+    def touch(self, session, user_id: int):
+        """Record a write to user_id's state in session's transaction (for bulk updates/deletes)."""
+        session.info.setdefault(_TOUCHED_KEY, set()).add(user_id)
+        with self._lock:
+            self.generation += 1
+        self.invalidate(user_id)
+
+    def invalidate(self, user_id: int):
+        state = self._entries.pop(user_id)
+        if state is not None:
+            state.stale = True
+
+    def clear(self):
+        self._entries.clear()
+
+    def load(self, db, user_id: int) -> Optional[UserState]:
+        """Return a current snapshot for user_id: one version check when cached.
+
+        The check also reads the active set's content version, which changes
+        when the set is edited without touching this user's own rows.
+        """
+        versions = db.session.query(User.state_version, ProblemSet.version) \
+            .outerjoin(UserActiveSet, UserActiveSet.user_id == User.id) \
+            .outerjoin(ProblemSet, ProblemSet.set_id == UserActiveSet.set_id) \
+            .filter(User.id == user_id).first()
+        if versions is None:
+            self.invalidate(user_id)
+            return None
+        version, set_version = versions
+
+        state = self._entries.get(user_id)
+        if state is not None and state.state_version == version and not state.stale:
+            state.active_set_version = set_version
+            return state
+        if state is not None:
+            self.invalidate(user_id)
+
+        row = db.session.query(User, UserActiveSet.set_id) \
+            .outerjoin(UserActiveSet, UserActiveSet.user_id == User.id) \
+            .filter(User.id == user_id).first()
+        if row is None:
+            return None
+        state = UserState(*row)
+        state.active_set_version = set_version
+        self._entries.put(user_id, state)
+        return state
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries)}
@@ -0,0 +1,1731 @@
+// LeetCode Problem Selector - Main JavaScript
+let problemsLoaded = false;
+let currentActiveProblemSet = null;
+
+// ===== Problem Set Management Functions =====
+
+async function loadProblemSetsList() {
+    try {
+        const response = await fetch('/api/problem_sets');
+        const data = await response.json();
+
+        if (!data.success) {
+            showMessage('Failed to load problem sets', 'error');
+            return;
+        }
+
+        const container = document.getElementById('problemSetsListContainer');
+
+        if (data.sets.length === 0) {
+            container.innerHTML = `
+                <div class="empty-state">
+                    <h3>📦 No Problem Sets Available</h3>
+                    <p>Create your first problem set to get started!</p>
+                </div>
+            `;
+            return;
+        }
+
+        const activeSet = data.sets.find(s => s.is_active);
+        currentActiveProblemSet = activeSet ? activeSet.id : null;
+
+        container.innerHTML = `
+            <div class="problem-sets-grid">
+                ${data.sets.map(set => `
+                    <div class="problem-set-card ${set.is_active ? 'active' : ''}" onclick="selectProblemSet('${set.id}', ${set.is_active})">
+                        <div class="set-card-header">
+                            <div style="flex: 1;">
+                                <div class="set-card-name">${escapeHtml(set.name)}</div>
+                                ${set.is_active ? '<span class="set-badge badge-active">✓ Active</span>' : ''}
+                            </div>
+                            <span class="set-badge ${set.is_public ? 'badge-public' : 'badge-private'}">
+                                ${set.is_public ? '🌐 Public' : '🔒 Private'}
+                            </span>
+                        </div>
+
+                        ${set.description ? `<div class="set-card-description">${escapeHtml(set.description)}</div>` : ''}
+
+                        <div class="set-card-meta">
+                            <span>📝 ${set.problem_count} problems</span>
+                            <span>👤 ${escapeHtml(set.created_by)}</span>
+                        </div>
+
+                        <div class="set-card-meta" id="stats-${set.id}" style="display: none; border-top: 1px solid #e9ecef; padding-top: 12px; margin-top: 12px;">
+                            <span style="color: #28a745; font-weight: 700;">✓ <span id="completed-${set.id}">0</span> completed</span>
+                            <span style="color: #ffc107; font-weight: 700;">⏳ <span id="pending-${set.id}">0</span> pending</span>
+                        </div>
+
+                        <div class="set-card-actions" onclick="event.stopPropagation()">
+                            ${set.is_active ? `
+                                <button class="button button-info" onclick="showSetStats('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    📊 Stats
+                                </button>
+                            ` : ''}
+                            ${!set.is_active ? `
+                                <button class="button button-success" onclick="activateProblemSet('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    ✓ Use This
+                                </button>
+                            ` : `
+                                <button class="button button-primary" onclick="selectProblemSet('${set.id}', true)">
+                                    🎲 Start
+                                </button>
+                            `}
+                            ${!set.is_public && set.created_by === 'You' ? `
+                                <button class="button button-danger" onclick="deleteProblemSet('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    🗑️
+                                </button>
+                            ` : ''}
+                        </div>
+                    </div>
+                `).join('')}
+            </div>
+        `;
+
+        if (activeSet) {
+            await loadSetStats(activeSet.id);
+            problemsLoaded = true;
+            await showLoadedState();
+        }
+    } catch (error) {
+        showMessage('Error loading problem sets: ' + error.message, 'error');
+    }
+}
+
+async function selectProblemSet(setId, isActive) {
+    if (isActive) {
+        problemsLoaded = true;
+        await showLoadedState();
+    } else {
+        activateProblemSet(setId, '');
+    }
+}
+
+async function loadSetStats(setId) {
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}/stats`);
+        const data = await response.json();
+
+        if (data.success) {
+            const statsDiv = document.getElementById(`stats-${setId}`);
+            if (statsDiv) {
+                statsDiv.style.display = 'flex';
+                document.getElementById(`completed-${setId}`).textContent = data.completed;
+                document.getElementById(`pending-${setId}`).textContent = data.pending;
+            }
+        }
+    } catch (error) {
+        console.error('Error loading set stats:', error);
+    }
+}async function showSetStats(setId, setName) {
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}/stats`);
+        const data = await response.json();
+
+        if (!data.success) {
+            showMessage('Failed to load statistics', 'error');
+            return;
+        }
+
+        const modal = document.getElementById('listModal');
+        const modalTitle = document.getElementById('modalTitle');
+        const modalList = document.getElementById('modalList');
+
+        const percent = data.total > 0
+            ? Math.round((data.completed / data.total) * 100)
+            : 0;
+
+        modalTitle.innerHTML = `
+            📊 Statistics: ${escapeHtml(setName)}
+            <div style="font-size: 0.6em; margin-top: 8px; opacity: 0.85;">
+                ${data.completed}/${data.total} problems completed (${percent}%)
+            </div>
+        `;
+
+        const html = `
+            <div class="view-toggle">
+                <button class="toggle-btn active" onclick="switchSetStatsView('completed', this)">
+                    ✓ Completed (${data.completed})
+                </button>
+                <button class="toggle-btn" onclick="switchSetStatsView('pending', this)">
+                    ⏳ Pending (${data.pending})
+                </button>
+            </div>
+
+            <div class="view-toggle" style="margin-top: 10px;">
+                <button class="toggle-btn active" onclick="switchGroupingMode('category', this)">
+                    Group by Category
+                </button>
+                <button class="toggle-btn" onclick="switchGroupingMode('difficulty', this)">
+                    Group by Difficulty
+                </button>
+            </div>
+
+            <div id="problemsListContainer"></div>
+        `;
+
+        modalList.innerHTML = html;
+
+        window.currentSetStatsData = data;
+        window.currentSetStatsId = setId;
+        window.currentStatsViewType = 'completed';
+        window.currentGroupingMode = 'category';
+
+        displaySetProblems(data.completed_problems, 'completed', 'category');
+        modal.style.display = 'block';
+    } catch (error) {
+        showMessage('Error loading statistics: ' + error.message, 'error');
+    }
+}
+
+function switchSetStatsView(viewType, button) {
+    const wrapper = button.parentElement;
+    wrapper.querySelectorAll('.toggle-btn').forEach(btn => btn.classList.remove('active'));
+    button.classList.add('active');
+
+    window.currentStatsViewType = viewType;
+
+    const data = window.currentSetStatsData;
+    const problems = viewType === 'completed'
+        ? data.completed_problems
+        : data.pending_problems;
+
+    displaySetProblems(problems, viewType, window.currentGroupingMode || 'category');
+}
+
+function switchGroupingMode(groupMode, button) {
+    const wrapper = button.parentElement;
+    wrapper.querySelectorAll('.toggle-btn').forEach(btn => btn.classList.remove('active'));
+    button.classList.add('active');
+
+    window.currentGroupingMode = groupMode;
+
+    const data = window.currentSetStatsData;
+    const viewType = window.currentStatsViewType || 'completed';
+    const problems = viewType === 'completed'
+        ? data.completed_problems
+        : data.pending_problems;
+
+    displaySetProblems(problems, viewType, groupMode);
+}
+
+function displaySetProblems(problems, type, groupMode = 'category') {
+    const container = document.getElementById('problemsListContainer');
+
+    if (!problems || problems.length === 0) {
+        container.innerHTML = `
+            <p style="text-align: center; padding: 30px; color: #6c757d; font-size: 1.1em;">
+                No ${type} problems
+            </p>
+        `;
+        return;
+    }
+
+    let html = '';
+
+    if (groupMode === 'category') {
+        const categoryGroups = problems.reduce((acc, problem) => {
+            const category = problem.category?.trim() || 'Uncategorized';
+
+            if (!acc[category]) {
+                acc[category] = [];
+            }
+
+            acc[category].push(problem);
+            return acc;
+        }, {});
+
+        Object.keys(categoryGroups)
+            .sort((a, b) => a.localeCompare(b))
+            .forEach(category => {
+                const items = categoryGroups[category];
+
+                html += `
+                    <div class="difficulty-group-modal">
+                        <div class="difficulty-header medium">
+                            <span>${escapeHtml(category)}</span>
+                            <span class="category-count">${items.length}</span>
+                        </div>
+                        <ul style="list-style: none; padding: 0;">
+                            ${items.map(item => createSetProblemListItem(item, type)).join('')}
+                        </ul>
+                    </div>
+                `;
+            });
+    } else {
+        const difficultyGroups = {
+            easy: problems.filter(p => p.difficulty === 'easy'),
+            medium: problems.filter(p => p.difficulty === 'medium'),
+            hard: problems.filter(p => p.difficulty === 'hard')
+        };
+
+        if (difficultyGroups.easy.length > 0) {
+            html += `
+                <div class="difficulty-group-modal">
+                    <div class="difficulty-header easy">
+                        <span>🟢 Easy</span>
+                        <span class="category-count">${difficultyGroups.easy.length}</span>
+                    </div>
+                    <ul style="list-style: none; padding: 0;">
+                        ${difficultyGroups.easy.map(item => createSetProblemListItem(item, type)).join('')}
+                    </ul>
+                </div>
+            `;
+        }
+
+        if (difficultyGroups.medium.length > 0) {
+            html += `
+                <div class="difficulty-group-modal">
+                    <div class="difficulty-header medium">
+                        <span>🟡 Medium</span>
+                        <span class="category-count">${difficultyGroups.medium.length}</span>
+                    </div>
+                    <ul style="list-style: none; padding: 0;">
+                        ${difficultyGroups.medium.map(item => createSetProblemListItem(item, type)).join('')}
+                    </ul>
+                </div>
+            `;
+        }
+
+        if (difficultyGroups.hard.length > 0) {
+            html += `
+                <div class="difficulty-group-modal">
+                    <div class="difficulty-header hard">
+                        <span>🔴 Hard</span>
+                        <span class="category-count">${difficultyGroups.hard.length}</span>
+                    </div>
+                    <ul style="list-style: none; padding: 0;">
+                        ${difficultyGroups.hard.map(item => createSetProblemListItem(item, type)).join('')}
+                    </ul>
+                </div>
+            `;
+        }
+    }
+
+    container.innerHTML = html;
+}
+function createSetProblemListItem(item, type) {
+    const url = item.url;
+    const slug = url.split('/').filter(s => s).pop();
+    const name = slug.replace(/-/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+    const revisitClass = item.is_revisit ? 'revisit' : '';
+    const category = item.category || 'Unknown';
+
+    return `
+        <li class="${revisitClass}" style="padding: 14px; margin-bottom: 12px; background: #f8f9fa; border-radius: 10px; display: flex; justify-content: space-between; align-items: center;">
+            <div style="flex: 1;">
+                <a href="${url}" target="_blank" style="color: #007bff; text-decoration: none; font-weight: 600; font-size: 1.05em;">${name}</a>
+                <div style="font-size: 0.9em; color: #667eea; margin-top: 6px; font-weight: 500;">📁 ${category}</div>
+            </div>
+            ${type === 'pending' ? `
+                <button class="button button-success" onclick="markCompleteFromStats('${url}')" style="font-size: 13px; padding: 8px 16px;">
+                    ✓ Mark Complete
+                </button>
+            ` : ''}
+        </li>
+    `;
+}
+
+async function markCompleteFromStats(url) {
+    try {
+        const response = await sendWrite('/api/mark_complete', markBody(url), `complete:${url}`);
+
+        const data = await response.json();
+        if (data.success) {
+            showMessage('✓ Problem marked as complete!', 'success');
+            const setId = window.currentSetStatsId;
+            if (setId) {
+                const statsResponse = await fetch(`/api/problem_sets/${setId}/stats`);
+                const statsData = await statsResponse.json();
+                window.currentSetStatsData = statsData;
+
+                const activeBtn = document.querySelector('.toggle-btn.active');
+                if (activeBtn) {
+                    const viewType = activeBtn.textContent.includes('Completed') ? 'completed' : 'pending';
+                    displaySetProblems(viewType === 'completed' ? statsData.completed_problems : statsData.pending_problems, viewType);
+
+                    document.querySelectorAll('.toggle-btn')[0].innerHTML = `✓ Completed (${statsData.completed})`;
+                    document.querySelectorAll('.toggle-btn')[1].innerHTML = `⏳ Pending (${statsData.pending})`;
+
+                    const modalTitle = document.getElementById('modalTitle');
+                    const setName = modalTitle.textContent.split(':')[1].split('\n')[0].trim();
+                    modalTitle.innerHTML = `
+                        📊 Statistics: ${setName}
+                        <div style="font-size: 0.6em; margin-top: 8px; opacity: 0.85;">
+                            ${statsData.completed}/${statsData.total} problems completed (${Math.round(statsData.completed/statsData.total*100)}%)
+                        </div>
+                    `;
+                }
+
+                loadSetStats(setId);
+                refreshProgressUnlessLive();
+            }
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+    }
+}
+
+async function activateProblemSet(setId, setName) {
+    try {
+        const loadingArea = document.getElementById('loadingArea');
+        const loadingMessage = document.getElementById('loadingMessage');
+        const loadingSubMessage = document.getElementById('loadingSubMessage');
+
+        loadingMessage.textContent = 'Activating problem set...';
+        loadingSubMessage.textContent = 'Fetching problem difficulties from LeetCode. This may take a moment for large sets.';
+        loadingArea.classList.remove('hidden');
+
+        showMessage('⏳ Activating problem set and fetching difficulty data...', 'info');
+
+        const response = await fetch(`/api/problem_sets/${setId}/activate`, {
+            method: 'POST'
+        });
+
+        const data = await response.json();
+        loadingArea.classList.add('hidden');
+
+        if (data.success) {
+            showMessage('✓ Problem set activated successfully!', 'success');
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        document.getElementById('loadingArea').classList.add('hidden');
+        showMessage('Error activating problem set: ' + error.message, 'error');
+    }
+}
+
+async function deleteProblemSet(setId, setName) {
+    if (!confirm(`Delete "${setName}"? This cannot be undone.`)) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}`, {
+            method: 'DELETE'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ Problem set deleted', 'success');
+            await loadProblemSetsList();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error deleting problem set: ' + error.message, 'error');
+    }
+}
+
+function showCreateProblemSetModal() {
+    document.getElementById('createProblemSetModal').style.display = 'block';
+}
+
+function closeCreateProblemSetModal() {
+    document.getElementById('createProblemSetModal').style.display = 'none';
+    document.getElementById('createProblemSetForm').reset();
+}
+
+function handleProblemSetFileSelect(event) {
+    const file = event.target.files[0];
+    if (file) {
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            document.getElementById('problemSetJson').value = e.target.result;
+        };
+        reader.readAsText(file);
+    }
+}
+
+async function createProblemSet(event) {
+    event.preventDefault();
+
+    const name = document.getElementById('problemSetName').value.trim();
+    const description = document.getElementById('problemSetDescription').value.trim();
+    const problemsJson = document.getElementById('problemSetJson').value.trim();
+    const isPublic = document.getElementById('problemSetPublic').checked;
+    const button = document.getElementById('createProblemSetButton');
+
+    button.disabled = true;
+    button.textContent = 'Creating...';
+
+    showMessage('⏳ Creating problem set and validating data...', 'info');
+
+    try {
+        const response = await sendWrite('/api/problem_sets', {
+            name,
+            description,
+            problems_json: problemsJson,
+            is_public: isPublic
+        }, 'create_set');
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            closeCreateProblemSetModal();
+            await loadProblemSetsList();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error creating problem set: ' + error.message, 'error');
+    } finally {
+        button.disabled = false;
+        button.textContent = 'Create Problem Set';
+    }
+}
+
+function refreshProblemSetsList() {
+    loadProblemSetsList();
+    showMessage('🔄 Refreshed problem sets', 'success');
+}
+
+// ===== Utility Functions =====
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function showMessage(message, type = 'success') {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `<div class="message ${type}">${message}</div>`;
+
+    const timeout = type === 'info' ? 10000 : 4000;
+
+    setTimeout(() => {
+        messageArea.innerHTML = '';
+    }, timeout);
+}
+
+// ===== Completed/Pending Lists =====
+
+async function showCompletedList(scope, difficulty) {
+    try {
+        const response = await fetch(`/api/completed/${scope}/${difficulty}`);
+        const data = await response.json();
+
+        const modal = document.getElementById('listModal');
+        const modalTitle = document.getElementById('modalTitle');
+        const modalList = document.getElementById('modalList');
+
+        let title = '';
+        if (scope === 'session') {
+            title = '🎯 Current Session - ';
+        } else {
+            title = '🏆 Global - ';
+        }
+
+        if (difficulty === 'all') {
+            title += 'All Completed';
+        } else {
+            title += difficulty.charAt(0).toUpperCase() + difficulty.slice(1) + ' Completed';
+        }
+
+        modalTitle.textContent = title;
+
+        if (data.urls.length === 0) {
+            modalList.innerHTML = '<li style="text-align: center; padding: 30px; color: #6c757d;">No completed problems yet</li>';
+        } else {
+            let html = `
+                <div class="view-toggle">
+                    <button class="toggle-btn active" onclick="switchView('difficulty', this)" data-scope="${scope}" data-difficulty="${difficulty}">
+                        📊 By Difficulty
+                    </button>
+                    <button class="toggle-btn" onclick="switchView('category', this)" data-scope="${scope}" data-difficulty="${difficulty}">
+                        📁 By Category
+                    </button>
+                </div>
+                <div id="problemsListContainer"></div>
+            `;
+
+            modalList.innerHTML = html;
+            window.currentProblemsData = data.urls;
+            window.currentScope = scope;
+            window.currentDifficulty = difficulty;
+            displayByDifficulty(data.urls);
+        }
+
+        modal.style.display = 'block';
+    } catch (error) {
+        showMessage('Error loading completed list: ' + error.message, 'error');
+    }
+}
+
+function switchView(viewType, button) {
+    document.querySelectorAll('.toggle-btn').forEach(btn => btn.classList.remove('active'));
+    button.classList.add('active');
+
+    if (viewType === 'difficulty') {
+        displayByDifficulty(window.currentProblemsData);
+    } else {
+        displayByCategory(window.currentProblemsData);
+    }
+}
+
+function displayByDifficulty(problems) {
+    const container = document.getElementById('problemsListContainer');
+
+    const grouped = {
+        easy: problems.filter(p => p.difficulty === 'easy'),
+        medium: problems.filter(p => p.difficulty === 'medium'),
+        hard: problems.filter(p => p.difficulty === 'hard')
+    };
+
+    let html = '';
+
+    if (grouped.easy.length > 0) {
+        html += `
+            <div class="difficulty-group-modal">
+                <div class="difficulty-header easy">
+                    <span>🟢 Easy</span>
+                    <span class="category-count">${grouped.easy.length}</span>
+                </div>
+                <ul style="list-style: none; padding: 0;">
+                    ${grouped.easy.map(item => createProblemListItem(item)).join('')}
+                </ul>
+            </div>
+        `;
+    }
+
+    if (grouped.medium.length > 0) {
+        html += `
+            <div class="difficulty-group-modal">
+                <div class="difficulty-header medium">
+                    <span>🟡 Medium</span>
+                    <span class="category-count">${grouped.medium.length}</span>
+                </div>
+                <ul style="list-style: none; padding: 0;">
+                    ${grouped.medium.map(item => createProblemListItem(item)).join('')}
+                </ul>
+            </div>
+        `;
+    }
+
+    if (grouped.hard.length > 0) {
+        html += `
+            <div class="difficulty-group-modal">
+                <div class="difficulty-header hard">
+                    <span>🔴 Hard</span>
+                    <span class="category-count">${grouped.hard.length}</span>
+                </div>
+                <ul style="list-style: none; padding: 0;">
+                    ${grouped.hard.map(item => createProblemListItem(item)).join('')}
+                </ul>
+            </div>
+        `;
+    }
+
+    container.innerHTML = html || '<p>No problems to display</p>';
+}
+
+function displayByCategory(problems) {
+    const container = document.getElementById('problemsListContainer');
+
+    const grouped = {};
+    problems.forEach(problem => {
+        const category = problem.category || 'Unknown';
+        if (!grouped[category]) {
+            grouped[category] = [];
+        }
+        grouped[category].push(problem);
+    });
+
+    const sortedCategories = Object.keys(grouped).sort();
+
+    let html = '';
+
+    sortedCategories.forEach(category => {
+        const categoryProblems = grouped[category];
+        html += `
+            <div class="category-group">
+                <div class="category-group-header">
+                    <span>📁 ${category}</span>
+                    <span class="category-count">${categoryProblems.length}</span>
+                </div>
+                <ul style="list-style: none; padding: 0;">
+                    ${categoryProblems.map(item => createProblemListItem(item)).join('')}
+                </ul>
+            </div>
+        `;
+    });
+
+    container.innerHTML = html || '<p>No problems to display</p>';
+}
+
+function createProblemListItem(item) {
+    const url = item.url;
+    const slug = url.split('/').filter(s => s).pop();
+    const name = slug.replace(/-/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+    const revisitClass = item.is_revisit ? 'revisit' : '';
+
+    const difficultyBadge = getDifficultyBadge(item.difficulty);
+
+    return `
+        <li class="${revisitClass}" style="padding: 14px; margin-bottom: 12px; background: #f8f9fa; border-radius: 10px; display: flex; justify-content: space-between; align-items: center;">
+            <div style="flex: 1;">
+                <a href="${url}" target="_blank" style="color: #007bff; text-decoration: none; font-weight: 600; font-size: 1.05em;">${name}</a>
+                ${difficultyBadge}
+            </div>
+        </li>
+    `;
+}
+
+function getDifficultyBadge(difficulty) {
+    const badges = {
+        'easy': '<span style="background: linear-gradient(135deg, #28a745 0%, #20c997 100%); color: white; padding: 4px 10px; border-radius: 6px; font-size: 0.75em; margin-left: 10px; font-weight: 700;">Easy</span>',
+        'medium': '<span style="background: linear-gradient(135deg, #ffc107 0%, #fd7e14 100%); color: #000; padding: 4px 10px; border-radius: 6px; font-size: 0.75em; margin-left: 10px; font-weight: 700;">Medium</span>',
+        'hard': '<span style="background: linear-gradient(135deg, #dc3545 0%, #c82333 100%); color: white; padding: 4px 10px; border-radius: 6px; font-size: 0.75em; margin-left: 10px; font-weight: 700;">Hard</span>'
+    };
+    return badges[difficulty] || '';
+}
+
+// ===== Authentication =====
+
+async function handleLogout() {
+    const confirmed = confirm('Are you sure you want to logout?');
+    if (!confirmed) return;
+
+    try {
+        const response = await fetch('/api/logout', { method: 'POST' });
+        const data = await response.json();
+
+        if (data.success) {
+            window.location.href = '/login';
+        }
+    } catch (error) {
+        showMessage('Error logging out: ' + error.message, 'error');
+    }
+}
+
+// ===== Initialization =====
+
+async function checkInitialState() {
+    try {
+        // One request for user, active set, session problems and progress
+        const response = await fetch('/api/bootstrap');
+        const data = await response.json();
+
+        if (!data.success) {
+            throw new Error(data.message);
+        }
+
+        if (data.user.authenticated) {
+            document.getElementById('headerUsername').textContent = data.user.username;
+        }
+
+        if (data.loaded) {
+            problemsLoaded = true;
+            showLoadedSections();
+            renderLoadedState(data);
+        } else {
+            showProblemSetSelection();
+        }
+    } catch (error) {
+        console.log('No previous state found, showing problem set selection');
+        showProblemSetSelection();
+    }
+}
+
+function showLoadedSections() {
+    document.getElementById('problemSetSelectionSection').classList.add('hidden');
+    document.getElementById('progressSection').classList.remove('hidden');
+    document.getElementById('controlsSection').classList.remove('hidden');
+}
+
+// Render progress, the active set and the current session from a /api/bootstrap response
+function renderLoadedState(data) {
+    renderProgress(data.progress);
+    renderActiveSetInfo(data.active_set);
+    if (data.has_session) {
+        displayProblems(data.problems);
+    }
+}
+
+async function showLoadedState() {
+    showLoadedSections();
+
+    try {
+        const response = await fetch('/api/bootstrap');
+        const data = await response.json();
+        if (data.success) {
+            renderLoadedState(data);
+        }
+    } catch (error) {
+        console.log('No existing session');
+    }
+}
+
+function showProblemSetSelection() {
+    showMessage('📚 Loading problem sets...', 'info');
+
+    const problemSetSection = document.getElementById('problemSetSelectionSection');
+    const progressSection = document.getElementById('progressSection');
+    const controlsSection = document.getElementById('controlsSection');
+    const problemsSection = document.getElementById('problemsSection');
+
+    if (problemSetSection) {
+        problemSetSection.classList.remove('hidden');
+        problemSetSection.style.display = 'block';
+    }
+
+    if (progressSection) {
+        progressSection.classList.add('hidden');
+    }
+
+    if (controlsSection) {
+        controlsSection.classList.add('hidden');
+    }
+
+    if (problemsSection) {
+        problemsSection.classList.add('hidden');
+    }
+
+    window.scrollTo({ top: 0, behavior: 'smooth' });
+    loadProblemSetsList();
+}
+
+// ===== Dropdown Menu =====
+
+function toggleGenerateMenu() {
+    const menu = document.getElementById('generateMenu');
+    if (menu.classList.contains('show')) {
+        menu.classList.remove('show');
+    } else {
+        menu.classList.add('show');
+    }
+}
+
+document.addEventListener('click', function(event) {
+    const menu = document.getElementById('generateMenu');
+    const button = document.getElementById('generateMenuBtn');
+
+    if (menu && button && !menu.contains(event.target) && !button.contains(event.target)) {
+        menu.classList.remove('show');
+    }
+});
+
+// ===== Problem Generation =====
+
+async function generateProblems(count = 30) {
+    if (!problemsLoaded) {
+        showMessage('Please load problems first', 'error');
+        return;
+    }
+
+    let easy_count, medium_count, hard_count;
+    if (count === 15) {
+        easy_count = 6;
+        medium_count = 6;
+        hard_count = 3;
+    } else {
+        easy_count = 20;
+        medium_count = 8;
+        hard_count = 2;
+    }
+
+    try {
+        const response = await sendWrite('/api/generate', {
+            force_new: true,
+            easy_count: easy_count,
+            medium_count: medium_count,
+            hard_count: hard_count
+        }, 'generate');
+        const data = await response.json();
+
+        if (data.success) {
+            displayProblems(data.problems);
+            refreshProgressUnlessLive();
+            showMessage(`✓ Generated ${data.problems.length} new problems! (${easy_count} Easy, ${medium_count} Medium, ${hard_count} Hard)`);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error generating problems: ' + error.message, 'error');
+    }
+}
+
+// ===== Custom Generation Modal =====
+
+function showCustomGenerateModal() {
+    document.getElementById('customGenerateModal').style.display = 'block';
+    updateCustomTotal();
+}
+
+function closeCustomGenerateModal() {
+    document.getElementById('customGenerateModal').style.display = 'none';
+    document.getElementById('customGenerateForm').reset();
+}
+
+function updateCustomTotal() {
+    const easy = parseInt(document.getElementById('customEasyCount').value) || 0;
+    const medium = parseInt(document.getElementById('customMediumCount').value) || 0;
+    const hard = parseInt(document.getElementById('customHardCount').value) || 0;
+    const total = easy + medium + hard;
+    document.getElementById('customTotalCount').textContent = total;
+}
+
+async function generateCustomProblems(event) {
+    event.preventDefault();
+
+    if (!problemsLoaded) {
+        showMessage('Please load problems first', 'error');
+        return;
+    }
+
+    const easyCount = parseInt(document.getElementById('customEasyCount').value);
+    const mediumCount = parseInt(document.getElementById('customMediumCount').value);
+    const hardCount = parseInt(document.getElementById('customHardCount').value);
+    const total = easyCount + mediumCount + hardCount;
+
+    if (total === 0) {
+        showMessage('Please select at least one problem', 'error');
+        return;
+    }
+
+    const button = document.getElementById('customGenerateButton');
+    button.disabled = true;
+    button.textContent = 'Generating...';
+
+    try {
+        const response = await sendWrite('/api/generate', {
+            force_new: true,
+            easy_count: easyCount,
+            medium_count: mediumCount,
+            hard_count: hardCount
+        }, 'generate');
+
+        const data = await response.json();
+
+        if (data.success) {
+            closeCustomGenerateModal();
+            displayProblems(data.problems);
+            refreshProgressUnlessLive();
+            showMessage(`✓ Generated ${data.problems.length} custom problems! (${easyCount} Easy, ${mediumCount} Medium, ${hardCount} Hard)`);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error generating problems: ' + error.message, 'error');
+    } finally {
+        button.disabled = false;
+        button.textContent = 'Generate Problems';
+    }
+}
+
+// ===== Display Problems =====
+
+function displayProblems(problems) {
+    const problemsSection = document.getElementById('problemsSection');
+    problemsSection.classList.remove('hidden');
+
+    const grouped = {
+        easy: problems.filter(p => p.difficulty === 'easy'),
+        medium: problems.filter(p => p.difficulty === 'medium'),
+        hard: problems.filter(p => p.difficulty === 'hard')
+    };
+
+    let html = '';
+
+    if (grouped.easy.length > 0) {
+        html += `<div class="difficulty-group">
+            <div class="difficulty-header easy">🟢 EASY (${grouped.easy.length} problems)</div>`;
+        grouped.easy.forEach((problem, index) => {
+            html += createProblemHTML(problem, index + 1);
+        });
+        html += '</div>';
+    }
+
+    if (grouped.medium.length > 0) {
+        html += `<div class="difficulty-group">
+            <div class="difficulty-header medium">🟡 MEDIUM (${grouped.medium.length} problems)</div>`;
+        grouped.medium.forEach((problem, index) => {
+            html += createProblemHTML(problem, index + 1);
+        });
+        html += '</div>';
+    }
+
+    if (grouped.hard.length > 0) {
+        html += `<div class="difficulty-group">
+            <div class="difficulty-header hard">🔴 HARD (${grouped.hard.length} problems)</div>`;
+        grouped.hard.forEach((problem, index) => {
+            html += createProblemHTML(problem, index + 1);
+        });
+        html += '</div>';
+    }
+
+    problemsSection.innerHTML = html;
+}
+
+function removeProblemItem(problemItem) {
+    if (problemItem) {
+        problemItem.style.opacity = '0';
+        setTimeout(() => problemItem.remove(), 300);
+    }
+}
+
+function replaceProblemItem(problemItem, replacement) {
+    const parentGroup = problemItem.parentElement;
+    const index = Array.from(parentGroup.children).filter(el =>
+        el.classList.contains('problem-item')
+    ).indexOf(problemItem);
+
+    const tempDiv = document.createElement('div');
+    tempDiv.innerHTML = createProblemHTML(replacement, index + 1);
+    const newProblem = tempDiv.firstChild;
+
+    problemItem.style.opacity = '0';
+    setTimeout(() => {
+        problemItem.replaceWith(newProblem);
+        newProblem.style.opacity = '0';
+        setTimeout(() => newProblem.style.opacity = '1', 10);
+    }, 300);
+}
+
+function createProblemHTML(problem, index) {
+    const slug = problem.url.split('/').filter(s => s).pop();
+    const name = slug.replace(/-/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+    const revisitClass = problem.is_revisit ? 'revisit' : '';
+    const category = problem.category || 'Unknown';
+
+    return `<div class="problem-item ${revisitClass}"
+        data-url="${problem.url}"
+        data-difficulty="${problem.difficulty}"
+        data-category="${category}">
+        <span class="problem-number">${index}.</span>
+        <a class="problem-link"
+           href="${problem.url}"
+           target="_blank"
+           oncontextmenu="return false;"
+           onclick="handleProblemClick(event, '${problem.url}', '${category}')">${name}</a>
+        <div class="problem-actions">
+            <button class="button button-success" onclick="markComplete('${problem.url}')">✓ Complete</button>
+            <button class="button button-warning" onclick="markSkip('${problem.url}', '${problem.difficulty}')">⊘ Skip</button>
+            <button class="button button-info" onclick="markRevisit('${problem.url}')">↻ Revisit</button>
+        </div>
+    </div>`;
+}
+
+// ===== Category Tooltip =====
+
+let categoryTooltip = null;
+
+function handleProblemClick(event, url, category) {
+    if (event.metaKey || event.ctrlKey) {
+        event.preventDefault();
+        event.stopPropagation();
+        showCategoryTooltip(event, category);
+        return false;
+    }
+    return true;
+}
+
+function showCategoryTooltip(event, category) {
+    if (categoryTooltip) {
+        categoryTooltip.remove();
+    }
+
+    categoryTooltip = document.createElement('div');
+    categoryTooltip.className = 'category-tooltip';
+    categoryTooltip.textContent = category;
+    document.body.appendChild(categoryTooltip);
+
+    const x = event.clientX + 10;
+    const y = event.clientY + 10;
+
+    categoryTooltip.style.left = x + 'px';
+    categoryTooltip.style.top = y + 'px';
+
+    setTimeout(() => categoryTooltip.classList.add('show'), 10);
+
+    setTimeout(() => {
+        if (categoryTooltip) {
+            categoryTooltip.classList.remove('show');
+            setTimeout(() => {
+                if (categoryTooltip) {
+                    categoryTooltip.remove();
+                    categoryTooltip = null;
+                }
+            }, 300);
+        }
+    }, 3000);
+}
+
+document.addEventListener('click', function() {
+    if (categoryTooltip) {
+        categoryTooltip.classList.remove('show');
+        setTimeout(() => {
+            if (categoryTooltip) {
+                categoryTooltip.remove();
+                categoryTooltip = null;
+            }
+        }, 300);
+    }
+});
+
+// ===== Problem Actions =====
+
+async function markComplete(url) {
+    try {
+        const response = await sendWrite('/api/mark_complete', markBody(url), `complete:${url}`);
+
+        const data = await response.json();
+        if (data.success) {
+            refreshProgressUnlessLive();
+            showMessage('✓ Problem marked as complete!');
+            removeProblemItem(document.querySelector(`[data-url="${url}"]`));
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+    }
+}
+
+async function markSkip(url, difficulty) {
+    try {
+        const response = await sendWrite('/api/mark_skip', markBody(url), `skip:${url}`);
+
+        const data = await response.json();
+        if (data.success) {
+            refreshProgressUnlessLive();
+
+            const problemItem = document.querySelector(`[data-url="${url}"]`);
+            if (problemItem && data.replacement) {
+                replaceProblemItem(problemItem, data.replacement);
+                showMessage('⊘ Problem skipped and replaced!');
+            } else {
+                removeProblemItem(problemItem);
+                showMessage('⊘ Problem marked as skipped');
+            }
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+    }
+}
+
+async function markRevisit(url) {
+    try {
+        const response = await sendWrite('/api/mark_revisit', markBody(url), `revisit:${url}`);
+
+        const data = await response.json();
+        if (data.success) {
+            refreshProgressUnlessLive();
+            const problemItem = document.querySelector(`[data-url="${url}"]`);
+            if (problemItem) {
+                problemItem.classList.add('revisit');
+            }
+            showMessage('↻ Problem marked for revisit');
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+    }
+}
+
+// ===== Live Updates =====
+
+// Sent with every write and echoed in its event, so a page skips changes it already applied
+const clientId = Math.random().toString(36).slice(2) + Date.now().toString(36);
+let eventStream = null;
+
+function jsonHeaders() {
+    return { 'Content-Type': 'application/json', 'X-Client-Id': clientId };
+}
+
+// Writes sent again before the previous write's answer arrives (double-clicks,
+// retries after a network error) reuse its Idempotency-Key, so the server runs
+// them once and answers the repeats with the first response
+let writeEpoch = 0;
+
+async function sendWrite(path, body, action) {
+    const headers = jsonHeaders();
+    headers['Idempotency-Key'] = `${clientId}-${writeEpoch}-${action}`;
+    const response = await fetch(path, {
+        method: 'POST',
+        headers,
+        body: body === undefined ? undefined : JSON.stringify(body)
+    });
+    writeEpoch++;
+    return response;
+}
+
+function liveUpdatesActive() {
+    return eventStream !== null && eventStream.readyState === EventSource.OPEN;
+}
+
+// With a live stream the event carries the new progress; otherwise ask for it
+function markBody(url) {
+    return liveUpdatesActive() ? { url, progress: false } : { url };
+}
+
+function refreshProgressUnlessLive() {
+    if (!liveUpdatesActive()) {
+        updateProgress();
+    }
+}
+
+// Receive this user's changes from every tab and device instead of polling
+function connectEventStream() {
+    if (!window.EventSource || eventStream) return;
+
+    let openedBefore = false;
+    eventStream = new EventSource('/api/events');
+    eventStream.onopen = () => {
+        // Changes made while the stream was reconnecting were missed
+        if (openedBefore) {
+            resyncFromServer();
+        }
+        openedBefore = true;
+    };
+    eventStream.onerror = () => {
+        // The browser reconnects by itself unless the server refused the stream
+        if (eventStream.readyState === EventSource.CLOSED) {
+            eventStream = null;
+            setTimeout(connectEventStream, 60000);
+        }
+    };
+    eventStream.addEventListener('problem', event => applyProblemEvent(JSON.parse(event.data)));
+    eventStream.addEventListener('session', event => applySessionEvent(JSON.parse(event.data)));
+    eventStream.addEventListener('resync', () => resyncFromServer());
+}
+
+function applyLiveProgress(data) {
+    if (!problemsLoaded) return;
+    renderProgress(data.progress);
+    if (data.set_progress) {
+        renderActiveSetProgress(data.set_progress);
+    }
+}
+
+function applyProblemEvent(data) {
+    applyLiveProgress(data);
+    if (data.origin === clientId) return;
+
+    const problemItem = document.querySelector(`[data-url="${data.url}"]`);
+    if (!problemItem) return;
+    if (data.status === 'revisit') {
+        problemItem.classList.add('revisit');
+    } else if (data.status === 'skipped' && data.replacement) {
+        replaceProblemItem(problemItem, data.replacement);
+    } else {
+        removeProblemItem(problemItem);
+    }
+}
+
+function applySessionEvent(data) {
+    applyLiveProgress(data);
+    if (data.origin === clientId || !problemsLoaded) return;
+
+    if (data.problems.length > 0) {
+        displayProblems(data.problems);
+    } else {
+        document.getElementById('problemsSection').innerHTML = '';
+        document.getElementById('problemsSection').classList.add('hidden');
+    }
+}
+
+async function resyncFromServer() {
+    if (problemsLoaded) {
+        await showLoadedState();
+    }
+}
+
+// ===== Progress =====
+
+async function updateProgress() {
+    try {
+        const response = await fetch('/api/bootstrap');
+        const data = await response.json();
+        if (data.success) {
+            renderProgress(data.progress);
+            renderActiveSetInfo(data.active_set);
+        }
+    } catch (error) {
+        console.error('Error updating progress:', error);
+    }
+}
+
+function renderProgress(progress) {
+    document.getElementById('sessionTotalCompleted').textContent =
+        `${progress.session.total}/${progress.session.total_problems}`;
+    document.getElementById('sessionEasyCompleted').textContent = progress.session.easy;
+    document.getElementById('sessionMediumCompleted').textContent = progress.session.medium;
+    document.getElementById('sessionHardCompleted').textContent = progress.session.hard;
+
+    document.getElementById('globalTotalCompleted').textContent = progress.global.total;
+    document.getElementById('globalEasyCompleted').textContent = progress.global.easy;
+    document.getElementById('globalMediumCompleted').textContent = progress.global.medium;
+    document.getElementById('globalHardCompleted').textContent = progress.global.hard;
+    document.getElementById('skippedCount').textContent = progress.skipped;
+    document.getElementById('revisitCount').textContent = progress.revisit;
+
+    const unlockStatus = document.getElementById('unlockStatus');
+    if (progress.session.can_unlock_hard) {
+        unlockStatus.textContent = '🔓 Hard Problems UNLOCKED for this session!';
+        unlockStatus.className = 'unlock-status unlocked';
+    } else {
+        unlockStatus.textContent = `🔒 Hard Problems Locked - Need: ${progress.session.needs_easy} Easy, ${progress.session.needs_medium} Medium in current session`;
+        unlockStatus.className = 'unlock-status locked';
+    }
+}
+
+// Update Active Set Information from the bootstrap's active_set summary
+function renderActiveSetInfo(activeSet) {
+    if (!activeSet) {
+        document.getElementById('activeSetSection').classList.add('hidden');
+        return;
+    }
+
+    // Show the section
+    document.getElementById('activeSetSection').classList.remove('hidden');
+
+    // Update basic info
+    document.getElementById('activeSetName').textContent = activeSet.name;
+    document.getElementById('activeSetDescription').textContent = activeSet.description || 'No description provided';
+    document.getElementById('activeSetCreator').textContent = activeSet.created_by;
+    document.getElementById('activeSetVisibility').textContent = activeSet.is_public ? 'Public' : 'Private';
+
+    renderActiveSetProgress(activeSet);
+
+    // Store the ID for the detailed stats button
+    window.currentActiveSetId = activeSet.id;
+    window.currentActiveSetName = activeSet.name;
+}
+
+// Completed / total counts of the active set, overall and per difficulty
+function renderActiveSetProgress(setProgress) {
+    // Update overall stats
+    document.getElementById('activeSetTotal').textContent = setProgress.total;
+    document.getElementById('activeSetCompleted').textContent = setProgress.completed;
+    document.getElementById('activeSetPending').textContent = setProgress.pending;
+
+    // Calculate and update percentage
+    const percentage = setProgress.total > 0 ? Math.round((setProgress.completed / setProgress.total) * 100) : 0;
+    document.getElementById('activeSetPercentage').textContent = percentage + '%';
+
+    // Update progress bar
+    const progressBar = document.getElementById('activeSetProgressBar');
+    progressBar.style.width = percentage + '%';
+    progressBar.textContent = percentage + '%';
+
+    // Update difficulty breakdown
+    const byDifficulty = setProgress.by_difficulty;
+    document.getElementById('activeSetEasyCompleted').textContent = byDifficulty.easy.completed;
+    document.getElementById('activeSetEasyTotal').textContent = byDifficulty.easy.total;
+    document.getElementById('activeSetMediumCompleted').textContent = byDifficulty.medium.completed;
+    document.getElementById('activeSetMediumTotal').textContent = byDifficulty.medium.total;
+    document.getElementById('activeSetHardCompleted').textContent = byDifficulty.hard.completed;
+    document.getElementById('activeSetHardTotal').textContent = byDifficulty.hard.total;
+}
+
+// Show detailed stats for active set
+function showActiveSetFullStats() {
+    if (window.currentActiveSetId && window.currentActiveSetName) {
+        showSetStats(window.currentActiveSetId, window.currentActiveSetName);
+    }
+}
+
+// ===== Lists =====
+
+async function showList(type) {
+    try {
+        const response = await fetch(`/api/lists/${type}`);
+        const data = await response.json();
+
+        const modal = document.getElementById('listModal');
+        const modalTitle = document.getElementById('modalTitle');
+        const modalList = document.getElementById('modalList');
+
+        const listTitle = type === 'skipped' ? '📋 Skipped Problems' : '↻ Revisit Problems';
+        modalTitle.textContent = listTitle;
+
+        if (data.urls.length === 0) {
+            modalList.innerHTML = '<li style="text-align: center; padding: 30px; color: #6c757d;">No problems in this list yet</li>';
+        } else {
+            modalList.innerHTML = data.urls.map(item => {
+                const url = typeof item === 'string' ? item : item.url;
+                const slug = url.split('/').filter(s => s).pop();
+                const name = slug.replace(/-/g, ' ').replace(/\b\w/g, l => l.toUpperCase());
+                const revisitClass = (typeof item === 'object' && item.is_revisit) || type === 'revisit' ? 'revisit' : '';
+
+                return `<li class="${revisitClass}">
+                    <a href="${url}" target="_blank">${name}</a>
+                    ${type === 'skipped' ? `<button class="button button-success" onclick="markCompleteFromModal('${url}')">✓ Complete</button>` : ''}
+                </li>`;
+            }).join('');
+        }
+
+        modal.style.display = 'block';
+    } catch (error) {
+        showMessage('Error loading list: ' + error.message, 'error');
+    }
+}
+
+async function markCompleteFromModal(url) {
+    try {
+        const response = await sendWrite('/api/mark_complete', markBody(url), `complete:${url}`);
+
+        const data = await response.json();
+        if (data.success) {
+            refreshProgressUnlessLive();
+            showMessage('✓ Problem marked as complete!');
+            closeModal();
+            setTimeout(() => showList('skipped'), 500);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+    }
+}
+
+function closeModal() {
+    document.getElementById('listModal').style.display = 'none';
+}
+
+// ===== Import/Export =====
+
+function showImportModal() {
+    document.getElementById('importProgressModal').style.display = 'block';
+}
+
+function closeImportModal() {
+    document.getElementById('importProgressModal').style.display = 'none';
+    document.getElementById('importProgressInput').value = '';
+    document.getElementById('importProgressFile').value = '';
+}
+
+async function exportProgress() {
+    try {
+        const response = await fetch('/api/export_progress');
+        const data = await response.json();
+
+        const blob = new Blob([JSON.stringify(data, null, 2)], { type: 'application/json' });
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = `leetcode-progress-${new Date().toISOString().split('T')[0]}.json`;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        URL.revokeObjectURL(url);
+
+        showMessage('💾 Progress exported successfully!');
+    } catch (error) {
+        showMessage('Error exporting progress: ' + error.message, 'error');
+    }
+}
+
+async function importProgressData() {
+    const jsonText = document.getElementById('importProgressInput').value.trim();
+    const fileInput = document.getElementById('importProgressFile');
+
+    if (!jsonText && !fileInput.files[0]) {
+        showMessage('Please provide progress JSON or upload a file', 'error');
+        return;
+    }
+
+    if (fileInput.files[0]) {
+        const reader = new FileReader();
+        reader.onload = async function(e) {
+            try {
+                const importData = JSON.parse(e.target.result);
+                await performImport(importData);
+            } catch (error) {
+                showMessage('Invalid JSON file: ' + error.message, 'error');
+            }
+        };
+        reader.readAsText(fileInput.files[0]);
+    } else {
+        try {
+            const importData = JSON.parse(jsonText);
+            await performImport(importData);
+        } catch (error) {
+            showMessage('Invalid JSON format: ' + error.message, 'error');
+        }
+    }
+}
+
+async function performImport(importData) {
+    try {
+        const response = await sendWrite('/api/import_progress', importData, 'import');
+
+        const data = await response.json();
+        closeImportModal();
+
+        if (data.success) {
+            await updateProgress();
+            await checkInitialState();
+            showMessage('📥 ' + data.message);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        closeImportModal();
+        showMessage('Error importing progress: ' + error.message, 'error');
+    }
+}
+
+// ===== Reset Progress =====
+
+async function confirmResetProgress() {
+    const confirmed = confirm(
+        '⚠️ WARNING: This will delete ALL your progress!\n\n' +
+        'This includes:\n' +
+        '• All completed problems\n' +
+        '• Current session\n' +
+        '• Skipped problems list\n' +
+        '• Revisit list\n' +
+        '• Global statistics\n\n' +
+        'Your problems data will be kept.\n\n' +
+        'Are you absolutely sure you want to continue?'
+    );
+
+    if (!confirmed) return;
+
+    const doubleConfirmed = confirm(
+        '🚨 FINAL WARNING!\n\n' +
+        'This action CANNOT be undone!\n\n' +
+        'Click OK to permanently delete all progress.'
+    );
+
+    if (!doubleConfirmed) return;
+
+    try {
+        const response = await sendWrite('/api/reset_progress', undefined, 'reset');
+
+        const data = await response.json();
+
+        if (data.success) {
+            await updateProgress();
+            document.getElementById('problemsSection').innerHTML = '';
+            document.getElementById('problemsSection').classList.add('hidden');
+            showMessage('🗑️ ' + data.message);
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error resetting progress: ' + error.message, 'error');
+    }
+}
+
+// ===== Modal Click Outside =====
+
+window.onclick = function(event) {
+    const listModal = document.getElementById('listModal');
+    const importProgressModal = document.getElementById('importProgressModal');
+    const createProblemSetModal = document.getElementById('createProblemSetModal');
+    const customGenerateModal = document.getElementById('customGenerateModal');
+
+    if (event.target == listModal) {
+        listModal.style.display = 'none';
+    }
+    if (event.target == importProgressModal) {
+        closeImportModal();
+    }
+    if (event.target == createProblemSetModal) {
+        closeCreateProblemSetModal();
+    }
+    if (event.target == customGenerateModal) {
+        closeCustomGenerateModal();
+    }
+}
+// ===== Problem Set Search (Clean Implementation) =====
+
+let allProblemSetsData = [];
+
+// Search problem sets function
+async function searchProblemSets(query) {
+    if (!query || query.trim() === '') {
+        // If no query, reload all sets
+        await loadProblemSetsList();
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/search_problem_sets', {
+            method: 'POST',
+            headers: jsonHeaders(),
+            body: JSON.stringify({ query: query.trim() })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            // Update the search info
+            const infoDiv = document.getElementById('problemSetSearchInfo');
+            if (infoDiv) {
+                if (data.total_sets === 0) {
+                    infoDiv.innerHTML = `No sets match "<strong>${escapeHtml(query)}</strong>"`;
+                    infoDiv.style.color = '#dc3545';
+                } else {
+                    infoDiv.innerHTML = `Found <strong>${data.total_sets}</strong> set(s) matching "<strong>${escapeHtml(query)}</strong>"`;
+                    infoDiv.style.color = '#28a745';
+                }
+            }
+
+            // Render the filtered results
+            renderProblemSets(data.problem_sets, query);
+        }
+    } catch (error) {
+        showMessage('Search error: ' + error.message, 'error');
+    }
+}
+
+// Render problem sets (used by both search and default)
+function renderProblemSets(sets, highlightQuery = '') {
+    const container = document.getElementById('problemSetsListContainer');
+
+    if (sets.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <h3>🔍 No Problem Sets Found</h3>
+                <p>Try a different search term</p>
+                <button class="button button-secondary" onclick="clearProblemSetSearch()" style="margin-top: 20px;">
+                    Show All Sets
+                </button>
+            </div>
+        `;
+        return;
+    }
+
+    const activeSet = sets.find(s => s.is_active);
+
+    container.innerHTML = `
+        <div class="problem-sets-grid">
+            ${sets.map(set => {
+                // Highlight matching text if there's a query
+                let displayName = escapeHtml(set.name);
+                if (highlightQuery) {
+                    const regex = new RegExp(`(${highlightQuery.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')})`, 'gi');
+                    displayName = displayName.replace(regex, '<span class="search-highlight">$1</span>');
+                }
+
+                return `
+                    <div class="problem-set-card ${set.is_active ? 'active' : ''}" onclick="selectProblemSet('${set.id}', ${set.is_active})">
+                        <div class="set-card-header">
+                            <div style="flex: 1;">
+                                <div class="set-card-name">${displayName}</div>
+                                ${set.is_active ? '<span class="set-badge badge-active">✓ Active</span>' : ''}
+                            </div>
+                            <span class="set-badge ${set.is_public ? 'badge-public' : 'badge-private'}">
+                                ${set.is_public ? '🌐 Public' : '🔒 Private'}
+                            </span>
+                        </div>
+
+                        ${set.description ? `<div class="set-card-description">${escapeHtml(set.description)}</div>` : ''}
+
+                        <div class="set-card-meta">
+                            <span>📝 ${set.problem_count} problems</span>
+                            <span>👤 ${escapeHtml(set.created_by)}</span>
+                        </div>
+
+                        <div class="set-card-meta" id="stats-${set.id}" style="display: none; border-top: 1px solid #e9ecef; padding-top: 12px; margin-top: 12px;">
+                            <span style="color: #28a745; font-weight: 700;">✓ <span id="completed-${set.id}">0</span> completed</span>
+                            <span style="color: #ffc107; font-weight: 700;">⏳ <span id="pending-${set.id}">0</span> pending</span>
+                        </div>
+
+                        <div class="set-card-actions" onclick="event.stopPropagation()">
+                            ${set.is_active ? `
+                                <button class="button button-info" onclick="showSetStats('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    📊 Stats
+                                </button>
+                            ` : ''}
+                            ${!set.is_active ? `
+                                <button class="button button-success" onclick="activateProblemSet('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    ✓ Use This
+                                </button>
+                            ` : `
+                                <button class="button button-primary" onclick="selectProblemSet('${set.id}', true)">
+                                    🎲 Start
+                                </button>
+                            `}
+                            ${!set.is_public && set.created_by === 'You' ? `
+                                <button class="button button-danger" onclick="deleteProblemSet('${set.id}', '${escapeHtml(set.name).replace(/'/g, "\\'")}')">
+                                    🗑️
+                                </button>
+                            ` : ''}
+                        </div>
+                    </div>
+                `;
+            }).join('')}
+        </div>
+    `;
+
+    // Load stats for active set
+    if (activeSet) {
+        loadSetStats(activeSet.id);
+    }
+}
+
+// Clear search and show all
+function clearProblemSetSearch() {
+    const searchInput = document.getElementById('problemSetSearchInput');
+    if (searchInput) {
+        searchInput.value = '';
+    }
+
+    const infoDiv = document.getElementById('problemSetSearchInfo');
+    if (infoDiv) {
+        infoDiv.innerHTML = '';
+    }
+
+    loadProblemSetsList();
+}
+
+// Initialize search input listener
+function initializeProblemSetSearch() {
+    const searchInput = document.getElementById('problemSetSearchInput');
+    if (!searchInput) return;
+
+    let searchTimeout;
+
+    searchInput.addEventListener('input', function(e) {
+        clearTimeout(searchTimeout);
+        const query = e.target.value.trim();
+
+        searchTimeout = setTimeout(() => {
+            if (query === '') {
+                clearProblemSetSearch();
+            } else {
+                searchProblemSets(query);
+            }
+        }, 300);
+    });
+
+    searchInput.addEventListener('keypress', function(e) {
+        if (e.key === 'Enter') {
+            clearTimeout(searchTimeout);
+            const query = e.target.value.trim();
+            if (query) {
+                searchProblemSets(query);
+            } else {
+                clearProblemSetSearch();
+            }
+        }
+    });
+}
+
+// Call this in your existing DOMContentLoaded or add a new one
+document.addEventListener('DOMContentLoaded', function() {
+    initializeProblemSetSearch();
+});
+
+// ===== Page Load =====
+
+window.onload = function() {
+    checkInitialState();
+    connectEventStream();
+};
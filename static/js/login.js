@@ -0,0 +1,41 @@
+function showMessage(message, type = 'success') {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `<div class="message ${type}">${message}</div>`;
+}
+
+async function handleLogin(event) {
+    event.preventDefault();
+
+    const username = document.getElementById('username').value.trim();
+    const password = document.getElementById('password').value;
+    const remember = document.getElementById('remember').checked;
+    const loginButton = document.getElementById('loginButton');
+
+    loginButton.disabled = true;
+    loginButton.textContent = 'Logging in...';
+
+    try {
+        const response = await fetch('/api/login', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ username, password, remember })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            setTimeout(() => {
+                window.location.href = '/';
+            }, 500);
+        } else {
+            showMessage(data.message, 'error');
+            loginButton.disabled = false;
+            loginButton.textContent = 'Login';
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+        loginButton.disabled = false;
+        loginButton.textContent = 'Login';
+    }
+}
@@ -0,0 +1,268 @@
+let currentExportData = null;
+let currentExportFilename = '';
+
+async function loadProblemSets() {
+    try {
+        const response = await fetch('/api/problem_sets');
+        const data = await response.json();
+
+        if (!data.success) {
+            showMessage('Failed to load problem sets', 'error');
+            return;
+        }
+
+        const container = document.getElementById('problemSetsContainer');
+
+        if (data.sets.length === 0) {
+            container.innerHTML = `
+                <div class="empty-state">
+                    <h3>📦 No Problem Sets Yet</h3>
+                    <p>Create your first problem set to get started!</p>
+                </div>
+            `;
+            return;
+        }
+
+        // Get current active set
+        const activeSets = data.sets.filter(s => s.is_active);
+
+        container.innerHTML = `
+            <div class="problem-sets-grid">
+                ${data.sets.map(set => `
+                    <div class="set-card ${set.is_active ? 'active' : ''}">
+                        <div class="set-header">
+                            <div>
+                                <div class="set-name">${escapeHtml(set.name)}</div>
+                                ${set.is_active ? '<span class="set-badge badge-active">✓ Active</span>' : ''}
+                            </div>
+                            <span class="set-badge ${set.is_public ? 'badge-public' : 'badge-private'}">
+                                ${set.is_public ? '🌐 Public' : '🔒 Private'}
+                            </span>
+                        </div>
+
+                        ${set.description ? `<div class="set-description">${escapeHtml(set.description)}</div>` : ''}
+
+                        <div class="set-meta">
+                            <span>📝 ${set.problem_count} problems</span>
+                            <span>👤 ${escapeHtml(set.created_by)}</span>
+                        </div>
+
+                        <div class="set-actions">
+                            ${!set.is_active ? `
+                                <button class="button button-success" onclick="activateSet('${set.id}')">
+                                    ✓ Use This Set
+                                </button>
+                            ` : '<span style="color: #28a745; font-weight: 600;">Currently Active</span>'}
+
+                            <button class="button button-secondary" onclick="exportSet('${set.id}', '${escapeHtml(set.name)}')">
+                                📤 Export
+                            </button>
+
+                            ${!set.is_public && set.created_by === 'You' ? `
+                                <button class="button button-danger" onclick="deleteSet('${set.id}', '${escapeHtml(set.name)}')">
+                                    🗑️ Delete
+                                </button>
+                            ` : ''}
+                        </div>
+                    </div>
+                `).join('')}
+            </div>
+        `;
+    } catch (error) {
+        showMessage('Error loading problem sets: ' + error.message, 'error');
+    }
+}
+
+function showCreateModal() {
+    document.getElementById('createModal').style.display = 'block';
+}
+
+function closeCreateModal() {
+    document.getElementById('createModal').style.display = 'none';
+    document.getElementById('createForm').reset();
+}
+
+function handleFileSelect(event) {
+    const file = event.target.files[0];
+    if (file) {
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            document.getElementById('problemsJson').value = e.target.result;
+        };
+        reader.readAsText(file);
+    }
+}
+
+async function createProblemSet(event) {
+    event.preventDefault();
+
+    const name = document.getElementById('setName').value.trim();
+    const description = document.getElementById('setDescription').value.trim();
+    const problemsJson = document.getElementById('problemsJson').value.trim();
+    const isPublic = document.getElementById('isPublic').checked;
+    const createButton = document.getElementById('createButton');
+
+    createButton.disabled = true;
+    createButton.textContent = 'Creating...';
+
+    try {
+        const response = await fetch('/api/problem_sets', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ name, description, problems_json: problemsJson, is_public: isPublic })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            closeCreateModal();
+            await loadProblemSets();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error creating problem set: ' + error.message, 'error');
+    } finally {
+        createButton.disabled = false;
+        createButton.textContent = 'Create Problem Set';
+    }
+}
+
+async function activateSet(setId) {
+    if (!confirm('Switch to this problem set? Your progress will be preserved.')) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}/activate`, {
+            method: 'POST'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            await loadProblemSets();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error activating problem set: ' + error.message, 'error');
+    }
+}
+
+async function deleteSet(setId, setName) {
+    if (!confirm(`Are you sure you want to delete "${setName}"? This cannot be undone.`)) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}`, {
+            method: 'DELETE'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            await loadProblemSets();
+        } else {
+            showMessage(data.message, 'error');
+        }
+    } catch (error) {
+        showMessage('Error deleting problem set: ' + error.message, 'error');
+    }
+}
+
+async function exportSet(setId, setName) {
+    try {
+        const response = await fetch(`/api/problem_sets/${setId}/export`);
+        const data = await response.json();
+
+        if (data.id) {
+            currentExportData = data;
+            currentExportFilename = `${setName.toLowerCase().replace(/\s+/g, '_')}.json`;
+            document.getElementById('exportJson').value = JSON.stringify(data, null, 2);
+            document.getElementById('exportModal').style.display = 'block';
+        } else {
+            showMessage('Failed to export problem set', 'error');
+        }
+    } catch (error) {
+        showMessage('Error exporting problem set: ' + error.message, 'error');
+    }
+}
+
+function closeExportModal() {
+    document.getElementById('exportModal').style.display = 'none';
+    currentExportData = null;
+}
+
+function downloadExport() {
+    if (!currentExportData) return;
+
+    const blob = new Blob([JSON.stringify(currentExportData, null, 2)], { type: 'application/json' });
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = currentExportFilename;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+    URL.revokeObjectURL(url);
+
+    showMessage('💾 Problem set exported successfully!', 'success');
+}
+
+function copyExportToClipboard() {
+    const textarea = document.getElementById('exportJson');
+    textarea.select();
+    document.execCommand('copy');
+    showMessage('📋 Copied to clipboard!', 'success');
+}
+
+function refreshSets() {
+    loadProblemSets();
+    showMessage('🔄 Refreshed problem sets', 'success');
+}
+
+function showMessage(message, type = 'success') {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `<div class="message ${type}">${message}</div>`;
+    setTimeout(() => {
+        messageArea.innerHTML = '';
+    }, 5000);
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+async function logout() {
+    try {
+        await fetch('/logout', { method: 'POST' });
+        window.location.href = '/login';
+    } catch (error) {
+        window.location.href = '/login';
+    }
+}
+
+// Close modals when clicking outside
+window.onclick = function(event) {
+    const createModal = document.getElementById('createModal');
+    const exportModal = document.getElementById('exportModal');
+
+    if (event.target == createModal) {
+        closeCreateModal();
+    }
+    if (event.target == exportModal) {
+        closeExportModal();
+    }
+}
+
+// Load problem sets on page load
+window.onload = function() {
+    loadProblemSets();
+};
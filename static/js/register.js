@@ -0,0 +1,48 @@
+function showMessage(message, type = 'success') {
+    const messageArea = document.getElementById('messageArea');
+    messageArea.innerHTML = `<div class="message ${type}">${message}</div>`;
+}
+
+async function handleRegister(event) {
+    event.preventDefault();
+
+    const username = document.getElementById('username').value.trim();
+    const email = document.getElementById('email').value.trim();
+    const password = document.getElementById('password').value;
+    const confirmPassword = document.getElementById('confirmPassword').value;
+    const registerButton = document.getElementById('registerButton');
+
+    // Validate passwords match
+    if (password !== confirmPassword) {
+        showMessage('Passwords do not match', 'error');
+        return;
+    }
+
+    registerButton.disabled = true;
+    registerButton.textContent = 'Creating account...';
+
+    try {
+        const response = await fetch('/api/register', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ username, email, password })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showMessage('✓ ' + data.message, 'success');
+            setTimeout(() => {
+                window.location.href = '/';
+            }, 500);
+        } else {
+            showMessage(data.message, 'error');
+            registerButton.disabled = false;
+            registerButton.textContent = 'Create Account';
+        }
+    } catch (error) {
+        showMessage('Error: ' + error.message, 'error');
+        registerButton.disabled = false;
+        registerButton.textContent = 'Create Account';
+    }
+}
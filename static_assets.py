@@ -0,0 +1,105 @@
+"""Content-fingerprinted static assets.
+
+Page CSS and JS live in static/ and are served under /assets/ with the
+first 12 hex digits of their SHA-256 in the file name
+(css/index.css -> /assets/css/index.3f2a9c1b7d4e.css). Templates link them
+through the manifest with {{ asset_url('css/index.css') }}. A fingerprinted
+URL never changes content, so responses carry
+``Cache-Control: public, max-age=<ASSET_MAX_AGE>, immutable``: a browser
+loads each asset once per deploy and repeat page loads fetch only the
+HTML.
+
+The manifest is built when the app is created (in the gunicorn master when
+preloading), holding each file and a gzip copy in memory; the files are
+small. A request for a stale fingerprint (a page rendered before a deploy)
+gets the current file with ``no-cache``, so it still works but isn't kept.
+With app.debug the manifest is rebuilt when a file changes.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+from typing import Dict, NamedTuple
+
+from flask import Response, abort, current_app, request, url_for
+
+FINGERPRINT_LENGTH = 12
+# name.<fingerprint>.ext -> name.ext
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.[0-9a-f]{%d}(?P<ext>\.[^./]+)$' % FINGERPRINT_LENGTH)
+
+
+class Asset(NamedTuple):
+    path: str
+    mtime: float
+    fingerprinted: str
+    body: bytes
+    gzipped: bytes
+    mimetype: str
+
+
+class StaticAssets:
+    """Manifest of fingerprinted files under app.static_folder, with the /assets/ route serving them."""
+
+    def __init__(self):
+        self.directory = None
+        self.max_age = 31536000
+        self.assets: Dict[str, Asset] = {}
+
+    def init_app(self, app, url_prefix='/assets'):
+        self.directory = app.static_folder
+        self.max_age = app.config.get('ASSET_MAX_AGE', 31536000)
+        self.build()
+        app.add_url_rule(f"{url_prefix}/<path:filename>", 'asset', self.serve)
+        app.add_template_global(self.url, 'asset_url')
+
+    def build(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                name = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                assets[name] = self._load(name, path)
+        self.assets = assets
+        print(f"Fingerprinted {len(assets)} static assets")
+
+    @staticmethod
+    def _load(name: str, path: str) -> Asset:
+        with open(path, 'rb') as f:
+            body = f.read()
+        stem, ext = os.path.splitext(name)
+        fingerprint = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        gzipped = gzip.compress(body, 9, mtime=0)
+        mimetype = {'.css': 'text/css', '.js': 'text/javascript'}.get(ext, 'application/octet-stream')
+        return Asset(path, os.path.getmtime(path), f"{stem}.{fingerprint}{ext}", body,
+                     gzipped if len(gzipped) < len(body) else b'', mimetype)
+
+    def _stale(self) -> bool:
+        return any(not os.path.exists(a.path) or os.path.getmtime(a.path) != a.mtime
+                   for a in self.assets.values())
+
+    def url(self, name: str) -> str:
+        """URL of the current version of static/<name>, for templates."""
+        if current_app.debug and self._stale():
+            self.build()
+        asset = self.assets.get(name)
+        if asset is None:
+            raise KeyError(f"No static asset {name!r} in {self.directory}")
+        return url_for('asset', filename=asset.fingerprinted)
+
+    def serve(self, filename: str):
+        match = _FINGERPRINTED.match(filename)
+        asset = self.assets.get(match['stem'] + match['ext']) if match else None
+        if asset is None:
+            abort(404)
+
+        gzip_ok = asset.gzipped and 'gzip' in request.headers.get('Accept-Encoding', '')
+        response = Response(asset.gzipped if gzip_ok else asset.body, mimetype=asset.mimetype)
+        if gzip_ok:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if filename == asset.fingerprinted:
+            response.headers['Cache-Control'] = f"public, max-age={self.max_age}, immutable"
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,223 @@
+"""Incremental parser for uploaded problem sets.
+
+Uploads are ``{category: [urls]}`` documents, optionally wrapped as
+``{"result": {category: [urls]}}`` or, as written by the set export
+endpoint, ``{"name": ..., "problems": {category: [urls]}}``. iter_problem_set reads the upload in
+fixed-size chunks and yields ``(category, canonical_url)`` pairs as soon as
+each URL has been read, so callers can write rows in batches and never hold
+the whole document (or all of its rows) in memory.
+
+Every URL is validated and normalized on the way through, and the byte and
+problem-count limits are enforced while reading, so an oversized upload is
+rejected before it has been read in full.
+"""
+
+import codecs
+import json
+import re
+from typing import Iterator, Tuple
+
+from problem_urls import normalize_problem_url
+
+CHUNK_SIZE = 64 * 1024
+MAX_SLUG_LENGTH = 300
+_SLUG_RE = re.compile(r'^[a-z0-9][a-z0-9-]*$')
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = ' \t\n\r,:]}'
+WRAPPER_KEYS = ('result', 'problems')
+
+
+class UploadError(ValueError):
+    """The upload is malformed or over a configured limit; the message is user-facing."""
+
+
+class _Tokenizer:
+    """Pull tokenizer over a text or bytes stream: yields JSON punctuation, strings and scalars."""
+
+    def __init__(self, stream, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(CHUNK_SIZE)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.bytes_read += len(chunk)
+        if self.max_bytes and self.bytes_read > self.max_bytes:
+            raise UploadError(f"Upload is larger than the {self.max_bytes:,} byte limit")
+        text = self.decoder.decode(chunk, final=not chunk)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return bool(chunk) or bool(text)
+
+    def _peek_char(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def next(self):
+        """Return the next token: one of '{}[]:,', ('str', value), ('scalar', value) or '' at EOF."""
+        c = self._peek_char()
+        if c in ('', '{', '}', '[', ']', ':', ','):
+            self.pos += len(c)
+            return c
+        if c == '"':
+            return 'str', self._read_string()
+        return 'scalar', self._read_scalar()
+
+    def peek(self) -> str:
+        return self._peek_char()
+
+    def _read_string(self) -> str:
+        end = self.pos + 1
+        while True:
+            end = self.buffer.find('"', end)
+            while end == -1:
+                searched = len(self.buffer) - self.pos
+                if not self._fill():
+                    raise UploadError("Invalid JSON: unterminated string")
+                end = self.buffer.find('"', self.pos + searched)
+            # Skip quotes escaped by an odd number of backslashes
+            backslashes = 0
+            while self.buffer[end - 1 - backslashes] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            end += 1
+        raw = self.buffer[self.pos:end + 1]
+        self.pos = end + 1
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise UploadError("Invalid JSON: bad string escape")
+
+    def _read_scalar(self):
+        end = self.pos
+        while True:
+            while end < len(self.buffer) and self.buffer[end] not in _DELIMITERS:
+                end += 1
+            if end < len(self.buffer) or self.eof:
+                break
+            offset = end - self.pos
+            self._fill()
+            end = self.pos + offset
+        raw = self.buffer[self.pos:end]
+        self.pos = end
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise UploadError(f"Invalid JSON near {raw[:40]!r}")
+
+
+def _expect(tokens: _Tokenizer, expected: str):
+    token = tokens.next()
+    if token != expected:
+        raise UploadError(f"Invalid JSON: expected {expected!r}")
+
+
+def _skip_value(tokens: _Tokenizer):
+    """Consume one value of any shape without keeping it."""
+    depth = 0
+    while True:
+        token = tokens.next()
+        if token == '':
+            raise UploadError("Invalid JSON: unexpected end of upload")
+        if token in ('{', '['):
+            depth += 1
+        elif token in ('}', ']'):
+            depth -= 1
+        if depth == 0 and token not in (',', ':'):
+            return
+
+
+def _object_keys(tokens: _Tokenizer) -> Iterator[str]:
+    """Yield each key of an object whose '{' was already consumed; the caller consumes the value."""
+    if tokens.peek() == '}':
+        tokens.next()
+        return
+    while True:
+        token = tokens.next()
+        if not isinstance(token, tuple) or token[0] != 'str':
+            raise UploadError("Invalid JSON: expected an object key")
+        _expect(tokens, ':')
+        yield token[1]
+        token = tokens.next()
+        if token == '}':
+            return
+        if token != ',':
+            raise UploadError("Invalid JSON: expected ',' or '}'")
+
+
+def validate_problem_url(value, category: str, index: int) -> str:
+    """Canonical URL for one uploaded entry, or UploadError naming the bad entry."""
+    if not isinstance(value, str) or not value.strip():
+        raise UploadError(f"Category {category!r}, item {index + 1}: expected a problem URL")
+    slug, url = normalize_problem_url(value)
+    if len(slug) > MAX_SLUG_LENGTH or not _SLUG_RE.match(slug):
+        raise UploadError(f"Category {category!r}, item {index + 1}: not a LeetCode problem URL: {value[:100]!r}")
+    return url
+
+
+def _iter_categories(tokens: _Tokenizer, wrapper_allowed: bool) -> Iterator[Tuple[str, str]]:
+    for key in _object_keys(tokens):
+        first = tokens.peek()
+        if first == '[':
+            tokens.next()
+            index = 0
+            if tokens.peek() == ']':
+                tokens.next()
+                continue
+            while True:
+                token = tokens.next()
+                if token in ('{', '['):
+                    raise UploadError(f"Category {key!r}, item {index + 1}: expected a problem URL")
+                value = token[1] if isinstance(token, tuple) else None
+                yield key, validate_problem_url(value, key, index)
+                index += 1
+                token = tokens.next()
+                if token == ']':
+                    break
+                if token != ',':
+                    raise UploadError("Invalid JSON: expected ',' or ']'")
+        elif first == '{' and key in WRAPPER_KEYS and wrapper_allowed:
+            tokens.next()
+            yield from _iter_categories(tokens, wrapper_allowed=False)
+        else:
+            # Metadata such as "name" or "description"; not a category
+            _skip_value(tokens)
+
+
+def iter_problem_set(stream, max_bytes: int = 0, max_problems: int = 0) -> Iterator[Tuple[str, str]]:
+    """Yield (category, canonical_url) pairs from an upload stream (text or bytes).
+
+    Raises UploadError for malformed JSON, invalid URLs, or when max_bytes /
+    max_problems (0 = unlimited) is exceeded.
+    """
+    tokens = _Tokenizer(stream, max_bytes)
+    if tokens.next() != '{':
+        raise UploadError("Expected a JSON object of {category: [problem URLs]}")
+
+    count = 0
+    for pair in _iter_categories(tokens, wrapper_allowed=True):
+        count += 1
+        if max_problems and count > max_problems:
+            raise UploadError(f"Upload has more than the {max_problems} problem limit")
+        yield pair
+
+    if tokens.next() != '':
+        raise UploadError("Invalid JSON: unexpected data after the top-level object")
+    if count == 0:
+        raise UploadError("Upload contains no problems")
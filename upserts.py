@@ -0,0 +1,62 @@
+"""INSERT ... ON CONFLICT statements, and JSON list membership, for the supported dialects.
+
+PostgreSQL and SQLite (3.24+) share the ON CONFLICT syntax, so the same
+call is one round trip, with no check-then-insert race, on both backends.
+Statements are Core: they skip ORM flush hooks, so callers that write a
+user's rows must call user_states.touch themselves.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import cast, exists, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def dialect_insert(session, model):
+    """An INSERT for model supporting on_conflict_do_*, for the session's dialect."""
+    dialect = session.get_bind(mapper=inspect(model)).dialect.name
+    try:
+        return _INSERTS[dialect](model)
+    except KeyError:
+        raise NotImplementedError(f"No upsert support for the {dialect} dialect") from None
+
+
+def json_list_contains(session, model, column, value):
+    """A SQL condition: the JSON list in model's column holds value."""
+    dialect = session.get_bind(mapper=inspect(model)).dialect.name
+    if dialect == 'postgresql':
+        return cast(column, postgresql.JSONB).contains([value])
+    if dialect == 'sqlite':
+        elements = func.json_each(column).table_valued('value')
+        return exists().where(elements.c.value == value)
+    raise NotImplementedError(f"No JSON list support for the {dialect} dialect")
+
+
+def insert_ignore(session, model, rows: List[Dict], index_elements: Sequence[str] = None):
+    """Insert rows, skipping those that conflict with an existing row."""
+    if rows:
+        stmt = dialect_insert(session, model).on_conflict_do_nothing(index_elements=index_elements)
+        session.execute(stmt, rows)
+
+
+def upsert(session, model, rows: List[Dict], index_elements: Sequence[str], update_columns: Iterable[str]):
+    """Insert rows, or update update_columns of the row already holding the same index_elements."""
+    if rows:
+        stmt = dialect_insert(session, model)
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements,
+                                          set_={c: stmt.excluded[c] for c in update_columns})
+        session.execute(stmt, rows)
+
+
+def upsert_returning(session, model, row: Dict, index_elements: Sequence[str], set_: Dict, where=None,
+                     returning: Sequence = ()) -> Optional[tuple]:
+    """Insert row, or apply set_ to the row already holding its index_elements if that row matches where.
+
+    Returns the `returning` columns of the inserted or updated row, or None
+    when an existing row didn't match where and was left unchanged.
+    """
+    stmt = dialect_insert(session, model).values(**row)
+    stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_, where=where)
+    return session.execute(stmt.returning(*returning)).first()